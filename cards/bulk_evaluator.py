@@ -0,0 +1,107 @@
+import numpy as np
+
+from native_evaluator import load_evaluator
+
+
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+ev = load_evaluator()
+
+N_MASKS = 1 << ev.NUM_VALUES_IN_DECK
+# Card position in DECK -> value bit / suit
+CARD_BITS = np.array(ev.CARD_BITS, dtype=np.int64)
+CARD_SUITS = np.array(ev.CARD_SUITS, dtype=np.int64)
+# Value mask -> number of values, n highest values, best straight rank value
+POPCOUNT = np.array([bin(mask).count('1') for mask in range(N_MASKS)], dtype=np.int64)
+TOP = {
+    n: np.array([ev.top_values(mask, n) for mask in range(N_MASKS)], dtype=np.int64)
+    for n in (1, 2, 3, ev.NUM_CARDS_IN_HAND)
+}
+BEST_STRAIGHT = np.array([ev.best_straight(mask) for mask in range(N_MASKS)], dtype=np.int64)
+STRAIGHT_VALUE = np.array(
+    [ev.STRAIGHT_VALUES.get(ev.best_straight(mask), 0) for mask in range(N_MASKS)],
+    dtype=np.int64
+)
+
+
+def multiples_value(pairs: np.ndarray, trips: np.ndarray, quads: np.ndarray) -> np.ndarray:
+    return ((pairs * 2 + trips * 3 + quads * 4) << 1) * ev.ACE_VALUE
+
+
+def evaluate_chunk(cards: np.ndarray) -> np.ndarray:
+    seen = np.zeros(len(cards), dtype=np.int64)
+    twice = np.zeros_like(seen)
+    thrice = np.zeros_like(seen)
+    quads = np.zeros_like(seen)
+    suits = np.zeros((ev.NUM_SUITS_IN_DECK, len(cards)), dtype=np.int64)
+
+    bits = CARD_BITS[cards]
+    card_suits = CARD_SUITS[cards]
+    for i in range(cards.shape[1]):
+        bit = bits[:, i]
+        quads |= thrice & bit
+        thrice |= twice & bit
+        twice |= seen & bit
+        seen |= bit
+        for suit in range(ev.NUM_SUITS_IN_DECK):
+            suits[suit] |= np.where(card_suits[:, i] == suit, bit, 0)
+
+    flush = np.where(POPCOUNT[suits] >= ev.NUM_CARDS_IN_HAND, suits, 0).max(axis=0)
+
+    quad = TOP[1][quads]
+    trip = TOP[1][thrice]
+    full_house_pair = TOP[1][twice ^ trip]
+    two_pairs = TOP[2][twice]
+    flush_straight = BEST_STRAIGHT[flush]
+
+    # Same category order as rank_value_masks in the contract
+    conditions = [
+        flush_straight == ev.ROYAL_FLUSH_MASK,
+        flush_straight != 0,
+        quads != 0,
+        (thrice != 0) & (full_house_pair != 0),
+        flush != 0,
+        STRAIGHT_VALUE[seen] != 0,
+        thrice != 0,
+        POPCOUNT[twice] >= 2,
+        twice != 0,
+    ]
+    choices = [
+        ev.ROYAL_FLUSH + STRAIGHT_VALUE[flush],
+        ev.STRAIGHT_FLUSH + STRAIGHT_VALUE[flush],
+        ev.QUADS + (TOP[1][seen ^ quad] << 1) + multiples_value(0, 0, quad),
+        ev.FULL_HOUSE + multiples_value(full_house_pair, trip, 0),
+        ev.FLUSH + (TOP[ev.NUM_CARDS_IN_HAND][flush] << 1),
+        ev.STRAIGHT + STRAIGHT_VALUE[seen],
+        ev.TRIPS + (TOP[2][seen ^ thrice] << 1) + multiples_value(0, thrice, 0),
+        ev.TWO_PAIRS + (TOP[1][seen ^ two_pairs] << 1) + multiples_value(two_pairs, 0, 0),
+        ev.PAIR + (TOP[3][seen ^ twice] << 1) + multiples_value(twice, 0, 0),
+    ]
+    return np.select(conditions, choices, ev.HIGH_CARD + (TOP[ev.NUM_CARDS_IN_HAND][seen] << 1))
+
+
+def evaluate_array(cards, chunk_size: int = DEFAULT_CHUNK_SIZE) -> np.ndarray:
+    """Ranks many hands at once.
+    :param cards: (N, 5), (N, 6) or (N, 7) array of positions in DECK.
+    :param chunk_size: rows evaluated per pass, bounds temporary memory.
+    :returns: (N,) int64 array of the same ranks evaluate() returns, the
+        best 5 card rank for 6 and 7 card rows.
+    """
+
+    cards = np.asarray(cards, dtype=np.int64)
+    if cards.ndim != 2 or cards.shape[1] not in (5, 6, 7):
+        raise ValueError("Expected an (N, 5..7) array of cards, got shape %s" % (cards.shape,))
+    if cards.size and (cards.min() < 0 or cards.max() >= ev.NUM_CARDS_IN_DECK):
+        raise ValueError("Cards must be positions in DECK (0-%i)" % (ev.NUM_CARDS_IN_DECK - 1))
+
+    ranks = np.empty(len(cards), dtype=np.int64)
+    for start in range(0, len(cards), chunk_size):
+        ranks[start:start + chunk_size] = evaluate_chunk(cards[start:start + chunk_size])
+    return ranks
+
+
+def card_array(hands: list) -> np.ndarray:
+    """Converts hands of card strings (as stored by the poker contracts)
+    into a card array for evaluate_array."""
+
+    return np.array([ev.card_ints(hand) for hand in hands], dtype=np.int64)
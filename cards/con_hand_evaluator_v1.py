@@ -26,36 +26,38 @@ DECK = [
     '2h', '3h', '4h', '5h', '6h', '7h', '8h', '9h', 'Th', 'Jh', 'Qh', 'Kh', 'Ah',
     '2s', '3s', '4s', '5s', '6s', '7s', '8s', '9s', 'Ts', 'Js', 'Qs', 'Ks', 'As',
 ]
-RANKS = {
-    '2c': 13, '2d': 13, '2h': 13, '2s': 13,
-    '3c': 12, '3d': 12, '3h': 12, '3s': 12,
-    '4c': 11, '4d': 11, '4h': 11, '4s': 11,
-    '5c': 10, '5d': 10, '5h': 10, '5s': 10,
-    '6c': 9, '6d': 9, '6h': 9, '6s': 9,
-    '7c': 8, '7d': 8, '7h': 8, '7s': 8,
-    '8c': 7, '8d': 7, '8h': 7, '8s': 7,
-    '9c': 6, '9d': 6, '9h': 6, '9s': 6,
-    'Tc': 5, 'Td': 5, 'Th': 5, 'Ts': 5,
-    'Jc': 4, 'Jd': 4, 'Jh': 4, 'Js': 4,
-    'Qc': 3, 'Qd': 3, 'Qh': 3, 'Qs': 3,
-    'Kc': 2, 'Kd': 2, 'Kh': 2, 'Ks': 2,
-    'Ac': 1, 'Ad': 1, 'Ah': 1, 'As': 1,
-}
+# Card codes, indexed by position in DECK
+CARD_VALUES = [i % NUM_VALUES_IN_DECK for i in range(NUM_CARDS_IN_DECK)]
+CARD_SUITS = [i // NUM_VALUES_IN_DECK for i in range(NUM_CARDS_IN_DECK)]
+CARD_BITS = [1 << value for value in CARD_VALUES]
+# Card string or position in DECK -> position in DECK
+CARD_INDEX = {DECK[i]: i for i in range(NUM_CARDS_IN_DECK)}
+CARD_INDEX.update({i: i for i in range(NUM_CARDS_IN_DECK)})
 
-# Python program to  illustrate sum of two numbers.
-def reduce(function, iterable, initializer=None):
-    value = initializer
-    i = 0
-    for element in iterable:
-        value = function(value, element, i)
-        i += 1
-    return value
+STRAIGHT_LOW_ACE_MASK = STRAIGHT_LOW_ACE_INDICATOR >> 1
+ROYAL_FLUSH_MASK = int("11111", 2) << TEN_CARD_POSITION
+HIGH_CARD = 0 * RANK_BASE_VALUE
+PAIR = 1 * RANK_BASE_VALUE
+TWO_PAIRS = 2 * RANK_BASE_VALUE
+TRIPS = 3 * RANK_BASE_VALUE
+STRAIGHT = 4 * RANK_BASE_VALUE
+FLUSH = 5 * RANK_BASE_VALUE
+FULL_HOUSE = 6 * RANK_BASE_VALUE
+QUADS = 7 * RANK_BASE_VALUE
+STRAIGHT_FLUSH = 8 * RANK_BASE_VALUE
+ROYAL_FLUSH = 9 * RANK_BASE_VALUE
+# Rank mask of five consecutive values -> rank value of the straight
+STRAIGHT_VALUES = {
+    int("11111", 2) << i: int("11111", 2) << (i + 1)
+    for i in range(NUM_VALUES_IN_DECK - NUM_CARDS_IN_HAND + 1)
+}
+STRAIGHT_VALUES[STRAIGHT_LOW_ACE_MASK] = STRAIGHT_LOW_ACE_INDICATOR - (ACE_VALUE - 1)
+NO_CARDS = (0, 0, 0, 0, [0] * NUM_SUITS_IN_DECK)
 
 
-def rank_value_fn(total, val, index):
-    return total + \
-        ((val == 1 and (2**(index+1))) or 0) + \
-        ((val > 1 and (2**(index+1) * ACE_VALUE * val)) or 0)
+def multiples_value(pairs: int, trips: int, quads: int) -> int:
+    # Every card of a paired value is worth (value bit * ACE_VALUE)
+    return ((pairs * 2 + trips * 3 + quads * 4) << 1) * ACE_VALUE
 
 
 def evaluate_5_card_ints(hand: list) -> int:
@@ -86,113 +88,347 @@ def evaluate_5_card_ints(hand: list) -> int:
     2: Pair
     1: High Card
 
+    Single values are worth their bit, paired values are worth
+    count * bit * ACE_VALUE, plus RANK_BASE_VALUE * index in RANK_ORDER.
     '''
     assert len(hand) == 5, 'Invalid number of cards.'
-    suits = [0] * NUM_SUITS_IN_DECK
-    values = [0] * NUM_VALUES_IN_DECK
+    # Values seen at least once, twice, three and four times
+    seen = 0
+    twice = 0
+    thrice = 0
+    quads = 0
+    suit = CARD_SUITS[hand[0]]
+    is_flush = True
 
     for card in hand:
-        suits[card // NUM_VALUES_IN_DECK] += 1
-        values[card % NUM_VALUES_IN_DECK] += 1
+        bit = CARD_BITS[card]
+        quads |= thrice & bit
+        thrice |= twice & bit
+        twice |= seen & bit
+        seen |= bit
+        if CARD_SUITS[card] != suit:
+            is_flush = False
 
-    rank_value = reduce(
-        rank_value_fn,
-        values,
-        initializer=0
-    )
+    return rank_5_card_masks(seen, twice, thrice, quads, is_flush)
 
-    if 1 in values:
-        first_card_index = values.index(1)
-    else:
-        first_card_index = -1
-
-    is_straight = False
-    if first_card_index >= 0:
-        c = values[first_card_index:first_card_index+5]
-        if rank_value == STRAIGHT_LOW_ACE_INDICATOR or \
-            (len(c) == 5 and all([d == 1 for d in c])):
-            is_straight = True
-
-    n_pairs = values.count(2)
-    is_trips = 3 in values
-    ranks = {
-        'royal_flush': False,
-        'straight_flush': False,
-        'quads': 4 in values,
-        'full_house': is_trips and n_pairs == 1,
-        'flush': NUM_CARDS_IN_HAND in suits,
-        'straight': is_straight,
-        'trips': is_trips,
-        'two_pairs': n_pairs == 2,
-        'pair': n_pairs == 1,
-        'high_card': True,
-    }
-    ranks['straight_flush'] = ranks['flush'] and ranks['straight']
-    ranks['royal_flush'] = ranks['straight_flush'] and first_card_index == TEN_CARD_POSITION
-    
-    rank_index = 0
-    #rank_description = ""
-    for r in range(len(RANK_ORDER)-1, -1, -1):
-        rank = RANK_ORDER[r]
-        if ranks[rank]:
-            rank_index = r
-            #rank_description = rank
-            break
-    
-    rank_value += rank_index * RANK_BASE_VALUE - \
-        ((rank_value == STRAIGHT_LOW_ACE_INDICATOR and ACE_VALUE - 1) or 0)
 
-    return rank_value
+def rank_5_card_masks(seen: int, twice: int, thrice: int, quads: int, is_flush: bool) -> int:
+    if twice:
+        singles = (seen ^ twice) << 1
+        if quads:
+            return QUADS + singles + multiples_value(0, 0, quads)
+        if thrice:
+            pairs = twice ^ thrice
+            return (FULL_HOUSE if pairs else TRIPS) + singles + multiples_value(pairs, thrice, 0)
+        return (TWO_PAIRS if twice & (twice - 1) else PAIR) + singles + multiples_value(twice, 0, 0)
+
+    straight = STRAIGHT_VALUES.get(seen)
+    if straight is None:
+        return (FLUSH if is_flush else HIGH_CARD) + (seen << 1)
+    if is_flush:
+        return (ROYAL_FLUSH if seen == ROYAL_FLUSH_MASK else STRAIGHT_FLUSH) + straight
+    return STRAIGHT + straight
+
+
+def top_values(mask: int, n: int) -> int:
+    # Keep the n highest values of a value mask
+    top = 0
+    while n > 0 and mask:
+        bit = 1 << (mask.bit_length() - 1)
+        top |= bit
+        mask ^= bit
+        n -= 1
+    return top
+
+
+def best_straight(mask: int) -> int:
+    # Highest five consecutive values in a value mask, 0 if there are none
+    runs = mask & (mask << 1) & (mask << 2) & (mask << 3) & (mask << 4)
+    if runs:
+        return int("11111", 2) << (runs.bit_length() - NUM_CARDS_IN_HAND)
+    if mask & STRAIGHT_LOW_ACE_MASK == STRAIGHT_LOW_ACE_MASK:
+        return STRAIGHT_LOW_ACE_MASK
+    return 0
+
+
+def rank_value_masks(seen: int, twice: int, thrice: int, quads: int, suits: list) -> int:
+    # Best 5 card rank out of any number of cards, given the masks of values
+    # seen at least once, twice, three and four times and the value mask of
+    # each suit. Categories are tried from best to worst.
+    flush = 0
+    for suit in suits:
+        if suit > flush and bin(suit).count('1') >= NUM_CARDS_IN_HAND:
+            flush = suit
+
+    if flush:
+        straight = best_straight(flush)
+        if straight:
+            return (ROYAL_FLUSH if straight == ROYAL_FLUSH_MASK else STRAIGHT_FLUSH) + STRAIGHT_VALUES[straight]
+
+    if quads:
+        quad = top_values(quads, 1)
+        return QUADS + (top_values(seen ^ quad, 1) << 1) + multiples_value(0, 0, quad)
+
+    if thrice:
+        trip = top_values(thrice, 1)
+        pair = top_values(twice ^ trip, 1)
+        if pair:
+            return FULL_HOUSE + multiples_value(pair, trip, 0)
+
+    if flush:
+        return FLUSH + (top_values(flush, NUM_CARDS_IN_HAND) << 1)
+
+    straight = best_straight(seen)
+    if straight:
+        return STRAIGHT + STRAIGHT_VALUES[straight]
+
+    if thrice:
+        return TRIPS + (top_values(seen ^ thrice, 2) << 1) + multiples_value(0, thrice, 0)
+
+    if twice & (twice - 1):
+        pairs = top_values(twice, 2)
+        return TWO_PAIRS + (top_values(seen ^ pairs, 1) << 1) + multiples_value(pairs, 0, 0)
+
+    if twice:
+        return PAIR + (top_values(seen ^ twice, 3) << 1) + multiples_value(twice, 0, 0)
+
+    return HIGH_CARD + (top_values(seen, NUM_CARDS_IN_HAND) << 1)
+
+
+def count_values(cards: list, masks: tuple) -> tuple:
+    # Add cards to (seen, twice, thrice, quads, suits) value masks
+    seen, twice, thrice, quads, suits = masks
+    suits = list(suits)
+    for card in cards:
+        bit = CARD_BITS[card]
+        quads |= thrice & bit
+        thrice |= twice & bit
+        twice |= seen & bit
+        seen |= bit
+        suits[CARD_SUITS[card]] |= bit
+    return (seen, twice, thrice, quads, suits)
 
 
 def evaluate_7_card_ints(hand: list) -> int:
-    best_rank = None
     assert len(hand) == 7, 'Invalid number of cards.'
-    # 7 choose 5
-    for i in range(7):
-        for j in range(i+1, 7):
-            new_hand = hand[0:i] + hand[i+1:j] + hand[j+1:]
-            rank = evaluate_5_card_ints(new_hand)
-            if best_rank is None or best_rank < rank:
+    return rank_value_masks(*count_values(hand, NO_CARDS))
+
+
+def analyse_omaha_board(board: list) -> dict:
+    # Everything about the board that does not depend on the hole cards:
+    # the value masks of each 3 card subset, suits with at least 3 cards,
+    # straight windows the board covers 3 values of and whether it is paired.
+    assert len(board) == 5, 'Invalid number of board cards'
+    triples = []
+    for a in range(3):
+        for b in range(a+1, 4):
+            for c in range(b+1, 5):
+                seen = 0
+                twice = 0
+                thrice = 0
+                for card in (board[a], board[b], board[c]):
+                    bit = CARD_BITS[card]
+                    thrice |= twice & bit
+                    twice |= seen & bit
+                    seen |= bit
+                suit = CARD_SUITS[board[a]]
+                if CARD_SUITS[board[b]] == suit and CARD_SUITS[board[c]] == suit:
+                    suit_bit = 1 << suit
+                else:
+                    suit_bit = 0
+                triples.append((seen, twice, thrice, suit_bit, [board[a], board[b], board[c]]))
+
+    seen = 0
+    paired = False
+    suit_counts = [0] * NUM_SUITS_IN_DECK
+    for card in board:
+        bit = CARD_BITS[card]
+        paired = paired or (seen & bit) != 0
+        seen |= bit
+        suit_counts[CARD_SUITS[card]] += 1
+
+    return {
+        'triples': triples,
+        'seen': seen,
+        'paired': paired,
+        'flush_suits': [s for s in range(NUM_SUITS_IN_DECK) if suit_counts[s] >= 3],
+        'straights': [w for w in STRAIGHT_VALUES if bin(w & seen).count('1') >= 3],
+    }
+
+
+def omaha_pair_limit(x: int, y: int, board: dict) -> int:
+    # Exclusive upper bound on any rank hole cards x and y can make
+    suit = CARD_SUITS[x]
+    if CARD_SUITS[y] == suit and suit in board['flush_suits']:
+        return ROYAL_FLUSH + RANK_BASE_VALUE
+    bx = CARD_BITS[x]
+    by = CARD_BITS[y]
+    if board['paired'] or bx == by or (bx | by) & board['seen']:
+        return QUADS + RANK_BASE_VALUE
+    hole = bx | by
+    for window in board['straights']:
+        rest = window ^ hole
+        if hole & window == hole and rest & board['seen'] == rest:
+            return STRAIGHT + RANK_BASE_VALUE
+    return HIGH_CARD + RANK_BASE_VALUE
+
+
+def rank_omaha(hole_cards: list, board: dict) -> tuple:
+    # (best rank, the five cards making it)
+    assert len(hole_cards) == 4, 'Invalid number of hole cards'
+    pairs = []
+    for x in range(0, 3):
+        for y in range(x+1, 4):
+            a = hole_cards[x]
+            b = hole_cards[y]
+            pairs.append((omaha_pair_limit(a, b, board), a, b))
+    # Most promising pairs first, so the rest can be skipped once beaten
+    pairs.sort(reverse=True)
+
+    best_rank = -1
+    best_cards = None
+    for limit, a, b in pairs:
+        if limit <= best_rank:
+            break
+        ba = CARD_BITS[a]
+        bb = CARD_BITS[b]
+        hole_suit = CARD_SUITS[a]
+        hole_suit_bit = 1 << hole_suit if CARD_SUITS[b] == hole_suit else 0
+        for seen, twice, thrice, suit_bit, cards in board['triples']:
+            quads = thrice & ba
+            thrice |= twice & ba
+            twice |= seen & ba
+            seen |= ba
+            quads |= thrice & bb
+            thrice |= twice & bb
+            twice |= seen & bb
+            seen |= bb
+            rank = rank_5_card_masks(seen, twice, thrice, quads, (suit_bit & hole_suit_bit) > 0)
+            if best_rank < rank:
                 best_rank = rank
-    return best_rank
+                best_cards = cards
+                best_pair = [a, b]
+    return (best_rank, best_pair + best_cards)
 
 
 def evaluate_omaha(hole_cards: list, board: list) -> int:
-    best_rank = None
-    assert len(hole_cards) == 4, 'Invalid number of hole cards'
-    assert len(board) == 5, 'Invalid number of board cards'
-    n = 0
-    for b in range(0, 4):
-        for r in range(b+1, 5):
-            for x in range(0, 3):
-                for y in range(x+1, 4):
-                    new_hand = list(board)
-                    new_hand[b] = hole_cards[x]
-                    new_hand[r] = hole_cards[y]
-                    rank = evaluate_5_card_ints(new_hand)
-                    if best_rank is None or best_rank < rank:
-                        best_rank = rank
-                    n += 1
-    return best_rank
+    return rank_omaha(hole_cards, analyse_omaha_board(board))[0]
+
+
+def best_five_cards(hand: list, rank: int) -> list:
+    # The cards of hand that make up rank, picked from the same value masks
+    # rank_value_masks chose from instead of scoring every 5 card subset
+    seen, twice, thrice, quads, suits = count_values(hand, NO_CARDS)
+    category = rank // RANK_BASE_VALUE
+    value = rank % RANK_BASE_VALUE
+
+    suit = -1
+    if category in (5, 8, 9):
+        best = 0
+        for s in range(NUM_SUITS_IN_DECK):
+            if suits[s] > best and bin(suits[s]).count('1') >= NUM_CARDS_IN_HAND:
+                best = suits[s]
+                suit = s
+
+    if category in (4, 8, 9) and value == STRAIGHT_VALUES[STRAIGHT_LOW_ACE_MASK]:
+        singles = STRAIGHT_LOW_ACE_MASK
+    else:
+        singles = (value >> 1) & ((1 << NUM_VALUES_IN_DECK) - 1)
+
+    needed = {}
+    for v in range(NUM_VALUES_IN_DECK):
+        if singles & (1 << v):
+            needed[1 << v] = 1
+    if category == 7:
+        needed[top_values(quads, 1)] = 4
+    elif category == 6:
+        trip = top_values(thrice, 1)
+        needed[trip] = 3
+        needed[top_values(twice ^ trip, 1)] = 2
+    elif category == 3:
+        needed[thrice] = 3
+    elif category == 2:
+        pairs = top_values(twice, 2)
+        needed[top_values(pairs, 1)] = 2
+        needed[pairs ^ top_values(pairs, 1)] = 2
+    elif category == 1:
+        needed[twice] = 2
+
+    five = []
+    for card in hand:
+        bit = CARD_BITS[card]
+        if needed.get(bit, 0) > 0 and (suit < 0 or CARD_SUITS[card] == suit):
+            five.append(card)
+            needed[bit] -= 1
+    return five
+
+
+def evaluate_ints(hand: list) -> int:
+    if len(hand) == 1:
+        return CARD_VALUES[hand[0]] + 1
+    elif len(hand) == 5:
+        return evaluate_5_card_ints(hand)
+    elif len(hand) == 7:
+        return evaluate_7_card_ints(hand)
+    elif len(hand) == 9:
+        # Assume board is the last 5 cards
+        return evaluate_omaha(hand[:4], hand[4:])
+    else:
+        assert False, 'Invalid number of cards specified: {}'.format(len(hand))
+
+
+def card_ints(hand: list) -> list:
+    # Cards may be given as strings ('As') or as positions in DECK
+    return [CARD_INDEX[card] for card in hand]
 
 
 @export
 def evaluate(hand: list) -> int:
     if len(hand) == 1:
         # Simple lookup
-        return 14 - RANKS[hand[0]]
+        return CARD_VALUES[CARD_INDEX[hand[0]]] + 1
+    return evaluate_ints(card_ints(hand))
+
+
+@export
+def evaluate_detailed(hand: list) -> dict:
+    # Rank, category index into RANK_ORDER and the cards making the hand
+    cards = card_ints(hand)
+    if len(cards) == 9:
+        rank, best = rank_omaha(cards[:4], analyse_omaha_board(cards[4:]))
     else:
-        hand = [DECK.index(card) for card in hand]
-        if len(hand) == 5:
-            return evaluate_5_card_ints(hand)
-        elif len(hand) == 7:
-            return evaluate_7_card_ints(hand)
-        elif len(hand) == 9:
-            # Assume board is the last 5 cards
-            return evaluate_omaha(hand[:4], hand[4:])            
+        rank = evaluate_ints(cards)
+        best = best_five_cards(cards, rank) if len(cards) == 7 else cards
+    category = rank // RANK_BASE_VALUE
+    return {
+        'rank': rank,
+        'category': category,
+        'name': RANK_ORDER[category],
+        'cards': [DECK[card] for card in best],
+    }
+
+
+@export
+def evaluate_many(hands: list, board: list = None) -> list:
+    # Rank every hand against the same board in one call. Cards are converted
+    # once and the board is only analysed once for Hold'em and Omaha hands.
+    board = card_ints(board or [])
+    ranks = []
+    board_masks = None
+    omaha_board = None
+    for hand in hands:
+        hand = card_ints(hand)
+        if len(board) == 5 and len(hand) == 2:
+            if board_masks is None:
+                board_masks = count_values(board, NO_CARDS)
+            ranks.append(rank_value_masks(*count_values(hand, board_masks)))
+        elif len(board) == 5 and len(hand) == 4:
+            if omaha_board is None:
+                omaha_board = analyse_omaha_board(board)
+            ranks.append(rank_omaha(hand, omaha_board)[0])
         else:
-            assert False, 'Invalid number of cards specified: {}'.format(len(hand))
+            ranks.append(evaluate_ints(hand + board))
+    return ranks
 
 
 @export
@@ -201,3 +437,19 @@ def get_deck(shuffled: bool = True) -> list:
     if shuffled:
         random.shuffle(cards)
     return cards
+
+
+@export
+def deal(n_cards: int, n_decks: int = 1, as_strings: bool = False) -> list:
+    # Draws n_cards without replacement from n_decks shuffled decks, as
+    # positions in DECK (or DECK strings). Cards repeat across decks.
+    # The shuffle runs inside the random bridge, which is not metered per
+    # line, so shuffling the shoe is cheaper than drawing card by card here.
+    assert n_decks > 0, 'At least one deck is needed.'
+    assert 0 <= n_cards <= n_decks * NUM_CARDS_IN_DECK, f'Cannot deal {n_cards} cards from {n_decks} decks.'
+    if as_strings:
+        shoe = DECK * n_decks
+    else:
+        shoe = list(range(NUM_CARDS_IN_DECK)) * n_decks
+    random.shuffle(shoe)
+    return shoe[:n_cards]
@@ -0,0 +1,209 @@
+import argparse
+import itertools
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from native_evaluator import load_evaluator
+
+
+BOARD_SIZE = 5
+HOLE_CARD_SIZES = (2, 4)  # Hold'em, Omaha
+EXHAUSTIVE_LIMIT = 50_000
+DEFAULT_SAMPLES = 100_000
+SAMPLE_BATCH = 1_000
+
+evaluator = None
+
+
+def get_evaluator():
+    # Loaded once per process, pool workers included
+    global evaluator
+    if evaluator is None:
+        evaluator = load_evaluator()
+    return evaluator
+
+
+def new_totals(n_hands: int) -> list:
+    # [wins, ties, pot share] per known hand
+    return [[0, 0, 0.0] for _ in range(n_hands)]
+
+
+def merge_totals(totals: list, other: list) -> None:
+    for mine, theirs in zip(totals, other):
+        for i in range(3):
+            mine[i] += theirs[i]
+
+
+def record(totals: list, ranks: list) -> None:
+    """Adds one runout to the totals. Random opponents come after the known
+    hands in ranks and only affect who wins."""
+
+    best = max(ranks)
+    winners = [i for i in range(len(ranks)) if ranks[i] == best]
+    share = 1 / len(winners)
+    for i in winners:
+        if i < len(totals):
+            totals[i][0 if len(winners) == 1 else 1] += 1
+            totals[i][2] += share
+
+
+def run_exhaustive(hands: list, board: list, deck: list, first: int, needed: int) -> list:
+    """Scores every runout whose lowest remaining card is deck[first]."""
+
+    ev = get_evaluator()
+    totals = new_totals(len(hands))
+    head = board + [deck[first]]
+    for rest in itertools.combinations(deck[first + 1:], needed - 1):
+        record(totals, ev.evaluate_many(hands, head + list(rest)))
+    return totals
+
+
+def run_samples(hands: list, board: list, deck: list, opponents: int,
+                samples: int, deadline: float, seed: int) -> tuple:
+    """Scores random runouts (and random opponent hands) until either the
+    sample count or the deadline is reached. Returns (totals, trials)."""
+
+    ev = get_evaluator()
+    rng = random.Random(seed)
+    totals = new_totals(len(hands))
+    hole = len(hands[0])
+    needed = BOARD_SIZE - len(board)
+    draw = needed + opponents * hole
+    trials = 0
+
+    while samples is None or trials < samples:
+        if deadline is not None and time.time() >= deadline:
+            break
+        batch = SAMPLE_BATCH if samples is None else min(SAMPLE_BATCH, samples - trials)
+        for _ in range(batch):
+            cards = rng.sample(deck, draw)
+            all_hands = hands + [
+                cards[needed + i * hole:needed + (i + 1) * hole] for i in range(opponents)
+            ]
+            record(totals, ev.evaluate_many(all_hands, board + cards[:needed]))
+        trials += batch
+
+    return totals, trials
+
+
+def run_tasks(fn, tasks: list, processes: int) -> list:
+    if processes == 1 or len(tasks) == 1:
+        return [fn(*task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(fn, *zip(*tasks)))
+
+
+def calculate_equity(
+    hands: list,
+    board: list = None,
+    dead: list = None,
+    opponents: int = 0,
+    samples: int = None,
+    seconds: float = None,
+    processes: int = None,
+    exhaustive_limit: int = EXHAUSTIVE_LIMIT,
+    seed: int = None,
+) -> dict:
+    """Win, tie and pot-share probabilities for Hold'em or Omaha hands.
+    :param hands: known hole cards per player, as card strings or ints.
+    :param board: community cards dealt so far (0, 3, 4 or 5 cards).
+    :param dead: cards that are out of play (mucked, burnt, seen).
+    :param opponents: extra players with unknown, randomly dealt hands.
+    :param samples: sample budget when the runouts are not enumerated.
+    :param seconds: time budget when the runouts are not enumerated.
+    :param processes: worker processes, defaults to the number of cores.
+    :param exhaustive_limit: enumerate every runout when there are at most
+        this many of them and no random opponents, sample otherwise.
+    :returns: {'exhaustive': bool, 'trials': int, 'equities': [...]} with
+        a {'win', 'tie', 'equity'} record per known hand.
+    """
+
+    ev = get_evaluator()
+    hands = [ev.card_ints(hand) for hand in hands]
+    board = ev.card_ints(board or [])
+    dead = ev.card_ints(dead or [])
+
+    if len(hands) == 0 or len(hands) + opponents < 2:
+        raise ValueError("At least two players are needed, got %i" % (len(hands) + opponents))
+    hole = len(hands[0])
+    if hole not in HOLE_CARD_SIZES or any([len(hand) != hole for hand in hands]):
+        raise ValueError("Every hand needs %s hole cards" % " or ".join(map(str, HOLE_CARD_SIZES)))
+    if len(board) not in (0, 3, 4, 5):
+        raise ValueError("Invalid number of board cards: %i" % len(board))
+
+    used = [card for hand in hands for card in hand] + board + dead
+    if len(set(used)) != len(used):
+        raise ValueError("The same card was given more than once")
+    deck = [card for card in range(ev.NUM_CARDS_IN_DECK) if card not in used]
+    needed = BOARD_SIZE - len(board)
+    if needed + opponents * hole > len(deck):
+        raise ValueError("Not enough cards left to deal %i opponents" % opponents)
+
+    processes = processes or os.cpu_count() or 1
+    totals = new_totals(len(hands))
+    runouts = math.comb(len(deck), needed)
+
+    if opponents == 0 and runouts <= exhaustive_limit:
+        if needed == 0:
+            record(totals, ev.evaluate_many(hands, board))
+        else:
+            tasks = [(hands, board, deck, first, needed) for first in range(len(deck) - needed + 1)]
+            for result in run_tasks(run_exhaustive, tasks, processes):
+                merge_totals(totals, result)
+        exhaustive = True
+        trials = runouts
+    else:
+        if samples is None and seconds is None:
+            samples = DEFAULT_SAMPLES
+        deadline = None if seconds is None else time.time() + seconds
+        rng = random.Random(seed)
+        tasks = []
+        for i in range(processes):
+            share = None if samples is None else samples // processes + (i < samples % processes)
+            tasks.append((hands, board, deck, opponents, share, deadline, rng.getrandbits(64)))
+        trials = 0
+        for result, n in run_tasks(run_samples, tasks, processes):
+            merge_totals(totals, result)
+            trials += n
+        exhaustive = False
+
+    return {
+        'exhaustive': exhaustive,
+        'trials': trials,
+        'equities': [
+            {
+                'win': wins / trials,
+                'tie': ties / trials,
+                'equity': share / trials,
+            } for wins, ties, share in totals
+        ],
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Hold'em / Omaha equity calculator")
+    parser.add_argument('hands', nargs='+', help='comma separated hole cards, e.g. As,Kd')
+    parser.add_argument('--board', default='', help='comma separated board cards')
+    parser.add_argument('--dead', default='', help='comma separated dead cards')
+    parser.add_argument('--opponents', type=int, default=0)
+    parser.add_argument('--samples', type=int, default=None)
+    parser.add_argument('--seconds', type=float, default=None)
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args()
+
+    result = calculate_equity(
+        hands=[hand.split(',') for hand in args.hands],
+        board=[card for card in args.board.split(',') if card],
+        dead=[card for card in args.dead.split(',') if card],
+        opponents=args.opponents,
+        samples=args.samples,
+        seconds=args.seconds,
+        processes=args.processes,
+    )
+
+    print('exhaustive: %s, trials: %i' % (result['exhaustive'], result['trials']))
+    for hand, equity in zip(args.hands, result['equities']):
+        print('%s: win %.4f tie %.4f equity %.4f' % (hand, equity['win'], equity['tie'], equity['equity']))
@@ -0,0 +1,46 @@
+import ast
+import os
+import random
+import types
+
+
+CONTRACT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'con_hand_evaluator_v1.py')
+
+
+def read_constant(name: str, path: str = CONTRACT_PATH):
+    """A literal module level constant of the contract source, read without
+    running the contract.
+    >>> read_constant('RANK_ORDER')[-1]
+    'royal_flush'
+    """
+
+    with open(path, 'r') as f:
+        tree = ast.parse(f.read(), path)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == name for t in node.targets):
+            return ast.literal_eval(node.value)
+    raise KeyError(name)
+
+
+RANK_ORDER = read_constant('RANK_ORDER')
+
+
+def load_evaluator(path: str = CONTRACT_PATH) -> types.ModuleType:
+    """Runs the hand evaluator contract source as a plain python module.
+    Off-chain tools (equity, audits, benchmarks) use this so that they rank
+    hands with exactly the same code and integers as the contract.
+    >>> evaluator = load_evaluator()
+    >>> evaluator.evaluate(['As'])
+    13
+    """
+
+    with open(path, 'r') as f:
+        code = f.read()
+
+    module = types.ModuleType(os.path.basename(path)[:-3])
+    scope = vars(module)
+    scope['random'] = random
+    scope['export'] = lambda fn: fn
+    scope['construct'] = lambda fn: fn
+    exec(compile(code, path, 'exec'), scope)
+    return module
@@ -1,6 +1,8 @@
 # con_otp_v1
 random.seed()
 
+KEYSTREAM_BLOCK_BYTES = 32
+
 
 def encrypt_int(message: int, otp: int, safe: bool = True) -> int:
     assert message >= 0, "Only non-negative numbers are supported"
@@ -71,6 +73,99 @@ def decrypt_hex(encrypted_str: str, otp: int, safe: bool = True) -> str:
     decrypted_bytes = int2bytes(decrypted_int, key_length)
     return decrypted_bytes.hex()
 
+def combine_otps(otps: list) -> tuple:
+    # XOR is associative, so layers of pads are one pad. The width is the
+    # widest layer, which is what applying them one by one pads out to.
+    combined = 0
+    key_length = 1
+    for otp in otps:
+        combined ^= otp
+        key_length = max(key_length, byte_size(otp))
+    return combined, key_length
+
+@export
+def layer_encrypt_int(message: int, otps: list) -> int:
+    assert message >= 0, "Only non-negative numbers are supported"
+    return message ^ combine_otps(otps)[0]
+
+@export
+def layer_decrypt_int(encrypted: int, otps: list) -> int:
+    return layer_encrypt_int(encrypted, otps)
+
+@export
+def layer_encrypt(message_str: str, otps: list) -> str:
+    # Same as encrypt and then encrypt_hex once per further pad, unsafe
+    message_bytes = message_str.encode()
+    combined, key_length = combine_otps(otps)
+    encrypted_int = encrypt_int(bytes2int(message_bytes), combined, safe=False)
+    return int2bytes(encrypted_int, max(key_length, len(message_bytes))).hex()
+
+@export
+def layer_decrypt(encrypted_str: str, otps: list) -> str:
+    # Same as decrypt_hex once per pad but the last and then decrypt, unsafe
+    encrypted_bytes = bytes.fromhex(encrypted_str)
+    combined, key_length = combine_otps(otps)
+    decrypted_int = encrypt_int(bytes2int(encrypted_bytes), combined, safe=False)
+    decrypted_bytes = int2bytes(decrypted_int, max(key_length, len(encrypted_bytes)))
+    return decrypted_bytes.lstrip(b'\x00').decode()
+
+def keystream(key: int, n_bytes: int, offset: int = 0) -> int:
+    # sha3 of "key:counter" blocks, n_bytes of it starting at byte offset
+    first_block = offset // KEYSTREAM_BLOCK_BYTES
+    skip = offset - first_block * KEYSTREAM_BLOCK_BYTES
+    n_blocks = div_ceil(skip + n_bytes, KEYSTREAM_BLOCK_BYTES)
+    stream = "".join([hashlib.sha3(f'{key}:{i}') for i in range(first_block, first_block + n_blocks)])
+    return int(stream[2 * skip:2 * (skip + n_bytes)], 16)
+
+
+@export
+def seal(message_str: str, key: int) -> str:
+    message_bytes = message_str.encode()
+    n_bytes = len(message_bytes)
+    if n_bytes == 0:
+        return ''
+    sealed_int = encrypt_int(bytes2int(message_bytes), keystream(key, n_bytes), safe=False)
+    return int2bytes(sealed_int, n_bytes).hex()
+
+@export
+def unseal(sealed_str: str, key: int) -> str:
+    sealed_bytes = bytes.fromhex(sealed_str)
+    n_bytes = len(sealed_bytes)
+    if n_bytes == 0:
+        return ''
+    message_int = encrypt_int(bytes2int(sealed_bytes), keystream(key, n_bytes), safe=False)
+    return int2bytes(message_int, n_bytes).decode()
+
+@export
+def seal_chunk(chunk_str: str, key: int, offset: int) -> str:
+    # One piece of a longer message, offset bytes into it. Sealing a message
+    # piece by piece gives the same hex as sealing it whole.
+    assert offset >= 0, "Offset must be non-negative"
+    chunk_bytes = chunk_str.encode()
+    n_bytes = len(chunk_bytes)
+    if n_bytes == 0:
+        return ''
+    sealed_int = encrypt_int(bytes2int(chunk_bytes), keystream(key, n_bytes, offset), safe=False)
+    return int2bytes(sealed_int, n_bytes).hex()
+
+@export
+def unseal_chunk(sealed_str: str, key: int, offset: int) -> str:
+    assert offset >= 0, "Offset must be non-negative"
+    sealed_bytes = bytes.fromhex(sealed_str)
+    n_bytes = len(sealed_bytes)
+    if n_bytes == 0:
+        return ''
+    message_int = encrypt_int(bytes2int(sealed_bytes), keystream(key, n_bytes, offset), safe=False)
+    return int2bytes(message_int, n_bytes).decode()
+
+@export
+def derive_otp(seed: int, counter: int, n_bits: int) -> int:
+    # Pad number counter of the stream seed stands for, distributed like
+    # generate_otp(n_bits). Kept apart from the seal keystream of the same key.
+    n_blocks = div_ceil(n_bits, 8 * KEYSTREAM_BLOCK_BYTES)
+    stream = "".join([hashlib.sha3(f'{seed}:otp:{counter}:{i}') for i in range(n_blocks)])
+    return int(stream, 16) >> (8 * KEYSTREAM_BLOCK_BYTES * n_blocks - n_bits)
+
 @export
 def generate_otp(n_bits: int) -> int:
     return random.getrandbits(n_bits)
@@ -9,10 +9,12 @@ hands = Hash(default_value=None)
 game_names = Hash(default_value=None)
 players_games = Hash(default_value=[])
 players_invites = Hash(default_value=[])
+tournaments = Hash(default_value=None)
 
 player_metadata_contract = Variable()
 game_controller_contract = Variable()
 hand_controller_contract = Variable()
+tournament_controller_contract = Variable()
 
 owner = Variable()
 
@@ -23,6 +25,7 @@ def seed():
     player_metadata_contract.set('con_gamma_phi_profile_v5')
     hand_controller_contract.set('con_poker_hand_controller_v3')
     game_controller_contract.set('con_poker_game_controller_v2')
+    tournament_controller_contract.set('con_poker_tournament_controller_v1')
 
 @export
 def update_player_metadata_contract(contract: str):
@@ -42,6 +45,12 @@ def update_game_controller_contract(contract: str):
     game_controller_contract.set(contract)
 
 
+@export
+def update_tournament_controller_contract(contract: str):
+    assert ctx.caller == owner.get(), 'Only the owner can call update_tournament_controller_contract()'
+    tournament_controller_contract.set(contract)
+
+
 @export
 def add_chips_to_game(game_id: str, amount: float):
     player = ctx.caller
@@ -137,9 +146,56 @@ def leave_game(game_id: str):
     )
 
 
+@export
+def create_tournament(name: str, game_config: dict, tournament_config: dict) -> str:
+    creator = ctx.caller
+    module = I.import_module(tournament_controller_contract.get())
+    return module.create_tournament(
+        name=name,
+        game_config=game_config,
+        tournament_config=tournament_config,
+        creator=creator,
+        tournaments=tournaments,
+    )
+
+
+@export
+def register_for_tournament(tournament_id: str):
+    player = ctx.caller
+    module = I.import_module(tournament_controller_contract.get())
+    module.register(
+        tournament_id=tournament_id,
+        player=player,
+        tournaments=tournaments,
+    )
+
+
+@export
+def unregister_from_tournament(tournament_id: str):
+    player = ctx.caller
+    module = I.import_module(tournament_controller_contract.get())
+    module.unregister(
+        tournament_id=tournament_id,
+        player=player,
+        tournaments=tournaments,
+    )
+
+
+@export
+def start_tournament(tournament_id: str):
+    caller = ctx.caller
+    module = I.import_module(tournament_controller_contract.get())
+    module.start_tournament(
+        tournament_id=tournament_id,
+        caller=caller,
+        games=games,
+        tournaments=tournaments,
+    )
+
+
 @export
 def force_withdraw(player: str, amount: float):
-    assert ctx.caller == game_controller_contract.get(), 'Only the game controller contract can call this method.'
+    assert ctx.caller in (game_controller_contract.get(), tournament_controller_contract.get()), 'Only the game or tournament controller contract can call this method.'
     phi.transfer(
         amount=amount,
         to=player
@@ -148,7 +204,7 @@ def force_withdraw(player: str, amount: float):
 
 @export
 def force_transfer(player: str, amount: float):
-    assert ctx.caller == game_controller_contract.get(), 'Only the game controller contract can call this method.'
+    assert ctx.caller in (game_controller_contract.get(), tournament_controller_contract.get()), 'Only the game or tournament controller contract can call this method.'
     assert phi_balances[player, ctx.this] >= amount, 'You have not approved enough for this amount of chips'
     phi.transfer_from(amount, ctx.this, player)
 
@@ -194,6 +250,13 @@ def unban_player(game_id: str, player: str):
 @export
 def start_hand(game_id: str) -> str:
     dealer = ctx.caller
+    if games[game_id, 'tournament'] is not None:
+        # Blind level and starting stacks
+        I.import_module(tournament_controller_contract.get()).prepare_hand(
+            game_id=game_id,
+            games=games,
+            tournaments=tournaments,
+        )
     module = I.import_module(hand_controller_contract.get())
     return module.start_hand(
         game_id=game_id,
@@ -253,6 +316,16 @@ def reveal(hand_id: str, index: int) -> str:
     )
 
 
+@export
+def verify_commitments(hand_id: str, reveals: list) -> list:
+    module = I.import_module(hand_controller_contract.get())
+    return module.verify_commitments(
+        hand_id=hand_id,
+        reveals=reveals,
+        hands=hands,
+    )
+
+
 @export
 def bet_check_or_fold(hand_id: str, bet: float):
     player = ctx.caller
@@ -287,6 +360,14 @@ def payout_hand(hand_id: str):
         games=games,
         hands=hands,
     )
+    game_id = hands[hand_id, 'game_id']
+    if games[game_id, 'tournament'] is not None:
+        # Eliminations, balancing and breaking happen between hands
+        I.import_module(tournament_controller_contract.get()).settle_table(
+            game_id=game_id,
+            games=games,
+            tournaments=tournaments,
+        )
 
 
 @export
@@ -13,6 +13,7 @@ ALL_GAME_TYPES = [ONE_CARD_POKER, BLIND_POKER, STUD_POKER, HOLDEM_POKER, OMAHA_P
 NO_LIMIT = 0
 POT_LIMIT = 1
 ALL_BETTING_TYPES = [NO_LIMIT, POT_LIMIT]
+MAX_DECKS = 4
 
 
 def get_players_and_assert_exists(game_id: str, games: Any) -> dict:
@@ -30,6 +31,7 @@ def add_chips_to_game(game_id: str, amount: float, player: str, games: Any):
     assert amount > 0, 'Amount must be a positive number'
     players = get_players_and_assert_exists(game_id, games)
     assert player in players, 'You do not belong to this game.'
+    assert games[game_id, 'tournament'] is None, 'Tournament chips cannot be topped up.'
     games[game_id, player] = (games[game_id, player] or 0.0) + amount
     I.import_module(ctx.owner).force_transfer(player=player, amount=amount)
 
@@ -37,6 +39,7 @@ def add_chips_to_game(game_id: str, amount: float, player: str, games: Any):
 @export
 def withdraw_chips_from_game(game_id: str, amount: float, player: str, games: Any):
     assert amount > 0, 'Amount must be a positive number'
+    assert games[game_id, 'tournament'] is None, 'Tournament chips cannot be withdrawn.'
     current_chip_count = games[game_id, player] or 0
     assert current_chip_count >= amount, 'You cannot withdraw more than you have.'
     games[game_id, player] = current_chip_count - amount
@@ -48,6 +51,7 @@ def respond_to_invite(game_id: str, accept: bool, player: str, games: Any, playe
     player_invites = players_invites[player] or []
     players = get_players_and_assert_exists(game_id, games)
     assert player not in players, 'You are already a part of this game.'
+    assert games[game_id, 'tournament'] is None, 'Tournament tables are seated by the tournament.'
     declined = players_invites[player, 'declined'] or []
     public = games[game_id, 'public']
     assert game_id in player_invites or game_id in declined or public, 'You have not been invited to this game.'
@@ -138,6 +142,16 @@ def start_game(name: str,
         games[game_id, 'n_cards_total'] = n_cards_total
         games[game_id, 'n_hole_cards'] = n_hole_cards
 
+    if game_config.get('packed_state'):
+        # Keep each hand's betting state in one record instead of a key per field
+        games[game_id, 'packed_state'] = True
+
+    n_decks = game_config.get('n_decks') or 1
+    if n_decks != 1:
+        assert game_type in (ONE_CARD_POKER, BLIND_POKER), 'Only one card and blind poker can use multiple decks.'
+        assert 0 < n_decks <= MAX_DECKS, f'n_decks must be between 1 and {MAX_DECKS}.'
+        games[game_id, 'n_decks'] = n_decks
+
     players_games[creator] = (players_games[creator] or []) + [game_id]
     send_invite_requests(game_id, other_players, players_invites)
 
@@ -150,6 +164,7 @@ def add_player_to_game(game_id: str, player_to_add: str, player: str, games: Any
     assert player == creator, 'Only the game creator can add players.'
     players = get_players_and_assert_exists(game_id, games)
     assert player_to_add not in players, 'Player is already in the game.'
+    assert games[game_id, 'tournament'] is None, 'Tournament tables are seated by the tournament.'
     invitees = games[game_id, 'invitees']
     assert player_to_add not in invitees, 'Player has already been invited.'
     invitees.append(player_to_add)
@@ -160,6 +175,7 @@ def add_player_to_game(game_id: str, player_to_add: str, player: str, games: Any
 def leave_game(game_id: str, player: str, force: bool, games: Any, players_games: Any):
     players = get_players_and_assert_exists(game_id, games)
     assert player in players, 'You are not in this game.'
+    assert games[game_id, 'tournament'] is None, 'You cannot leave a tournament table.'
 
     chips = games[game_id, player]
 
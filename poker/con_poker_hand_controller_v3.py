@@ -4,6 +4,7 @@
 import con_rsa_encryption as rsa
 import con_otp_v1 as otp
 import con_hand_evaluator_v1 as evaluator
+import con_pot_settlement_v1 as pots
 
 random.seed()
 
@@ -18,6 +19,14 @@ POT_LIMIT = 1
 FLOP = 1
 TURN = 2
 RIVER = 3
+COMMUNITY_PAD_BITS = [80, 20, 20]
+SESSION_KEY_BITS = 128
+HAND_SEED_BITS = 256
+# Pads derived per player from the hand seed: one per community card, then
+# the session key
+PADS_PER_PLAYER = 4
+# Fills the commitment tree up to a power of two leaves
+EMPTY_LEAF = '0' * 64
 
 def get_players_and_assert_exists(game_id: str, games: Any) -> dict:
     players = games[game_id, 'players']
@@ -35,6 +44,58 @@ def create_hand_id(name: str) -> str:
     return hashlib.sha3(":".join([name, str(now)]))
 
 
+def new_hand_state(hand_id: str, packed: bool, hands: Any) -> dict:
+    # Mutable betting state of a hand. Packed hands keep it in one 'state'
+    # record that is read and written once per transaction, other hands
+    # keep a key per field that is read on first use.
+    return {
+        'hand_id': hand_id,
+        'hands': hands,
+        'packed': packed,
+        'values': {},
+        'dirty': {},
+    }
+
+
+def load_hand_state(hand_id: str, hands: Any) -> dict:
+    record = hands[hand_id, 'state']
+    state = new_hand_state(hand_id, record is not None, hands)
+    if record is not None:
+        state['values'] = record
+    return state
+
+
+def hand_value(state: dict, key: str, player: str = None) -> Any:
+    name = key if player is None else f'{player}:{key}'
+    values = state['values']
+    if name not in values and not state['packed']:
+        if player is None:
+            values[name] = state['hands'][state['hand_id'], key]
+        else:
+            values[name] = state['hands'][state['hand_id'], player, key]
+    return values.get(name)
+
+
+def set_hand_value(state: dict, key: str, value: Any, player: str = None):
+    name = key if player is None else f'{player}:{key}'
+    state['values'][name] = value
+    state['dirty'][name] = player
+
+
+def save_hand_state(state: dict):
+    hands = state['hands']
+    hand_id = state['hand_id']
+    if state['packed']:
+        if len(state['dirty']) > 0:
+            hands[hand_id, 'state'] = state['values']
+    else:
+        for name, player in state['dirty'].items():
+            if player is None:
+                hands[hand_id, name] = state['values'][name]
+            else:
+                hands[hand_id, player, name[len(player)+1:]] = state['values'][name]
+
+
 @export
 def start_hand(game_id: str, dealer: str, games: Any, hands: Any) -> str:
     players = get_players_and_assert_exists(game_id, games)    
@@ -52,14 +113,16 @@ def start_hand(game_id: str, dealer: str, games: Any, hands: Any) -> str:
     hands[hand_id, 'previous_hand_id'] = previous_hand_id
     hands[hand_id, 'game_id'] = game_id
     hands[hand_id, 'dealer'] = dealer
-    hands[hand_id, 'folded'] = []
-    hands[hand_id, 'completed'] = False
     hands[hand_id, 'payed_out'] = False
-    hands[hand_id, 'reached_dealer'] = False
-    hands[hand_id, 'active_players'] = []
-    hands[hand_id, 'current_bet'] = 0
-    hands[hand_id, 'pot'] = 0
-    hands[hand_id, 'all_in'] = []
+    state = new_hand_state(hand_id, games[game_id, 'packed_state'] or False, hands)
+    set_hand_value(state, 'folded', [])
+    set_hand_value(state, 'completed', False)
+    set_hand_value(state, 'reached_dealer', False)
+    set_hand_value(state, 'active_players', [])
+    set_hand_value(state, 'current_bet', 0)
+    set_hand_value(state, 'pot', 0)
+    set_hand_value(state, 'all_in', [])
+    save_hand_state(state)
     return hand_id
 
 @export
@@ -70,8 +133,13 @@ def ante_up(hand_id: str, player: str, games: Any, hands: Any):
     assert player in players, 'You are not a part of this game.'
     ante = games[game_id, 'ante']
     chips = games[game_id, player]
+    if games[game_id, 'tournament'] is not None and chips is not None and 0 < chips < ante:
+        # Tournament stacks cannot be topped up, so a short stack antes
+        # everything and is all in. The table's ante stays the same.
+        ante = chips
     assert chips is not None and chips >= ante, 'You do not have enough chips.'
-    active_players = hands[hand_id, 'active_players'] or []
+    state = load_hand_state(hand_id, hands)
+    active_players = hand_value(state, 'active_players') or []
     assert player not in active_players, 'You have already paid the ante.'
     game_type = games[game_id, 'game_type']
     if game_type == STUD_POKER:
@@ -81,29 +149,31 @@ def ante_up(hand_id: str, player: str, games: Any, hands: Any):
     elif game_type == OMAHA_POKER:
         max_players = 10
     else:
-        max_players = 50
+        max_players = 50 * (games[game_id, 'n_decks'] or 1)
     assert len(active_players) < max_players, f'A maximum of {max_players} is allowed for this game type.'
     # Pay ante
-    hands[hand_id, player, 'bet'] = ante
-    hands[hand_id, player, 'max_bet'] = chips
+    set_hand_value(state, 'bet', ante, player)
+    set_hand_value(state, 'max_bet', chips, player)
     games[game_id, player] -= ante
     # Update hand state
     active_players.append(player)
     active_players.sort(key=active_player_sort(players))
-    hands[hand_id, 'active_players'] = active_players
-    hands[hand_id, 'current_bet'] = ante
-    hands[hand_id, 'pot'] += ante
+    set_hand_value(state, 'active_players', active_players)
+    set_hand_value(state, 'current_bet', max(ante, hand_value(state, 'current_bet') or 0))
+    set_hand_value(state, 'pot', hand_value(state, 'pot') + ante)
     if chips == ante:
         # All in
-        all_in = hands[hand_id, 'all_in']
+        all_in = hand_value(state, 'all_in')
         all_in.append(player)
-        hands[hand_id, 'all_in'] = all_in
+        set_hand_value(state, 'all_in', all_in)
+    save_hand_state(state)
 
 
 @export
 def deal_cards(hand_id: str, dealer: str, games: Any, hands: Any, player_metadata: Any):
 
-    active_players = hands[hand_id, 'active_players']
+    state = load_hand_state(hand_id, hands)
+    active_players = hand_value(state, 'active_players')
 
     assert dealer == hands[hand_id, 'dealer'], 'You are not the dealer.'
     assert len(active_players) > 1, f'Not enough active players: {len(active_players)} <= 1'
@@ -112,22 +182,40 @@ def deal_cards(hand_id: str, dealer: str, games: Any, hands: Any, player_metadat
     game_id = hands[hand_id, 'game_id']
     game_type = games[game_id, 'game_type']
 
-    cards = evaluator.get_deck()
-
     n_cards_total = games[game_id, 'n_cards_total']
     n_hole_cards = games[game_id, 'n_hole_cards']
 
+    # Only draw the cards this hand uses
+    n_players = len(active_players)
+    if game_type == STUD_POKER:
+        n_cards = n_cards_total * n_players
+    elif game_type == HOLDEM_POKER:
+        n_cards = 5 + 2 * n_players
+    elif game_type == OMAHA_POKER:
+        n_cards = 5 + 4 * n_players
+    else:
+        n_cards = n_players
+    cards = evaluator.deal(n_cards=n_cards, n_decks=games[game_id, 'n_decks'] or 1, as_strings=True)
+
     if game_type == HOLDEM_POKER or game_type == OMAHA_POKER:
         community_cards = [",".join(cards[0:3]), cards[3], cards[4]]
+        # Every player's pad for each community card, applied in one go
+        community_pads = [[], [], []]
     else:
         community_cards = None
 
+    # One draw for the hand, every pad and session key is derived from it
+    hand_seed = otp.generate_otp(HAND_SEED_BITS)
+    # Every player's commitments, for the hand's merkle root
+    commitments = {}
+
     for i in range(len(active_players)):
         player = active_players[i]
-        player_key = player_metadata[player, 'public_rsa_key']
+        player_key = rsa.public_key(metadata=player_metadata, user=player)
         assert player_key is not None, f'Player {player} has not setup their encryption keys.'
-        keys = player_key.split('|')
-        assert len(keys) == 2, 'Invalid keys'
+        n = player_key['n']
+        e = player_key['e']
+        k = player_key['k']
 
         if game_type == ONE_CARD_POKER:
             player_hand = cards[i: i+1]
@@ -153,267 +241,338 @@ def deal_cards(hand_id: str, dealer: str, games: Any, hands: Any, player_metadat
             public_hand_str = None
 
         salt = str(random.randint(0, MAX_RANDOM_NUMBER))
+        player_hand_str_with_salt = f'{player_hand_str}:{salt}'
+        # hand:salt|pad1:salt1|pad2:salt2|pad3:salt3
+        payload = [player_hand_str_with_salt]
 
+        commitments[player] = []
         if community_cards is not None:
-            # TODO make this more efficient
-            pad1 = otp.generate_otp(80)
-            pad2 = otp.generate_otp(20)
-            pad3 = otp.generate_otp(20)
-            salt1 = str(random.randint(0, MAX_RANDOM_NUMBER))
-            salt2 = str(random.randint(0, MAX_RANDOM_NUMBER))
-            salt3 = str(random.randint(0, MAX_RANDOM_NUMBER))
-            if i == 0:
-                community_cards[0] = otp.encrypt(community_cards[0], pad1, safe=False)
-                community_cards[1] = otp.encrypt(community_cards[1], pad2, safe=False)
-                community_cards[2] = otp.encrypt(community_cards[2], pad3, safe=False)
-            else:
-                community_cards[0] = otp.encrypt_hex(community_cards[0], pad1, safe=False)
-                community_cards[1] = otp.encrypt_hex(community_cards[1], pad2, safe=False)
-                community_cards[2] = otp.encrypt_hex(community_cards[2], pad3, safe=False)
-            pad1_with_salt = f'{pad1}:{salt1}'
-            pad2_with_salt = f'{pad2}:{salt2}'
-            pad3_with_salt = f'{pad3}:{salt3}'
-            encrypted_pad1 = rsa.encrypt(
-                message_str=pad1_with_salt,
-                n=int(keys[0]),
-                e=int(keys[1])    
-            )
-            encrypted_pad2 = rsa.encrypt(
-                message_str=pad2_with_salt,
-                n=int(keys[0]),
-                e=int(keys[1])    
-            )
-            encrypted_pad3 = rsa.encrypt(
-                message_str=pad3_with_salt,
-                n=int(keys[0]),
-                e=int(keys[1])    
-            )
-            hands[hand_id, player, 'player_encrypted_pad1'] = encrypted_pad1
-            hands[hand_id, player, 'player_encrypted_pad2'] = encrypted_pad2
-            hands[hand_id, player, 'player_encrypted_pad3'] = encrypted_pad3
-            hands[hand_id, player, 'house_encrypted_pad1'] = hashlib.sha3(pad1_with_salt)
-            hands[hand_id, player, 'house_encrypted_pad2'] = hashlib.sha3(pad2_with_salt)
-            hands[hand_id, player, 'house_encrypted_pad3'] = hashlib.sha3(pad3_with_salt)
-
-        player_hand_str_with_salt = f'{player_hand_str}:{salt}'
+            for j in range(len(community_cards)):
+                pad = otp.derive_otp(seed=hand_seed, counter=PADS_PER_PLAYER * i + j, n_bits=COMMUNITY_PAD_BITS[j])
+                community_pads[j].append(pad)
+                pad_with_salt = f'{pad}:{random.randint(0, MAX_RANDOM_NUMBER)}'
+                house_encrypted_pad = hashlib.sha3(pad_with_salt)
+                hands[hand_id, player, f'house_encrypted_pad{j+1}'] = house_encrypted_pad
+                commitments[player].append(house_encrypted_pad)
+                payload.append(pad_with_salt)
+
+        # Seal the payload under a fresh session key and wrap only the key
+        # with the player's personal keys: wrapped_key:sealed_payload
+        session_key = otp.derive_otp(seed=hand_seed, counter=PADS_PER_PLAYER * i + 3, n_bits=SESSION_KEY_BITS)
+        wrapped_key = rsa.encrypt(message_str=str(session_key), n=n, e=e, k=k)
+        sealed_payload = otp.seal(message_str="|".join(payload), key=session_key)
+        player_encrypted_hand = f'{wrapped_key}:{sealed_payload}'
 
-        # Encrypt players hand with their personal keys
-        player_encrypted_hand = rsa.encrypt(
-            message_str=player_hand_str_with_salt,
-            n=int(keys[0]),
-            e=int(keys[1])    
-        )
-        
         # For verification purposes
         house_encrypted_hand = hashlib.sha3(player_hand_str_with_salt)
+        commitments[player].insert(0, house_encrypted_hand)
 
         if public_hand_str is not None:
             hands[hand_id, player, 'public_hand'] = public_hand_str
         hands[hand_id, player, 'player_encrypted_hand'] = player_encrypted_hand
         hands[hand_id, player, 'house_encrypted_hand'] = house_encrypted_hand
 
+    if community_cards is not None:
+        for j in range(len(community_cards)):
+            community_cards[j] = otp.layer_encrypt(message_str=community_cards[j], otps=community_pads[j])
+
     # Update hand state
-    all_in = hands[hand_id, 'all_in']
     dealer_index = active_players.index(dealer)
     split = (dealer_index+1)%len(active_players)
     ordered_players = active_players[split:] + active_players[:split]
-    next_better = get_next_better(active_players, [], all_in, dealer)
-    hands[hand_id, 'next_better'] = next_better
-    hands[hand_id, 'active_players'] = ordered_players
+    set_hand_value(state, 'active_players', ordered_players)
+    seat_players(state, ordered_players)
+    next_better = get_next_better(state, dealer)
+    set_hand_value(state, 'next_better', next_better)
+    save_hand_state(state)
     if community_cards is not None:
         hands[hand_id, 'community_encrypted'] = community_cards
         hands[hand_id, 'community'] = [None, None, None]
 
+    # Leaves follow the betting order: each player's hand, then their pads
+    leaves = []
+    for player in ordered_players:
+        fields = commitment_fields(len(commitments[player]))
+        for j in range(len(fields)):
+            leaves.append(commitment_leaf(player, fields[j], commitments[player][j]))
+    hands[hand_id, 'commitment_root'] = merkle_root(leaves)
+
+
+def commitment_fields(n_commitments: int) -> list:
+    return ['hand'] + [f'pad{j}' for j in range(1, n_commitments)]
+
+
+def commitment_leaf(player: str, field: str, commitment: str) -> str:
+    return hashlib.sha3(f'{player}:{field}:{commitment}')
+
+
+def merkle_root(leaves: list) -> str:
+    size = 1
+    while size < len(leaves):
+        size *= 2
+    level = leaves + [EMPTY_LEAF] * (size - len(leaves))
+    while len(level) > 1:
+        level = [hashlib.sha3(level[k] + level[k + 1]) for k in range(0, len(level), 2)]
+    return level[0]
+
 
-def find_winners(ranks: dict, players: list) -> list:
-    sorted_rank_values = sorted(ranks.keys(), reverse=True)
-    player_set = set(players)
-    for rank in sorted_rank_values:
-        players_with_rank = ranks[rank]
-        intersection = player_set.intersection(set(players_with_rank))
-        if len(intersection) > 0:
-            # Found players
-            winners = list(intersection)
-            break
-    return winners
+@export
+def verify_commitments(hand_id: str, reveals: list, hands: Any) -> list:
+    """Checks revealed values against the hand's commitment root. Each
+    reveal is {'player', 'field', 'value', 'index', 'proof'}: field is 'hand'
+    or 'pad1' to 'pad3', value the "value:salt" string that was committed to,
+    index the leaf's position and proof the sibling hashes from the leaf up.
+    Returns whether each one checks out."""
+    root = hands[hand_id, 'commitment_root']
+    assert root is not None, 'This hand has no commitment root.'
+    results = []
+    for reveal in reveals:
+        node = commitment_leaf(reveal['player'], reveal['field'], hashlib.sha3(reveal['value']))
+        index = reveal['index']
+        proof = reveal['proof']
+        if index < 0 or index >> len(proof) != 0:
+            results.append(False)
+            continue
+        for sibling in proof:
+            if index & 1:
+                node = hashlib.sha3(sibling + node)
+            else:
+                node = hashlib.sha3(node + sibling)
+            index >>= 1
+        results.append(node == root)
+    return results
+
+
+def players_mask(seats: dict, players: list) -> int:
+    mask = 0
+    for player in players:
+        mask |= 1 << seats[player]
+    return mask
+
+
+def seat_players(state: dict, players: list) -> dict:
+    # Seats follow the betting order, which is fixed once the hand is dealt.
+    # Folded and all in players are kept as bitmasks over the seats next to
+    # the lists, so turn order never has to scan them.
+    seats = {players[i]: i for i in range(len(players))}
+    set_hand_value(state, 'seats', seats)
+    set_hand_value(state, 'folded_mask', players_mask(seats, hand_value(state, 'folded')))
+    set_hand_value(state, 'all_in_mask', players_mask(seats, hand_value(state, 'all_in')))
+    return seats
+
+
+def load_seats(state: dict) -> dict:
+    seats = hand_value(state, 'seats')
+    if seats is None:
+        # Hand dealt before seats were kept
+        seats = seat_players(state, hand_value(state, 'active_players'))
+    return seats
+
+
+def count_seats(mask: int) -> int:
+    return bin(mask).count('1')
+
+
+def next_seat(mask: int, seat: int) -> int:
+    # First seat after the given one, going round the table, that is set in
+    # the mask, -1 if there is none
+    after = mask >> (seat + 1)
+    if after > 0:
+        return seat + (after & -after).bit_length()
+    if mask > 0:
+        return (mask & -mask).bit_length() - 1
+    return -1
+
+
+def betting_mask(state: dict) -> int:
+    n_seats = len(hand_value(state, 'active_players'))
+    out = hand_value(state, 'folded_mask') | hand_value(state, 'all_in_mask')
+    return ((1 << n_seats) - 1) ^ out
+
+
+def fold_player(state: dict, player: str):
+    bit = 1 << load_seats(state)[player]
+    folded_mask = hand_value(state, 'folded_mask')
+    if folded_mask & bit == 0:
+        set_hand_value(state, 'folded_mask', folded_mask | bit)
+        folded = hand_value(state, 'folded')
+        folded.append(player)
+        set_hand_value(state, 'folded', folded)
+    all_in_mask = hand_value(state, 'all_in_mask')
+    if all_in_mask & bit != 0:
+        set_hand_value(state, 'all_in_mask', all_in_mask ^ bit)
+        all_in = hand_value(state, 'all_in')
+        all_in.remove(player)
+        set_hand_value(state, 'all_in', all_in)
+
+
+def go_all_in(state: dict, player: str):
+    bit = 1 << load_seats(state)[player]
+    all_in_mask = hand_value(state, 'all_in_mask')
+    if all_in_mask & bit == 0:
+        set_hand_value(state, 'all_in_mask', all_in_mask | bit)
+        all_in = hand_value(state, 'all_in')
+        all_in.append(player)
+        set_hand_value(state, 'all_in', all_in)
 
 
-def get_next_better(players: list, folded: list, all_in: list, current_better: str) -> str:
-    if len(folded) >= len(players) - 1:
+def get_next_better(state: dict, current_better: str) -> str:
+    n_seats = len(hand_value(state, 'active_players'))
+    if count_seats(hand_value(state, 'folded_mask')) >= n_seats - 1:
         return None # No one needs to bet, only one player left in the hand
-    if len(players) == len(all_in):
-        return None # No one needs to bet, everyone is all in
-    non_folded_players = [p for p in players if p not in folded and p not in all_in]
-    if len(non_folded_players) == 1:
-        # No need to bet in this case
+    betting = betting_mask(state)
+    if count_seats(betting) <= 1:
+        # No need to bet in this case, everyone else is all in
         return None
-    current_index = non_folded_players.index(current_better)    
-    #assert current_index >= 0, 'Current better has folded, which does not make sense.'
-    return non_folded_players[(current_index + 1) % len(non_folded_players)]
+    seat = next_seat(betting, load_seats(state)[current_better])
+    return hand_value(state, 'active_players')[seat]
 
 
-def handle_done_betting(hand_id: str, game_type: int, next_better: str, active_players: list, folded: list, all_in: list, dealer: str, hands: Any) -> str:
+def handle_done_betting(state: dict, game_type: int, next_better: str, dealer: str) -> str:
     if game_type == HOLDEM_POKER or game_type == OMAHA_POKER:
         # multi rounds
-        round = hands[hand_id, 'round'] or 0
+        round = hand_value(state, 'round') or 0
         round += 1
-        hands[hand_id, 'round'] = round
+        set_hand_value(state, 'round', round)
         if round == 4:
-            hands[hand_id, 'completed'] = True
+            set_hand_value(state, 'completed', True)
         else:
             # Find first available person left of dealer
-            dealer_index = active_players.index(dealer)
-            for i in range(len(active_players) - 1):
-                player = active_players[(dealer_index+i+1)%len(active_players)]
-                if player not in folded and player not in all_in:
-                    next_better = player
-                    break
-            hands[hand_id, f'needs_reveal{round}'] = True            
+            dealer_seat = load_seats(state)[dealer]
+            seat = next_seat(betting_mask(state), dealer_seat)
+            if seat >= 0 and seat != dealer_seat:
+                next_better = hand_value(state, 'active_players')[seat]
+            set_hand_value(state, f'needs_reveal{round}', True)
     else:
-        hands[hand_id, 'completed'] = True
+        set_hand_value(state, 'completed', True)
     return next_better
 
 
-def assertRevealedOtps(player: str, hand_id: str, hands: Any) -> bool:
-    return (hands[hand_id, player, 'pad1'] is not None
-        and hands[hand_id, player, 'pad2'] is not None
-        and hands[hand_id, player, 'pad3'] is not None)
+def assertRevealedOtps(player: str, state: dict) -> bool:
+    return (hand_value(state, 'pad1', player) is not None
+        and hand_value(state, 'pad2', player) is not None
+        and hand_value(state, 'pad3', player) is not None)
 
 @export
 def bet_check_or_fold(hand_id: str, bet: float, player: str, games: Any, hands: Any):    
     assert hands[hand_id, player, 'player_encrypted_hand'] is not None, 'Hand does not exist'
-    assert not hands[hand_id, 'completed'], 'This hand has already completed.'
-    assert hands[hand_id, 'next_better'] == player, 'It is not your turn to bet.'
+    state = load_hand_state(hand_id, hands)
+    assert not hand_value(state, 'completed'), 'This hand has already completed.'
+    assert hand_value(state, 'next_better') == player, 'It is not your turn to bet.'
 
-    active_players = hands[hand_id, 'active_players']
-    folded = hands[hand_id, 'folded']
-    all_in = hands[hand_id, 'all_in']
+    active_players = hand_value(state, 'active_players')
+    seats = load_seats(state)
 
-    call_bet = hands[hand_id, 'current_bet'] or 0
-    player_previous_bet  = hands[hand_id, player, 'bet'] or 0
+    call_bet = hand_value(state, 'current_bet') or 0
+    player_previous_bet  = hand_value(state, 'bet', player) or 0
     dealer = hands[hand_id, 'dealer']
 
-    next_better = get_next_better(active_players, folded, all_in, player)
+    next_better = get_next_better(state, player)
 
     if next_better is None:
         # No need to bet, this is the end of the hand
-        hands[hand_id, 'completed'] = True
+        set_hand_value(state, 'completed', True)
     else:
-        next_index = active_players.index(next_better)
-        current_index = active_players.index(player)
-        possible_round_end = next_index < current_index
+        possible_round_end = seats[next_better] < seats[player]
         
         game_id = hands[hand_id, 'game_id']
         game_type = games[game_id, 'game_type']
 
         if game_type == OMAHA_POKER or game_type == HOLDEM_POKER:
             # Make sure community cards are revealed
-            round = hands[hand_id, 'round']
+            round = hand_value(state, 'round')
             if round is not None and round in (TURN, FLOP, RIVER):
-                assert not hands[hand_id, f'needs_reveal{round}'], 'Required community cards have not been revealed.'
+                assert not hand_value(state, f'needs_reveal{round}'), 'Required community cards have not been revealed.'
 
-        next_players_bet = hands[hand_id, next_better, 'bet']
+        next_players_bet = hand_value(state, 'bet', next_better)
         if bet < 0:
             # Folding
             if game_type == OMAHA_POKER or game_type == HOLDEM_POKER:
                 # Make sure they revealed
-                assert assertRevealedOtps(player, hand_id, hands), 'Please reveal your portion of the community cards.'
-            folded.append(player)
-            hands[hand_id, 'folded'] = folded
-            if player in all_in:
-                all_in.remove(player)
-                hands[hand_id, 'all_in'] = all_in
-            if len(folded) == len(active_players) - 1:
-                hands[hand_id, 'completed'] = True
+                assert assertRevealedOtps(player, state), 'Please reveal your portion of the community cards.'
+            fold_player(state, player)
+            if count_seats(hand_value(state, 'folded_mask')) == len(active_players) - 1:
+                set_hand_value(state, 'completed', True)
             current_bet = call_bet
         else:
             if bet == 0:
                 # Checking
-                max_bet = hands[hand_id, player, 'max_bet']
-                if max_bet == player_previous_bet and player not in all_in:
-                    all_in.append(player)
-                    hands[hand_id, 'all_in'] = all_in
+                max_bet = hand_value(state, 'max_bet', player)
+                if max_bet == player_previous_bet:
+                    go_all_in(state, player)
                 current_bet = player_previous_bet
             else:
                 # Betting
                 assert games[game_id, player] >= bet, 'You do not have enough chips to make this bet'
                 bet_type = games[game_id, 'bet_type']
                 if bet_type == POT_LIMIT:
-                    pot = hands[hand_id, 'pot']
+                    pot = hand_value(state, 'pot')
                     assert bet <= pot, f'Cannot overbet the pot in pot-limit mode.'
                 current_bet = player_previous_bet + bet
-                max_bet = hands[hand_id, player, 'max_bet']
-                if max_bet == current_bet and player not in all_in:
-                    all_in.append(player)
-                    hands[hand_id, 'all_in'] = all_in
-                hands[hand_id, player, 'bet'] = current_bet
-                hands[hand_id, 'current_bet'] = current_bet
-                hands[hand_id, 'pot'] += bet
+                max_bet = hand_value(state, 'max_bet', player)
+                if max_bet == current_bet:
+                    go_all_in(state, player)
+                set_hand_value(state, 'bet', current_bet, player)
+                set_hand_value(state, 'current_bet', current_bet)
+                set_hand_value(state, 'pot', hand_value(state, 'pot') + bet)
                 games[game_id, player] -= bet
             assert max_bet == current_bet or current_bet >= call_bet, 'Current bet is above your bet and you did not go all in.'                    
         if possible_round_end and next_players_bet is not None and next_players_bet == current_bet:            
-            next_better = handle_done_betting(hand_id, game_type, next_better, active_players, folded, all_in, dealer, hands)
+            next_better = handle_done_betting(state, game_type, next_better, dealer)
 
-    hands[hand_id, 'next_better'] = next_better
+    set_hand_value(state, 'next_better', next_better)
+    save_hand_state(state)
 
 
 @export
 def reveal_otp(hand_id: str, pad: int, salt: int, index: int, player: str, hands: Any):
     assert index in (FLOP, TURN, RIVER), 'Invalid index.'
-    active_players = hands[hand_id, 'active_players']
-    assert active_players is not None, 'This hand does not exist.'
-    player_index = active_players.index(player)
-    assert player_index >= 0, 'You are not in this hand.'
+    state = load_hand_state(hand_id, hands)
+    assert hand_value(state, 'active_players') is not None, 'This hand does not exist.'
+    assert player in load_seats(state), 'You are not in this hand.'
     # verify authenticity of key
     assert hashlib.sha3(f'{pad}:{salt}') == hands[hand_id, player, f'house_encrypted_pad{index}'], 'Invalid key or salt.'
-    hands[hand_id, player, f'pad{index}'] = pad
+    set_hand_value(state, f'pad{index}', pad, player)
+    save_hand_state(state)
 
 
 @export
 def reveal(hand_id: str, index: int, hands: Any) -> str:
     assert index in (FLOP, TURN, RIVER), 'Invalid index.'
-    active_players = hands[hand_id, 'active_players']
+    state = load_hand_state(hand_id, hands)
+    active_players = hand_value(state, 'active_players')
     community = hands[hand_id, 'community']
     enc = hands[hand_id, 'community_encrypted'][index-1]
-    n_players = len(active_players)
-    for i in range(n_players):
-        player = active_players[-1-i]
-        pad = hands[hand_id, player, f'pad{index}']
+    pads = []
+    for player in active_players:
+        pad = hand_value(state, f'pad{index}', player)
         assert pad is not None, f'Player {player} has not revealed their pad.'
-        if i != n_players - 1:
-            enc = otp.decrypt_hex(
-                encrypted_str=enc,
-                otp=int(pad),
-                safe=False
-            )
-        else:
-            enc = otp.decrypt(
-                encrypted_str=enc,
-                otp=int(pad),
-                safe=False
-            )
+        pads.append(int(pad))
+    enc = otp.layer_decrypt(encrypted_str=enc, otps=pads)
     community[index-1] = enc
     hands[hand_id, 'community'] = community
-    hands[hand_id, f'needs_reveal{index}'] = False
+    set_hand_value(state, f'needs_reveal{index}', False)
+    save_hand_state(state)
     return enc
 
 
 @export
 def verify_hand(hand_id: str, player_hand_str: str, player: str, games: Any, hands: Any) -> str:
-    assert hands[hand_id, 'completed'], 'This hand has not completed yet.'
-    folded = hands[hand_id, 'folded']
+    state = load_hand_state(hand_id, hands)
+    assert hand_value(state, 'completed'), 'This hand has not completed yet.'
+    folded = hand_value(state, 'folded')
     assert player not in folded, 'No need to verify your hand because you folded.'
-    active_players = hands[hand_id, 'active_players']
+    active_players = hand_value(state, 'active_players')
     assert player in active_players, 'You are not an active player in this hand.'
 
     # Check if player has bet enough
-    bet_should_equal = hands[hand_id, 'current_bet']
+    bet_should_equal = hand_value(state, 'current_bet')
     assert bet_should_equal is not None, 'There is no current bet.'
 
-    player_bet = hands[hand_id, player, 'bet']
+    player_bet = hand_value(state, 'bet', player)
     assert player_bet is not None, 'You have not bet yet.'
 
-    assert bet_should_equal == player_bet or player in hands[hand_id, 'all_in'], 'Bets have not stabilized.'
+    assert bet_should_equal == player_bet or player in hand_value(state, 'all_in'), 'Bets have not stabilized.'
 
     # For verification purposes
     house_encrypted_hand = hashlib.sha3(player_hand_str)
@@ -425,8 +584,8 @@ def verify_hand(hand_id: str, player_hand_str: str, player: str, games: Any, han
 
     if not verified:
         # BAD ACTOR NEEDS TO BE PUNISHED
-        folded.append(player)
-        hands[hand_id, 'folded'] = folded
+        fold_player(state, player)
+        save_hand_state(state)
 
         return 'Verification failed. Your hand has been forfeited.'
 
@@ -437,16 +596,14 @@ def verify_hand(hand_id: str, player_hand_str: str, player: str, games: Any, han
         game_type = games[game_id, 'game_type']
 
         if game_type == BLIND_POKER:
-            j = 0
-            for p in active_players:
-                if p != player:
-                    if p not in folded:
-                        card = cards[j]
-                        rank = evaluator.evaluate([card])
-                        if hands[hand_id, p, 'rank'] is None:
-                            hands[hand_id, p, 'rank'] = rank
-                            hands[hand_id, p, 'hand'] = card
-                    j += 1        
+            others = [p for p in active_players if p != player]
+            ranks = evaluator.evaluate_many(hands=[[card] for card in cards[:len(others)]])
+            for j in range(len(others)):
+                p = others[j]
+                if p not in folded:
+                    if hand_value(state, 'rank', p) is None:
+                        set_hand_value(state, 'rank', ranks[j], p)
+                        hands[hand_id, p, 'hand'] = cards[j]
         else:
             if game_type == HOLDEM_POKER or game_type == OMAHA_POKER:
                 # Add community cards
@@ -456,91 +613,45 @@ def verify_hand(hand_id: str, player_hand_str: str, player: str, games: Any, han
                 cards.extend(community[0].split(','))
                 cards.extend(community[1:])
             rank = evaluator.evaluate(cards)
-            hands[hand_id, player, 'rank'] = rank
+            set_hand_value(state, 'rank', rank, player)
             hands[hand_id, player, 'hand'] = cards
 
+        save_hand_state(state)
         return 'Verification succeeded.'
 
 
-def calculate_ranks(hand_id: str, players: list, hands: Any) -> dict:
+def calculate_ranks(state: dict, players: list) -> dict:
     ranks = {}
     for p in players:
-        rank = hands[hand_id, p, 'rank']
+        rank = hand_value(state, 'rank', p)
         assert rank is not None, f'Player {p} has not verified their hand yet.'
-        if rank not in ranks:
-            ranks[rank] = []
-        ranks[rank].append(p)
+        ranks[p] = rank
     return ranks
 
 
 @export
 def payout_hand(hand_id: str, games: Any, hands: Any):
-    pot = hands[hand_id, 'pot']
+    state = load_hand_state(hand_id, hands)
+    pot = hand_value(state, 'pot')
     assert pot > 0, 'There is no pot to claim!'
     assert not hands[hand_id, 'payed_out'], 'This hand has already been payed out.'
     
-    folded = hands[hand_id, 'folded']
-    all_in = hands[hand_id, 'all_in']
-    active_players = hands[hand_id, 'active_players']
+    folded = hand_value(state, 'folded')
+    active_players = hand_value(state, 'active_players')
 
     remaining = [p for p in active_players if p not in folded]
     assert len(remaining) > 0, 'There are no remaining players.'
 
-    payouts = {}
-
     if len(remaining) == 1:
         # Just pay out, everyone else folded
-        payouts[remaining[0]] = pot
+        payouts = {remaining[0]: pot}
     else:
-        ranks = calculate_ranks(hand_id, remaining, hands)
-        if len(all_in) > 0:
-            # Need to calculate split pots
-            all_in_map = {}
-            for player in all_in:
-                # Check all in amount
-                amount = hands[hand_id, player, 'max_bet']
-                all_in_map[player] = amount
-            all_pots = sorted(all_in_map.values())
-            unique_pots = []
-            for bet in all_pots:
-                if bet not in unique_pots:
-                    unique_pots.append(bet)
-            total_payed_out = 0
-            previous_pot_payout = 0
-            for bet in unique_pots:
-                players_in_pot = []
-                for player in remaining:
-                    if player not in all_in_map or all_in_map[player] >= bet:
-                        players_in_pot.append(player)
-                pot_winners = find_winners(ranks, players_in_pot)
-                pot_payout = (bet * len(players_in_pot)) - previous_pot_payout
-                total_payed_out += pot_payout
-                payout = pot_payout / len(pot_winners)
-                for winner in pot_winners:
-                    if winner not in payouts:
-                        payouts[winner] = 0
-                    payouts[winner] += payout     
-                previous_pot_payout += pot_payout
-                      
-            remaining_to_payout = pot - total_payed_out
-            not_all_in = set(remaining).difference(set(all_in))
-            assert remaining_to_payout >= 0, 'Invalid remaining to payout.'
-            assert remaining_to_payout == 0 or len(not_all_in) > 0, 'Invalid state when calculating side pots.'            
-            if remaining_to_payout > 0:
-                if len(not_all_in) == 1:
-                    winners = not_all_in
-                else:
-                    winners = find_winners(ranks, not_all_in)
-                payout = remaining_to_payout / len(winners)
-                for winner in winners:
-                    if winner not in payouts:
-                        payouts[winner] = 0
-                    payouts[winner] += payout
-        else:
-            winners = find_winners(ranks, remaining)
-            payout = pot / len(winners)
-            for winner in winners:
-                payouts[winner] = payout
+        # Main and side pots, from what every player put in
+        payouts = pots.settle(
+            contributions={p: hand_value(state, 'bet', p) or 0 for p in active_players},
+            ranks=calculate_ranks(state, remaining),
+            order=active_players
+        )
 
     game_id = hands[hand_id, 'game_id']
     for player, payout in payouts.items():
@@ -553,40 +664,48 @@ def payout_hand(hand_id: str, games: Any, hands: Any):
 
 @export
 def leave_hand(game_id: str, hand_id: str, player: str, force: bool, hands: Any, games: Any):
-    active_players = hands[hand_id, 'active_players'] or []
+    state = load_hand_state(hand_id, hands)
+    active_players = hand_value(state, 'active_players') or []
     if player in active_players:
         if not force:
             dealer = hands[hand_id, 'dealer']
             assert player != dealer, 'Dealer cannot leave hand.'            
-        folded = hands[hand_id, 'folded']
-        all_in = hands[hand_id, 'all_in']
-        next_better = hands[hand_id, 'next_better']
+        next_better = hand_value(state, 'next_better')
         # Check game type
         game_type = games[game_id, 'game_type']
         if game_type == OMAHA_POKER or game_type == HOLDEM_POKER:
-            has_revealed = assertRevealedOtps(player, hand_id, hands)
+            has_revealed = assertRevealedOtps(player, state)
             if force and not has_revealed:
                 # Have to undo the hand :(
-                force_undo_hand(game_id, hand_id, hands, games)
+                force_undo_hand(game_id, state, games)
             else:
                 assert has_revealed, 'Please reveal your portion of the community cards.'
         if next_better == player:
-            next_better = get_next_better(active_players, folded, all_in, player)
-            hands[hand_id, 'next_better'] = next_better
-        if player not in folded:
-            folded.append(player)
-            hands[hand_id, 'folded'] = folded
-        if player in all_in:
-            all_in.remove(player)
-            hands[hand_id, 'all_in'] = all_in
-
-
-def force_undo_hand(game_id: str, hand_id: str, hands: Any, games: Any):
-    active_players = hands[hand_id, 'active_players'] or []
+            next_better = get_next_better(state, player)
+            set_hand_value(state, 'next_better', next_better)
+        if hand_value(state, 'seats') is not None:
+            fold_player(state, player)
+        else:
+            # Not dealt yet, there are no seats
+            folded = hand_value(state, 'folded')
+            all_in = hand_value(state, 'all_in')
+            if player not in folded:
+                folded.append(player)
+                set_hand_value(state, 'folded', folded)
+            if player in all_in:
+                all_in.remove(player)
+                set_hand_value(state, 'all_in', all_in)
+        save_hand_state(state)
+
+
+def force_undo_hand(game_id: str, state: dict, games: Any):
+    hands = state['hands']
+    hand_id = state['hand_id']
+    active_players = hand_value(state, 'active_players') or []
     hands[hand_id, 'force_undo'] = True
-    hands[hand_id, 'completed'] = True
+    set_hand_value(state, 'completed', True)
     hands[hand_id, 'payed_out'] = True
     for player in active_players:
-        bet = hands[hand_id, player, 'bet'] or 0
+        bet = hand_value(state, 'bet', player) or 0
         if bet > 0:
-            games[game_id, player] += bet
\ No newline at end of file
+            games[game_id, player] += bet
@@ -0,0 +1,340 @@
+# con_poker_tournament_controller_v1
+# owner: con_poker_card_games_v4
+
+I = importlib
+
+random.seed()
+
+ONE_CARD_POKER = 0
+BLIND_POKER = 1
+STUD_POKER = 2
+HOLDEM_POKER = 3
+OMAHA_POKER = 4
+ALL_GAME_TYPES = [ONE_CARD_POKER, BLIND_POKER, STUD_POKER, HOLDEM_POKER, OMAHA_POKER]
+NO_LIMIT = 0
+POT_LIMIT = 1
+ALL_BETTING_TYPES = [NO_LIMIT, POT_LIMIT]
+
+REGISTERING = 'registering'
+RUNNING = 'running'
+FINISHED = 'finished'
+
+
+def get_tournament_and_assert_exists(tournament_id: str, tournaments: Any) -> str:
+    status = tournaments[tournament_id, 'status']
+    assert status is not None, f'Tournament {tournament_id} does not exist.'
+    return status
+
+
+def create_tournament_id(name: str) -> str:
+    return hashlib.sha3(":".join(['tournament', name, str(now)]))
+
+
+def create_table_id(tournament_id: str, index: int) -> str:
+    return hashlib.sha3(f'{tournament_id}:{index}')
+
+
+def max_table_size(game_type: int, n_cards_total: int) -> int:
+    # Same limits as ante_up in the hand controller
+    if game_type == STUD_POKER:
+        return 52 // n_cards_total
+    if game_type == HOLDEM_POKER or game_type == OMAHA_POKER:
+        return 10
+    return 50
+
+
+def n_tables_needed(n_players: int, table_size: int) -> int:
+    return -(-n_players // table_size)
+
+
+@export
+def create_tournament(name: str,
+                      game_config: dict,
+                      tournament_config: dict,
+                      creator: str,
+                      tournaments: Any) -> str:
+
+    game_type = game_config['game_type']
+    bet_type = game_config['bet_type']
+    assert game_type in ALL_GAME_TYPES, f'Invalid game type: {game_type}.'
+    assert bet_type in ALL_BETTING_TYPES, f'Invalid betting type: {bet_type}.'
+    n_cards_total = game_config.get('n_cards_total')
+    if game_type == STUD_POKER:
+        n_hole_cards = game_config.get('n_hole_cards')
+        assert n_cards_total == 5 or n_cards_total == 7, 'n_cards_total must equal 5 or 7.'
+        assert n_hole_cards is not None and 0 < n_hole_cards <= n_cards_total, 'n_hole_cards must be between 1 and n_cards_total.'
+
+    buy_in = tournament_config['buy_in']
+    starting_chips = tournament_config['starting_chips']
+    table_size = tournament_config['table_size']
+    blind_schedule = tournament_config['blind_schedule']
+    level_minutes = tournament_config['level_minutes']
+    payouts = tournament_config['payouts']
+    assert buy_in >= 0, 'Buy in must be non-negative.'
+    assert starting_chips > 0, 'Starting chips must be positive.'
+    max_size = max_table_size(game_type, n_cards_total)
+    assert 2 <= table_size <= max_size, f'table_size must be between 2 and {max_size}.'
+    assert len(blind_schedule) > 0, 'The blind schedule needs at least one level.'
+    assert all([ante >= 0 for ante in blind_schedule]), 'Antes must be non-negative.'
+    assert level_minutes > 0, 'level_minutes must be positive.'
+    assert len(payouts) > 0 and all([p > 0 for p in payouts]), 'Payouts must be positive percentages.'
+    assert sum(payouts) == 100, 'Payouts must add up to 100 percent.'
+
+    tournament_id = create_tournament_id(name=name)
+    assert tournaments[tournament_id, 'status'] is None, f'Tournament {tournament_id} has already been created.'
+
+    tournaments[tournament_id, 'status'] = REGISTERING
+    tournaments[tournament_id, 'name'] = name
+    tournaments[tournament_id, 'creator'] = creator
+    tournaments[tournament_id, 'game_config'] = game_config
+    tournaments[tournament_id, 'buy_in'] = buy_in
+    tournaments[tournament_id, 'starting_chips'] = starting_chips
+    tournaments[tournament_id, 'table_size'] = table_size
+    tournaments[tournament_id, 'blind_schedule'] = blind_schedule
+    tournaments[tournament_id, 'level_minutes'] = level_minutes
+    tournaments[tournament_id, 'payouts'] = payouts
+    tournaments[tournament_id, 'players'] = []
+    tournaments[tournament_id, 'prize_pool'] = 0
+    return tournament_id
+
+
+@export
+def register(tournament_id: str, player: str, tournaments: Any):
+    status = get_tournament_and_assert_exists(tournament_id, tournaments)
+    assert status == REGISTERING, 'Registration for this tournament has closed.'
+    players = tournaments[tournament_id, 'players']
+    assert player not in players, 'You are already registered for this tournament.'
+    players.append(player)
+    tournaments[tournament_id, 'players'] = players
+    buy_in = tournaments[tournament_id, 'buy_in']
+    if buy_in > 0:
+        tournaments[tournament_id, 'prize_pool'] += buy_in
+        I.import_module(ctx.owner).force_transfer(player=player, amount=buy_in)
+
+
+@export
+def unregister(tournament_id: str, player: str, tournaments: Any):
+    status = get_tournament_and_assert_exists(tournament_id, tournaments)
+    assert status == REGISTERING, 'The tournament has already started.'
+    players = tournaments[tournament_id, 'players']
+    assert player in players, 'You are not registered for this tournament.'
+    players.remove(player)
+    tournaments[tournament_id, 'players'] = players
+    buy_in = tournaments[tournament_id, 'buy_in']
+    if buy_in > 0:
+        tournaments[tournament_id, 'prize_pool'] -= buy_in
+        I.import_module(ctx.owner).force_withdraw(player=player, amount=buy_in)
+
+
+def open_table(tournament_id: str, table_id: str, players: list, games: Any, tournaments: Any):
+    # A tournament table is an ordinary game, so hands run through the hand
+    # controller unchanged. Everything it needs lives under its own game id.
+    game_config = tournaments[tournament_id, 'game_config']
+    game_type = game_config['game_type']
+    games[table_id, 'players'] = players
+    games[table_id, 'name'] = tournaments[tournament_id, 'name']
+    games[table_id, 'ante'] = tournaments[tournament_id, 'blind_schedule'][0]
+    games[table_id, 'creator'] = tournaments[tournament_id, 'creator']
+    games[table_id, 'invitees'] = []
+    games[table_id, 'public'] = False
+    games[table_id, 'game_type'] = game_type
+    games[table_id, 'bet_type'] = game_config['bet_type']
+    games[table_id, 'packed_state'] = True
+    games[table_id, 'tournament'] = tournament_id
+    if game_type == STUD_POKER:
+        games[table_id, 'n_cards_total'] = game_config['n_cards_total']
+        games[table_id, 'n_hole_cards'] = game_config['n_hole_cards']
+    starting_chips = tournaments[tournament_id, 'starting_chips']
+    for player in players:
+        games[table_id, player] = starting_chips
+        tournaments[tournament_id, player, 'table'] = table_id
+
+
+@export
+def start_tournament(tournament_id: str, caller: str, games: Any, tournaments: Any):
+    status = get_tournament_and_assert_exists(tournament_id, tournaments)
+    assert status == REGISTERING, 'The tournament has already started.'
+    assert caller == tournaments[tournament_id, 'creator'], 'Only the tournament creator can start it.'
+    players = tournaments[tournament_id, 'players']
+    assert len(players) > 1, 'A tournament needs at least two players.'
+
+    # Random seats, dealt round robin so table sizes differ by at most one
+    random.shuffle(players)
+    n_tables = n_tables_needed(len(players), tournaments[tournament_id, 'table_size'])
+    tournaments[tournament_id, 'n_tables'] = n_tables
+    tournaments[tournament_id, 'min_seated'] = len(players) // n_tables
+    tournaments[tournament_id, 'max_seated'] = n_tables_needed(len(players), n_tables)
+    for i in range(n_tables):
+        table_id = create_table_id(tournament_id, i)
+        table_players = players[i::n_tables]
+        open_table(tournament_id, table_id, table_players, games, tournaments)
+        set_seated(tournament_id, table_id, len(table_players), tournaments)
+
+    tournaments[tournament_id, 'n_players'] = len(players)
+    tournaments[tournament_id, 'paid_out'] = 0
+    tournaments[tournament_id, 'started_at'] = now
+    tournaments[tournament_id, 'status'] = RUNNING
+
+
+def current_ante(tournament_id: str, tournaments: Any) -> float:
+    blind_schedule = tournaments[tournament_id, 'blind_schedule']
+    elapsed = (now - tournaments[tournament_id, 'started_at']).seconds
+    level = int(elapsed // (tournaments[tournament_id, 'level_minutes'] * 60))
+    return blind_schedule[min(level, len(blind_schedule) - 1)]
+
+
+@export
+def prepare_hand(game_id: str, games: Any, tournaments: Any):
+    tournament_id = games[game_id, 'tournament']
+    assert tournaments[tournament_id, 'status'] == RUNNING, 'This tournament is not running.'
+    # Move the table to the current level. A short stack antes what it has
+    # and is all in, the side pots take care of the rest.
+    games[game_id, 'ante'] = current_ante(tournament_id, tournaments)
+    # Players busting in this hand are placed by what they started it with
+    games[game_id, 'starting_stacks'] = {p: games[game_id, p] for p in games[game_id, 'players']}
+
+
+def place_prize(tournament_id: str, place: int, tournaments: Any) -> float:
+    payouts = tournaments[tournament_id, 'payouts']
+    if place > len(payouts):
+        return 0
+    return tournaments[tournament_id, 'prize_pool'] * payouts[place - 1] / 100
+
+
+def award_place(tournament_id: str, player: str, place: int, prize: float, tournaments: Any):
+    tournaments[tournament_id, player, 'place'] = place
+    tournaments[tournament_id, player, 'table'] = None
+    if prize > 0:
+        tournaments[tournament_id, player, 'prize'] = prize
+        tournaments[tournament_id, 'paid_out'] += prize
+        I.import_module(ctx.owner).force_withdraw(player=player, amount=prize)
+
+
+def place_busted(tournament_id: str, busted: list, starting_stacks: dict, n_players: int, tournaments: Any):
+    # The smallest starting stack takes the worst place. Players who started
+    # the hand level tie, they all take the best of their places and split
+    # the prizes of those places evenly.
+    def sort(player):
+        return starting_stacks.get(player, 0)
+    busted = sorted(busted, key=sort)
+    i = 0
+    while i < len(busted):
+        j = i + 1
+        while j < len(busted) and sort(busted[j]) == sort(busted[i]):
+            j += 1
+        place = n_players - (j - i) + 1
+        prizes = [place_prize(tournament_id, p, tournaments) for p in range(place, n_players + 1)]
+        for player in busted[i:j]:
+            award_place(tournament_id, player, place, sum(prizes) / (j - i), tournaments)
+        n_players = place - 1
+        i = j
+    return n_players
+
+
+def move_player(tournament_id: str, player: str, source: str, destination: str, games: Any, tournaments: Any):
+    # The destination may be in the middle of a hand, joining its player
+    # list only seats them from the next hand on
+    games[destination, player] = games[source, player]
+    games[source, player] = 0
+    players = games[destination, 'players']
+    players.append(player)
+    games[destination, 'players'] = players
+    tournaments[tournament_id, player, 'table'] = destination
+
+
+def set_seated(tournament_id: str, table_id: str, n_seated: int, tournaments: Any):
+    # Tables are kept in buckets by how many are seated, with the smallest
+    # and largest size next to them, so a table finds out whether it needs
+    # balancing without reading the others. 0 closes the table.
+    before = tournaments[tournament_id, table_id, 'seated']
+    if before == n_seated:
+        return
+    if before is not None and before > 0:
+        tables = tournaments[tournament_id, 'tables', before]
+        tables.remove(table_id)
+        tournaments[tournament_id, 'tables', before] = tables
+    tournaments[tournament_id, table_id, 'seated'] = n_seated
+    low = tournaments[tournament_id, 'min_seated']
+    high = tournaments[tournament_id, 'max_seated']
+    if n_seated > 0:
+        tables = tournaments[tournament_id, 'tables', n_seated] or []
+        tables.append(table_id)
+        tournaments[tournament_id, 'tables', n_seated] = tables
+        low = min(low, n_seated)
+        high = max(high, n_seated)
+    else:
+        tournaments[tournament_id, 'n_tables'] -= 1
+    while low <= high and len(tournaments[tournament_id, 'tables', low] or []) == 0:
+        low += 1
+    while high >= low and len(tournaments[tournament_id, 'tables', high] or []) == 0:
+        high -= 1
+    tournaments[tournament_id, 'min_seated'] = low
+    tournaments[tournament_id, 'max_seated'] = high
+
+
+def smallest_table(tournament_id: str, exclude: str, tournaments: Any) -> str:
+    high = tournaments[tournament_id, 'max_seated']
+    n_seated = tournaments[tournament_id, 'min_seated']
+    while n_seated <= high:
+        for table_id in tournaments[tournament_id, 'tables', n_seated] or []:
+            if table_id != exclude:
+                return table_id
+        n_seated += 1
+    return None
+
+
+def balance_table(tournament_id: str, game_id: str, players: list, games: Any, tournaments: Any):
+    # Only the table that just finished a hand gives up players, so no hand
+    # in progress ever loses one
+    table_size = tournaments[tournament_id, 'table_size']
+    n_players = tournaments[tournament_id, 'n_players']
+    if tournaments[tournament_id, 'n_tables'] > n_tables_needed(n_players, table_size):
+        # Break this table, everyone fits at the others
+        set_seated(tournament_id, game_id, 0, tournaments)
+        for player in players:
+            destination = smallest_table(tournament_id, game_id, tournaments)
+            move_player(tournament_id, player, game_id, destination, games, tournaments)
+            set_seated(tournament_id, destination, tournaments[tournament_id, destination, 'seated'] + 1, tournaments)
+        players = []
+    else:
+        destination = smallest_table(tournament_id, game_id, tournaments)
+        while destination is not None and \
+                len(players) - tournaments[tournament_id, destination, 'seated'] > 1:
+            player = players.pop()
+            move_player(tournament_id, player, game_id, destination, games, tournaments)
+            set_seated(tournament_id, game_id, len(players), tournaments)
+            set_seated(tournament_id, destination, tournaments[tournament_id, destination, 'seated'] + 1, tournaments)
+            destination = smallest_table(tournament_id, game_id, tournaments)
+    games[game_id, 'players'] = players
+
+
+@export
+def settle_table(game_id: str, games: Any, tournaments: Any):
+    tournament_id = games[game_id, 'tournament']
+    players = games[game_id, 'players']
+    busted = [p for p in players if games[game_id, p] <= 0]
+    n_players = tournaments[tournament_id, 'n_players']
+    if len(busted) == 0 and \
+            tournaments[tournament_id, game_id, 'seated'] - tournaments[tournament_id, 'min_seated'] <= 1 and \
+            tournaments[tournament_id, 'n_tables'] <= n_tables_needed(n_players, tournaments[tournament_id, 'table_size']):
+        # Nothing changed, only this table's own records were read
+        return
+
+    n_players = place_busted(tournament_id, busted, games[game_id, 'starting_stacks'] or {}, n_players, tournaments)
+    for player in busted:
+        players.remove(player)
+    set_seated(tournament_id, game_id, len(players), tournaments)
+    tournaments[tournament_id, 'n_players'] = n_players
+
+    if n_players == 1:
+        winner = players[0]
+        # The winner also gets the shares of paid places nobody reached
+        prize_pool = tournaments[tournament_id, 'prize_pool']
+        award_place(tournament_id, winner, 1, prize_pool - tournaments[tournament_id, 'paid_out'], tournaments)
+        games[game_id, winner] = 0
+        games[game_id, 'players'] = players
+        set_seated(tournament_id, game_id, 0, tournaments)
+        tournaments[tournament_id, 'winner'] = winner
+        tournaments[tournament_id, 'status'] = FINISHED
+    else:
+        balance_table(tournament_id, game_id, players, games, tournaments)
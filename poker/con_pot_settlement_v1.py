@@ -0,0 +1,93 @@
+# con_pot_settlement_v1
+
+
+def contribution_sort(contributions: dict) -> int:
+    def sort(player):
+        return contributions[player]
+    return sort
+
+
+def seat_sort(order: list) -> int:
+    seats = {order[i]: i for i in range(len(order))}
+    def sort(player):
+        return seats[player]
+    return sort
+
+
+def build_pots(players: list, contributions: dict, ranks: dict) -> list:
+    # One sweep over players sorted by contribution. A pot closes at every
+    # level a player still in the hand put in, it is shared by the players
+    # from its start index on. Chips above the last of those levels (put in
+    # by players that folded) go to the last pot.
+    pots = []
+    amount = 0
+    level = 0
+    start = 0
+    still_in = False
+    for i in range(len(players)):
+        contribution = contributions[players[i]]
+        if contribution > level:
+            start = i
+            still_in = False
+            amount += (contribution - level) * (len(players) - i)
+            level = contribution
+        still_in = still_in or players[i] in ranks
+        last_of_level = i == len(players) - 1 or contributions[players[i+1]] > level
+        if last_of_level and still_in and amount > 0:
+            pots.append([amount, start])
+            amount = 0
+    if amount > 0:
+        if len(pots) > 0:
+            pots[-1][0] += amount
+        else:
+            pots.append([amount, 0])
+    return pots
+
+
+def split_pot(amount: Any, winners: list, payouts: dict):
+    # Equal shares in whole chips, the odd chips go to the first winner in
+    # seat order
+    n_winners = len(winners)
+    share = amount // n_winners
+    for winner in winners:
+        payouts[winner] = payouts.get(winner, 0) + share
+    payouts[winners[0]] += amount - share * n_winners
+
+
+@export
+def settle(contributions: dict, ranks: dict, order: list) -> dict:
+    """Splits a hand's chips into the main pot and side pots and pays out
+    each pot to the best ranked players that are eligible for it.
+    :param contributions: player -> chips put in this hand, folded players
+        included.
+    :param ranks: player -> hand rank, for every player still in the hand.
+    :param order: seat order starting left of the dealer, odd chips go to
+        the first winner in this order.
+    :returns: player -> chips won.
+    """
+
+    assert len(ranks) > 0, 'There are no remaining players.'
+    players = sorted(contributions.keys(), key=contribution_sort(contributions))
+    pots = build_pots(players, contributions, ranks)
+    # Seat index built once for every pot's odd chips
+    by_seat = seat_sort(order)
+
+    # Going from the top pot down only ever adds eligible players, so the
+    # best rank so far is the best rank of the current pot
+    payouts = {}
+    best_rank = None
+    best = []
+    end = len(players)
+    for k in range(len(pots) - 1, -1, -1):
+        amount, start = pots[k]
+        for player in players[start:end]:
+            if player in ranks:
+                rank = ranks[player]
+                if best_rank is None or rank > best_rank:
+                    best_rank = rank
+                    best = [player]
+                elif rank == best_rank:
+                    best.append(player)
+        end = start
+        split_pot(amount, sorted(best, key=by_seat), payouts)
+    return payouts
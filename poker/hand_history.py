@@ -0,0 +1,275 @@
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import sys
+
+CARDS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cards')
+EVALUATOR_PATH = os.path.join(CARDS_DIR, 'con_hand_evaluator_v1.py')
+
+
+def load_module(path: str):
+    # By file path, leaving sys.path and sys.modules as they are for
+    # whatever process imports this one
+    spec = importlib.util.spec_from_file_location(os.path.basename(path)[:-3], path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+RANK_ORDER = load_module(os.path.join(CARDS_DIR, 'native_evaluator.py')).read_constant('RANK_ORDER', EVALUATOR_PATH)
+
+
+CARD_GAMES_CONTRACT = 'con_poker_card_games_v4'
+GAME_TYPE_NAMES = ['One Card', 'Blind', 'Stud', "Hold'em", 'Omaha']
+BET_TYPE_NAMES = ['No Limit', 'Pot Limit']
+# Game keys the export needs, the rest are per player chip counts
+GAME_FIELDS = ('name', 'game_type', 'bet_type', 'n_cards_total', 'n_hole_cards', 'tournament')
+CATEGORY_SIZE = 10 ** 9
+# Same as the hand controller's
+EMPTY_LEAF = '0' * 64
+
+
+def scan(driver, prefix: str) -> dict:
+    """Every key under prefix -> value. A mongo backed contracting driver is
+    asked once with a prefix query instead of once per key, anything else
+    needs items(prefix) like ContractDriver."""
+
+    db = getattr(getattr(driver, 'driver', None), 'db', None)
+    if db is not None:
+        from contracting.db.encoder import decode
+        cursor = db.find({'_id': {'$regex': '^' + re.escape(prefix)}})
+        return {doc['_id']: decode(doc['v']) for doc in cursor}
+    return driver.items(prefix)
+
+
+def hand_values(driver, contract: str, hand_id: str) -> dict:
+    """All state of one hand, keyed the way the hand controller's packed
+    'state' record is: 'field' or 'player:field'."""
+
+    prefix = f'{contract}.hands:{hand_id}:'
+    values = {}
+    for key, value in scan(driver, prefix).items():
+        values[key[len(prefix):]] = value
+    values.update(values.pop('state', None) or {})
+    return values
+
+
+def game_values(driver, contract: str, game_id: str) -> dict:
+    prefix = f'{contract}.games:{game_id}:'
+    values = {}
+    for key, value in scan(driver, prefix).items():
+        field = key[len(prefix):]
+        if field in GAME_FIELDS or field == 'current_hand':
+            values[field] = value
+    return values
+
+
+def number(value):
+    # ContractingDecimal and friends, whole amounts stay ints
+    if value is None or isinstance(value, int):
+        return value
+    value = float(str(value))
+    return int(value) if value.is_integer() else value
+
+
+def hand_record(values: dict, hand_id: str, game: dict) -> dict:
+    players = values.get('active_players') or []
+    per_player = {}
+    for player in players:
+        hand = values.get(f'{player}:hand')
+        per_player[player] = {
+            'bet': number(values.get(f'{player}:bet')) or 0,
+            'folded': player in (values.get('folded') or []),
+            'all_in': player in (values.get('all_in') or []),
+            'public_hand': values.get(f'{player}:public_hand'),
+            'hand': hand.split(',') if isinstance(hand, str) else hand,
+            'rank': values.get(f'{player}:rank'),
+        }
+    community = values.get('community')
+    board = []
+    if community is not None and community[0] is not None:
+        board = community[0].split(',') + [card for card in community[1:] if card is not None]
+    payouts = values.get('payouts') or {}
+    return {
+        'hand_id': hand_id,
+        'previous_hand_id': values.get('previous_hand_id'),
+        'game_id': values.get('game_id'),
+        'game_name': game.get('name'),
+        'game_type': game.get('game_type'),
+        'bet_type': game.get('bet_type'),
+        'tournament': game.get('tournament'),
+        'dealer': values.get('dealer'),
+        'pot': number(values.get('pot')) or 0,
+        'rounds': values.get('round') or 0,
+        'board': board,
+        'players': per_player,
+        'winners': values.get('winners') or [],
+        'payouts': {player: number(amount) for player, amount in payouts.items()},
+        'force_undo': bool(values.get('force_undo')),
+        'commitment_root': values.get('commitment_root'),
+    }
+
+
+def iter_hands(driver, game_id: str, contract: str = CARD_GAMES_CONTRACT,
+               start_hand_id: str = None, limit: int = None):
+    """Yields completed hands of a game, newest first, following the
+    previous_hand_id chain with one query per hand.
+    :param start_hand_id: hand to start from, defaults to the game's current
+        hand. Pass the previous_hand_id of the last record to get the next
+        page.
+    :param limit: stop after this many hands.
+    """
+
+    game = game_values(driver, contract, game_id)
+    hand_id = start_hand_id or game.get('current_hand')
+    n_hands = 0
+    while hand_id is not None and (limit is None or n_hands < limit):
+        values = hand_values(driver, contract, hand_id)
+        if values.get('payed_out'):
+            yield hand_record(values, hand_id, game)
+            n_hands += 1
+        hand_id = values.get('previous_hand_id')
+
+
+def sha3(value: str) -> str:
+    # contracting's hashlib.sha3, hex strings are hashed as the bytes they
+    # stand for
+    try:
+        data = bytes.fromhex(value)
+    except ValueError:
+        data = value.encode()
+    return hashlib.sha3_256(data).hexdigest()
+
+
+def commitment_leaves(values: dict) -> list:
+    """(player, field, commitment) for every leaf of the hand's commitment
+    tree, in the order the hand controller built it."""
+
+    leaves = []
+    for player in values.get('active_players') or []:
+        leaves.append((player, 'hand', values.get(f'{player}:house_encrypted_hand')))
+        for j in (1, 2, 3):
+            commitment = values.get(f'{player}:house_encrypted_pad{j}')
+            if commitment is not None:
+                leaves.append((player, f'pad{j}', commitment))
+    return leaves
+
+
+def merkle_levels(leaves: list) -> list:
+    size = 1
+    while size < len(leaves):
+        size *= 2
+    levels = [leaves + [EMPTY_LEAF] * (size - len(leaves))]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        levels.append([sha3(level[k] + level[k + 1]) for k in range(0, len(level), 2)])
+    return levels
+
+
+def commitment_proofs(values: dict) -> dict:
+    """(player, field) -> the index and proof verify_commitments needs for
+    that value. Add the revealed 'value:salt' string as 'value'."""
+
+    leaves = commitment_leaves(values)
+    levels = merkle_levels([sha3(f'{player}:{field}:{commitment}') for player, field, commitment in leaves])
+    if levels[-1][0] != values.get('commitment_root'):
+        raise ValueError('Commitments do not match the stored root')
+    proofs = {}
+    for index, (player, field, _) in enumerate(leaves):
+        proof = []
+        position = index
+        for level in levels[:-1]:
+            proof.append(level[position ^ 1])
+            position //= 2
+        proofs[player, field] = {'player': player, 'field': field, 'index': index, 'proof': proof}
+    return proofs
+
+
+def write_jsonl(records, f) -> int:
+    n = 0
+    for record in records:
+        f.write(json.dumps(record, separators=(',', ':'), default=str))
+        f.write('\n')
+        n += 1
+    return n
+
+
+def rank_name(rank: int) -> str:
+    return RANK_ORDER[rank // CATEGORY_SIZE].replace('_', ' ')
+
+
+def format_hand(record: dict) -> str:
+    """One hand in the usual hand history layout: header, seats, board and
+    summary."""
+
+    game_type = record['game_type']
+    bet_type = record['bet_type']
+    game_name = GAME_TYPE_NAMES[game_type] if game_type is not None else 'Poker'
+    bet_name = BET_TYPE_NAMES[bet_type] if bet_type is not None else ''
+    players = record['players']
+    lines = [
+        f"Hand #{record['hand_id']}: {game_name} {bet_name}".rstrip(),
+        f"Table '{record['game_name'] or record['game_id']}' dealer {record['dealer']}",
+    ]
+    for seat, player in enumerate(players, 1):
+        lines.append(f'Seat {seat}: {player} (put in {players[player]["bet"]})')
+    if len(record['board']) > 0:
+        lines.append(f"*** BOARD *** [{' '.join(record['board'])}]")
+    lines.append('*** SUMMARY ***')
+    lines.append(f"Total pot {record['pot']}")
+    if record['force_undo']:
+        lines.append('Hand was undone, bets were returned')
+    for seat, (player, p) in enumerate(players.items(), 1):
+        line = f'Seat {seat}: {player}'
+        if p['folded']:
+            line += ' folded'
+        elif p['hand'] is not None:
+            line += f" showed [{' '.join(p['hand'])}]"
+            if p['rank'] is not None:
+                line += f" with {rank_name(p['rank'])}"
+        if p['all_in']:
+            line += ', all in'
+        if player in record['payouts']:
+            line += f" and won ({record['payouts'][player]})"
+        lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+
+def write_text(records, f) -> int:
+    n = 0
+    for record in records:
+        f.write(format_hand(record))
+        f.write('\n')
+        n += 1
+    return n
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export completed hands of a game')
+    parser.add_argument('game_id')
+    parser.add_argument('--contract', default=CARD_GAMES_CONTRACT)
+    parser.add_argument('--format', choices=['jsonl', 'text'], default='jsonl')
+    parser.add_argument('--start-hand-id', default=None, help='resume from this hand')
+    parser.add_argument('--limit', type=int, default=None)
+    parser.add_argument('--output', default=None, help='defaults to stdout')
+    args = parser.parse_args()
+
+    from contracting.db.driver import ContractDriver
+
+    records = iter_hands(
+        ContractDriver(),
+        game_id=args.game_id,
+        contract=args.contract,
+        start_hand_id=args.start_hand_id,
+        limit=args.limit,
+    )
+    write = write_jsonl if args.format == 'jsonl' else write_text
+    if args.output:
+        with open(args.output, 'w') as f:
+            n = write(records, f)
+    else:
+        n = write(records, sys.stdout)
+    print(f'{n} hands', file=sys.stderr)
@@ -56,13 +56,13 @@ def update_channel(caller: str, users: list, channel_name: str, channels: Any, m
         user_address = usernames[user]
         if user_address is None:
             user_address = user
-        rsa_key = metadata[user, 'public_rsa_key']
+        rsa_key = rsa.public_key(metadata=metadata, user=user)
         assert rsa_key is not None, f'User {user} has not setup their encryption keys.'
-        rsa_keys = rsa_key.split('|')
         encrypted = rsa.encrypt(
             message_str=key,
-            n=int(rsa_keys[0]),
-            e=int(rsa_keys[1])  
+            n=rsa_key['n'],
+            e=rsa_key['e'],
+            k=rsa_key['k']
         )
         metadata[user, 'keys', channel_name] = encrypted 
         user_addresses.append(user_address)
@@ -100,13 +100,13 @@ def create_channel(caller: str, users: list, channel_name: str, channels: Any, m
         user_address = usernames[user]
         if user_address is None:
             user_address = user
-        rsa_key = metadata[user, 'public_rsa_key']
+        rsa_key = rsa.public_key(metadata=metadata, user=user)
         assert rsa_key is not None, f'User {user} has not setup their encryption keys.'
-        rsa_keys = rsa_key.split('|')
         encrypted = rsa.encrypt(
             message_str=key,
-            n=int(rsa_keys[0]),
-            e=int(rsa_keys[1])  
+            n=rsa_key['n'],
+            e=rsa_key['e'],
+            k=rsa_key['k']
         )
         metadata[user, 'keys', channel_name] = encrypted 
         user_addresses.append(user_address)
@@ -1,6 +1,8 @@
 # con_gamma_phi_profile_impl_v1
 # owner: con_gamma_phi_profile_v5
 
+import con_rsa_encryption as rsa
+
 DEFAULT_METADATA_FIELDS = [
     'username',
     'display_name',
@@ -206,13 +208,16 @@ def validate_username(username: str):
 def update_public_rsa_key(user_address: str, key: str, metadata: Any):
     if key is None:
         metadata[user_address, 'public_rsa_key'] = None
+        metadata[user_address, 'public_rsa_key_record'] = None
     else:
-        assert len(key.split('|')) == 2, 'Invalid key format'
+        # Parsed once here so every encryption can use it as is
+        metadata[user_address, 'public_rsa_key_record'] = rsa.parse_public_key(key=key)
         metadata[user_address, 'public_rsa_key'] = key
 
 
 def update_profile_helper(user_address: str, key: str, value: Any, metadata: Any, usernames: Any):
     assert key != 'extra_fields', 'You cannot update extra_fields with this method.'
+    assert key != 'public_rsa_key_record', 'Set public_rsa_key instead.'
     assert metadata[user_address, 'username'] is not None, 'You do not have a profile. Please create one first.'
     
     if key == 'username':
@@ -279,6 +284,8 @@ def force_update_profile(user_address: str, key: str, value: Any, caller: str, m
 
 def force_update_metadata(user_address: str, key: str, value: Any, caller: str, metadata: Any, owner: Any):
     assert caller == owner.get(), 'Only the owner can call force_update_metadata'
+    if key == 'public_rsa_key':
+        update_public_rsa_key(user_address=user_address, key=value, metadata=metadata)
     metadata[user_address, key] = value
 
 
@@ -112,6 +112,24 @@ def byte_size(number: int) -> int:
     return div_ceil(bit_size(number), 8)
 
 
+def nonzero_random_bytes(length: int) -> bytes:
+    """Returns length random bytes, none of them zero, for PKCS#1 padding."""
+
+    # We remove 0-bytes, so we'll end up with less than we've asked for. One in
+    # 256 bytes is zero, so drawing that many plus 8 bytes more than we need
+    # almost always takes a single draw.
+    chunks = []
+    found = 0
+    while found < length:
+        needed_bytes = length - found
+        extra_bytes = needed_bytes // 128 + 8
+        random_bits = random.getrandbits((needed_bytes + extra_bytes) * 8)
+        chunk = int2bytes(random_bits, fill_size=needed_bytes + extra_bytes).replace(b"\x00", b"")
+        chunks.append(chunk[:needed_bytes])
+        found += len(chunks[-1])
+    return b"".join(chunks)
+
+
 def pad_for_encryption(message: bytes, target_length: int) -> bytes:
     r"""Pads the message for encryption, returning the padded message.
     :return: 00 02 RANDOM_DATA 00 MESSAGE
@@ -130,21 +148,8 @@ def pad_for_encryption(message: bytes, target_length: int) -> bytes:
     assert msglength <= max_msglength, "%i bytes needed for message, but there is only space for %i" % (msglength, max_msglength)
     
     # Get random padding
-    padding = b""
     padding_length = target_length - msglength - 3
-
-    # We remove 0-bytes, so we'll end up with less padding than we've asked for,
-    # so keep adding data until we're at the correct length.
-    while len(padding) < padding_length:
-        needed_bytes = padding_length - len(padding)
-
-        # Always read at least 8 bytes more than we need, and trim off the rest
-        # after removing the 0-bytes. This increases the chance of getting
-        # enough bytes, especially when needed_bytes is small
-        random_bits = random.getrandbits((needed_bytes + 5) * 8)
-        new_padding = int2bytes(random_bits, fill_size=needed_bytes+5)
-        new_padding = new_padding.replace(b"\x00", b"")
-        padding = padding + new_padding[:needed_bytes]
+    padding = nonzero_random_bytes(padding_length)
 
     assert len(padding) == padding_length, "Invalid padding length: %i != %i" % (len(padding), padding_length)
 
@@ -152,12 +157,14 @@ def pad_for_encryption(message: bytes, target_length: int) -> bytes:
 
 
 @export
-def encrypt(message_str: str, n: int, e: int) -> str:
+def encrypt(message_str: str, n: int, e: int, k: int = None) -> str:
     """Encrypts the given message using PKCS#1 v1.5
     :param message: the message to encrypt. Must be a byte string no longer than
         ``k-11`` bytes, where ``k`` is the number of bytes needed to encode
         the ``n`` component of the public key.
     :param pub_key: the :py:class:`rsa.PublicKey` to encrypt with.
+    :param k: byte length of n, from a public key record. Worked out from n
+        when not given.
     :raise OverflowError: when the message is too large to fit in the padded
         block.
     >>> from rsa import key, common
@@ -171,7 +178,7 @@ def encrypt(message_str: str, n: int, e: int) -> str:
 
     message = message_str.encode()
 
-    keylength = byte_size(n)
+    keylength = byte_size(n) if k is None else k
     padded = pad_for_encryption(message, keylength)
 
     payload = bytes2int(padded)
@@ -179,3 +186,62 @@ def encrypt(message_str: str, n: int, e: int) -> str:
     block = int2bytes(encrypted, keylength)
 
     return block.hex()
+
+
+@export
+def encrypt_many(messages: list, n: int, e: int, k: int = None) -> list:
+    """Encrypts each of messages for the same public key, the same way as
+    :py:func:`encrypt`. The padding for all of the messages comes from a
+    single random draw.
+    :param k: byte length of n, from a public key record. Worked out from n
+        when not given.
+    :returns: the ciphertexts as hex, in the order of messages.
+    """
+
+    assert_int(n, "n")
+    assert_int(e, "e")
+    keylength = byte_size(n) if k is None else k
+    max_msglength = keylength - 11
+
+    encoded = [message_str.encode() for message_str in messages]
+    padding_lengths = []
+    for message in encoded:
+        assert len(message) <= max_msglength, "%i bytes needed for message, but there is only space for %i" % (len(message), max_msglength)
+        padding_lengths.append(keylength - len(message) - 3)
+    padding = nonzero_random_bytes(sum(padding_lengths))
+
+    ciphertexts = []
+    offset = 0
+    for i in range(len(encoded)):
+        padded = b"".join([b"\x00\x02", padding[offset:offset + padding_lengths[i]], b"\x00", encoded[i]])
+        offset += padding_lengths[i]
+        ciphertexts.append(int2bytes(pow(bytes2int(padded), e, n), keylength).hex())
+    return ciphertexts
+
+
+@export
+def parse_public_key(key: str) -> dict:
+    """Parses a "{n}|{e}" public key once, so it can be stored next to the
+    key and used without converting the decimal strings again.
+    :returns: {'n': n, 'e': e, 'k': byte length of n}, all ints
+    """
+    parts = key.split('|')
+    assert len(parts) == 2, 'Invalid key format'
+    n = int(parts[0])
+    e = int(parts[1])
+    assert n > 0 and e > 0, 'Invalid key format'
+    return {'n': n, 'e': e, 'k': byte_size(n)}
+
+
+@export
+def public_key(metadata: Any, user: str) -> dict:
+    """A user's public key record from a profile contract's metadata, or None
+    if they have not set a key. Profiles whose key was set before records
+    were kept are parsed on the fly."""
+    record = metadata[user, 'public_rsa_key_record']
+    if record is not None:
+        return record
+    key = metadata[user, 'public_rsa_key']
+    if key is None:
+        return None
+    return parse_public_key(key)
@@ -3,9 +3,31 @@ import os
 import math
 import struct
 import base64
+import multiprocessing
 
 
 DEFAULT_EXPONENT = 65537
+SMALL_PRIME_LIMIT = 2000
+
+
+def sieve(limit: int) -> typing.List[int]:
+    """Returns the primes below limit, by the sieve of Eratosthenes.
+    >>> sieve(20)
+    [2, 3, 5, 7, 11, 13, 17, 19]
+    """
+
+    is_composite = bytearray(limit)
+    primes = []
+    for i in range(2, limit):
+        if not is_composite[i]:
+            primes.append(i)
+            is_composite[i * i::i] = b'\x01' * len(range(i * i, limit, i))
+    return primes
+
+
+SMALL_PRIMES = sieve(SMALL_PRIME_LIMIT)
+# One gcd against the product trial-divides a candidate by all of them
+SMALL_PRIMES_PRODUCT = math.prod(SMALL_PRIMES)
 
 
 def bytes2int(raw_bytes: bytes) -> int:
@@ -264,6 +286,13 @@ def is_prime(number: int) -> bool:
     if not (number & 1):
         return False
 
+    # Check against the small primes table, which rules out most candidates
+    # before any Miller-Rabin round.
+    if number < SMALL_PRIME_LIMIT:
+        return number in SMALL_PRIMES
+    if math.gcd(number, SMALL_PRIMES_PRODUCT) != 1:
+        return False
+
     # Calculate minimum number of rounds.
     k = get_primality_testing_rounds(number)
 
@@ -383,6 +412,60 @@ def find_p_q(
     return max(p, q), min(p, q)
 
 
+def prime_worker(nbits: int, role: str, primes: multiprocessing.Queue):
+    # Runs until the parent has found p and q and terminates it
+    while True:
+        primes.put((role, getprime(nbits)))
+
+
+def find_p_q_parallel(
+    nbits: int,
+    parallel: int,
+    accurate: bool = True,
+) -> typing.Tuple[int, int]:
+    """Same as :py:func:`find_p_q`, with p and q searched for at once by
+    ``parallel`` processes, half of them looking for p and half for q.
+    :returns: (p, q), where p > q
+    """
+
+    total_bits = nbits * 2
+
+    shift = nbits // 16
+    pbits = nbits + shift
+    qbits = nbits - shift
+
+    primes = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(
+            target=prime_worker,
+            args=(pbits, 'p', primes) if i % 2 == 0 else (qbits, 'q', primes),
+            daemon=True,
+        )
+        for i in range(max(2, parallel))
+    ]
+    for worker in workers:
+        worker.start()
+
+    found = {'p': [], 'q': []}
+    try:
+        while True:
+            role, prime = primes.get()
+            other = found['q' if role == 'p' else 'p']
+            for candidate in other:
+                if prime == candidate:
+                    continue
+                if accurate and (prime * candidate).bit_length() != total_bits:
+                    continue
+                return max(prime, candidate), min(prime, candidate)
+            found[role].append(prime)
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
+        primes.close()
+
+
 def calculate_keys_custom_exponent(p: int, q: int, exponent: int) -> typing.Tuple[int, int]:
     """Calculates an encryption and a decryption key given p, q and an exponent,
     and returns them as a tuple (e, d)
@@ -415,6 +498,7 @@ def gen_keys(
     getprime_func: typing.Callable[[int], int],
     accurate: bool = True,
     exponent: int = DEFAULT_EXPONENT,
+    parallel: int = 1,
 ) -> typing.Tuple[int, int, int, int]:
     """Generate RSA keys of nbits bits. Returns (p, q, e, d).
     Note: this can take a long time, depending on the key size.
@@ -426,12 +510,17 @@ def gen_keys(
         what you're doing, as the exponent influences how difficult your
         private key can be cracked. A very common choice for e is 65537.
     :type exponent: int
+    :param parallel: the number of processes searching for p and q. If set
+        to a number > 1, getprime_func is not used.
     """
 
     # Regenerate p and q values, until calculate_keys doesn't raise a
     # ValueError.
     while True:
-        (p, q) = find_p_q(nbits // 2, getprime_func, accurate)
+        if parallel > 1:
+            (p, q) = find_p_q_parallel(nbits // 2, parallel, accurate)
+        else:
+            (p, q) = find_p_q(nbits // 2, getprime_func, accurate)
         try:
             (e, d) = calculate_keys_custom_exponent(p, q, exponent=exponent)
             break
@@ -446,6 +535,7 @@ def newkeys(
     accurate: bool = True,
     poolsize: int = 1,
     exponent: int = DEFAULT_EXPONENT,
+    parallel: int = 1,
 ) -> typing.Tuple[typing.Tuple[int, int], typing.Tuple[int, int, int, int, int]]:
     """Generates public and private keys, and returns them as (pub, priv).
     The public key is also known as the 'encryption key', and is a
@@ -462,6 +552,9 @@ def newkeys(
         what you're doing, as the exponent influences how difficult your
         private key can be cracked. A very common choice for e is 65537.
     :type exponent: int
+    :param parallel: the number of processes searching for p and q at once,
+        worth it from 2048 bits up. ``poolsize`` is kept as another name for
+        it.
     :returns: a tuple (:py:class:`rsa.PublicKey`, :py:class:`rsa.PrivateKey`)
     The ``poolsize`` parameter was added in *Python-RSA 3.1* and requires
     Python 2.6 or newer.
@@ -473,11 +566,15 @@ def newkeys(
     if poolsize < 1:
         raise ValueError("Pool size (%i) should be >= 1" % poolsize)
 
+    if parallel < 1:
+        raise ValueError("Parallel (%i) should be >= 1" % parallel)
+
     # Determine which getprime function to use
     getprime_func = getprime
 
     # Generate the key components
-    (p, q, e, d) = gen_keys(nbits, getprime_func, accurate=accurate, exponent=exponent)
+    (p, q, e, d) = gen_keys(nbits, getprime_func, accurate=accurate, exponent=exponent,
+                            parallel=max(parallel, poolsize))
 
     # Create the key objects
     n = p * q
@@ -0,0 +1,242 @@
+"""Pool of pre-generated RSA keypairs.
+
+Generating a keypair means a Miller-Rabin prime search for p and q, which
+takes seconds at the key sizes players use. A KeyPool keeps keypairs ready on
+disk and in memory so onboarding a player only pops one, and tops itself up
+with a process pool once fewer than low_watermark are left:
+
+    pool = KeyPool('players.keys', nbits=512, size=1000)
+    pub, priv = pool.take()
+
+    python rsa/keypool.py players.keys --bits 512 --size 1000
+
+Each key size and exponent gets its own store file, <path>.<nbits>-<exponent>,
+so pools of different sizes can share a path without touching each other's
+keypairs. Keypairs are appended to it one per line, [n, e, d, p, q] as JSON.
+The number of keypairs already handed out is kept next to it in
+<store>.taken, so a keypair is never handed out twice, even across restarts.
+Both files hold private keys and are created readable by the owner only
+(mode 0o600).
+"""
+import argparse
+import collections
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from os.path import dirname, abspath
+
+sys.path.insert(0, dirname(abspath(__file__)))
+
+from keygen import newkeys, encode_b64, DEFAULT_EXPONENT
+
+
+def generate(nbits: int, exponent: int = DEFAULT_EXPONENT) -> list:
+    """One keypair as [n, e, d, p, q], run in the pool's worker processes."""
+    _, priv = newkeys(nbits, exponent=exponent)
+    return list(priv)
+
+
+def store_path(path: str, nbits: int, exponent: int = DEFAULT_EXPONENT) -> str:
+    return f'{path}.{nbits}-{exponent}'
+
+
+def open_private(path: str, mode: str):
+    # Like open(path, mode) for 'w' and 'a', but a new file is only readable
+    # by its owner
+    flags = os.O_WRONLY | os.O_CREAT | (os.O_APPEND if mode == 'a' else os.O_TRUNC)
+    return os.fdopen(os.open(path, flags, 0o600), mode)
+
+
+def as_keys(key: list) -> tuple:
+    n, e, d, p, q = key
+    return (n, e), (n, e, d, p, q)
+
+
+class KeyPool:
+    """Keypairs of nbits bits, read from path and refilled in the background.
+    :param path: prefix of the store file, which is created if missing. None
+        keeps the pool in memory only.
+    :param size: number of keypairs a refill tops the pool up to.
+    :param low_watermark: refill once fewer keypairs than this are ready,
+        defaults to a quarter of size.
+    :param processes: worker processes, defaults to the number of cores.
+    """
+
+    def __init__(self, path: str = None, nbits: int = 512, size: int = 100,
+                 low_watermark: int = None, processes: int = None,
+                 exponent: int = DEFAULT_EXPONENT):
+        if size < 1:
+            raise ValueError("Pool size (%i) should be >= 1" % size)
+        self.path = None if path is None else store_path(path, nbits, exponent)
+        self.nbits = nbits
+        self.size = size
+        self.low_watermark = size // 4 if low_watermark is None else low_watermark
+        self.processes = processes
+        self.exponent = exponent
+
+        self.lock = threading.Lock()
+        self.ready = threading.Condition(self.lock)
+        self.keys = collections.deque()
+        self.taken = 0
+        self.stored = 0
+        self.pending = 0
+        self.executor = None
+        self.closed = False
+        self.load()
+        self.refill()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # Store
+
+    def load(self):
+        if self.path is None or not os.path.exists(self.path):
+            return
+        with open(self.path, 'r') as f:
+            lines = [line for line in f.read().splitlines() if len(line) > 0]
+        self.stored = len(lines)
+        if os.path.exists(self.path + '.taken'):
+            with open(self.path + '.taken', 'r') as f:
+                self.taken = int(f.read() or 0)
+        for line in lines[self.taken:]:
+            self.keys.append(json.loads(line))
+
+    def append(self, key: list):
+        if self.path is None:
+            return
+        with open_private(self.path, 'a') as f:
+            f.write(json.dumps(key) + '\n')
+        self.stored += 1
+
+    def mark_taken(self):
+        if self.path is None:
+            return
+        self.taken += 1
+        if self.taken * 2 >= self.stored and self.taken >= self.size:
+            self.compact()
+            return
+        with open_private(self.path + '.taken', 'w') as f:
+            f.write(str(self.taken))
+
+    def compact(self):
+        # Rewrite the store without the keypairs handed out so far
+        with open_private(self.path + '.tmp', 'w') as f:
+            for key in self.keys:
+                f.write(json.dumps(key) + '\n')
+        with open_private(self.path + '.taken', 'w') as f:
+            f.write('0')
+        os.replace(self.path + '.tmp', self.path)
+        self.stored = len(self.keys)
+        self.taken = 0
+
+    # Refill
+
+    def refill(self):
+        """Queues enough keypairs to bring the pool back up to size if it is
+        below the low watermark."""
+
+        with self.lock:
+            if self.closed or len(self.keys) + self.pending >= max(1, self.low_watermark):
+                return
+            missing = self.size - len(self.keys) - self.pending
+            if missing <= 0:
+                return
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(self.processes)
+            executor = self.executor
+            self.pending += missing
+        for _ in range(missing):
+            future = executor.submit(generate, self.nbits, self.exponent)
+            future.add_done_callback(self.generated)
+
+    def generated(self, future):
+        with self.lock:
+            self.pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.ready.notify_all()
+                return
+            key = future.result()
+            self.append(key)
+            self.keys.append(key)
+            self.ready.notify_all()
+
+    def wait(self, n_keys: int = None, timeout: float = None) -> bool:
+        """Blocks until n_keys keypairs are ready, defaults to a full pool."""
+
+        n_keys = self.size if n_keys is None else n_keys
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.lock:
+            while len(self.keys) < n_keys:
+                if self.pending == 0:
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.ready.wait(remaining)
+            return True
+
+    # Callers
+
+    def take(self) -> tuple:
+        """Returns a keypair as (pub, priv) like keygen.newkeys. Waits for the
+        refill when the pool has run dry."""
+
+        with self.lock:
+            while len(self.keys) == 0:
+                if self.pending == 0:
+                    break
+                self.ready.wait()
+            key = self.keys.popleft() if len(self.keys) > 0 else None
+            if key is not None:
+                self.mark_taken()
+        self.refill()
+        if key is None:
+            # Nothing queued, e.g. after close(), so generate it here
+            return newkeys(self.nbits, exponent=self.exponent)
+        return as_keys(key)
+
+    def peek(self, n_keys: int) -> list:
+        """Up to n_keys ready keypairs as (pub, priv), without handing them
+        out. For load tests and benchmarks that reuse the same keys on
+        purpose, never for keys given to players."""
+
+        with self.lock:
+            return [as_keys(key) for key in list(self.keys)[:n_keys]]
+
+    def take_encoded(self) -> tuple:
+        """Returns a keypair encoded like keygen.create_keypair."""
+        pub, priv = self.take()
+        return encode_b64('|'.join(map(str, pub))), encode_b64('|'.join(map(str, priv)))
+
+    def close(self, wait: bool = True):
+        with self.lock:
+            self.closed = True
+            executor = self.executor
+            self.executor = None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fill a keypair store ahead of time')
+    parser.add_argument('path', help='store prefix, keypairs go to <path>.<bits>-<exponent>')
+    parser.add_argument('--bits', type=int, default=512)
+    parser.add_argument('--size', type=int, default=100)
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with KeyPool(args.path, nbits=args.bits, size=args.size, low_watermark=args.size,
+                 processes=args.processes) as pool:
+        pool.wait()
+        print(f'{len(pool)} keypairs ready in {pool.path} in {time.perf_counter() - start:.1f}s')
@@ -0,0 +1,188 @@
+"""Hand evaluator benchmark.
+
+Times evaluate() for 1, 5, 7 and 9 card hands, evaluate_omaha(),
+get_deck() and deal(), both as plain python and through ContractingClient with
+metering on, and stores hands/sec and stamps per call as JSON so evaluator
+versions can be compared. Workloads for functions an evaluator does not have,
+like deal() on older versions, are skipped:
+
+    git show <old commit>:cards/con_hand_evaluator_v1.py > /tmp/old_evaluator.py
+    python scripts/benchmark_hand_evaluator.py --contract /tmp/old_evaluator.py --output before.json
+    python scripts/benchmark_hand_evaluator.py --output after.json --compare before.json
+"""
+import argparse
+import importlib.util
+import json
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from os.path import dirname, abspath, join
+
+REPO_DIR = dirname(dirname(abspath(__file__)))
+
+
+def load_module(path: str):
+    # By file path, without adding cards/ to sys.path
+    spec = importlib.util.spec_from_file_location('native_evaluator', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+native_evaluator = load_module(join(REPO_DIR, 'cards', 'native_evaluator.py'))
+load_evaluator = native_evaluator.load_evaluator
+CONTRACT_PATH = native_evaluator.CONTRACT_PATH
+
+
+EVALUATOR_CONTRACT = 'con_hand_evaluator_v1'
+CURRENCY_CONTRACT = 'currency'
+SIGNER = 'benchmark'
+STAMPS = 1_000_000
+WORKLOADS = ['evaluate_1', 'evaluate_5', 'evaluate_7', 'evaluate_9', 'evaluate_omaha', 'get_deck', 'deal']
+
+
+def make_inputs(deck: list, n: int, seed: int) -> dict:
+    # (function name, kwargs) per call, identical for every run with the same seed
+    rng = random.Random(seed)
+    inputs = {}
+    for size in (1, 5, 7, 9):
+        inputs[f'evaluate_{size}'] = [('evaluate', {'hand': rng.sample(deck, size)}) for _ in range(n)]
+    omaha = []
+    for _ in range(n):
+        cards = rng.sample(range(len(deck)), 9)
+        omaha.append(('evaluate_omaha', {'hole_cards': cards[:4], 'board': cards[4:]}))
+    inputs['evaluate_omaha'] = omaha
+    inputs['get_deck'] = [('get_deck', {'shuffled': True}) for _ in range(n)]
+    # A 10 player hold'em hand
+    inputs['deal'] = [('deal', {'n_cards': 25, 'as_strings': True}) for _ in range(n)]
+    return inputs
+
+
+def supported_workloads(evaluator) -> list:
+    # The function each workload calls, first call is enough
+    return [
+        workload for workload in WORKLOADS
+        if hasattr(evaluator, make_inputs(evaluator.DECK, 1, 0)[workload][0][0])
+    ]
+
+
+def bench_native(evaluator, inputs: dict, workloads: list) -> dict:
+    results = {}
+    for workload in workloads:
+        calls = inputs[workload]
+        start = time.perf_counter()
+        for name, kwargs in calls:
+            getattr(evaluator, name)(**kwargs)
+        elapsed = time.perf_counter() - start
+        results[workload] = {
+            'calls': len(calls),
+            'seconds': elapsed,
+            'hands_per_sec': len(calls) / elapsed,
+        }
+    return results
+
+
+def bench_contract(code: str, inputs: dict, workloads: list) -> dict:
+    from contracting.client import ContractingClient
+
+    client = ContractingClient(signer=SIGNER)
+    client.flush()
+    with open(join(REPO_DIR, 'common', 'currency.py'), 'r') as f:
+        client.submit(f.read(), name=CURRENCY_CONTRACT, signer=SIGNER)
+    client.submit(code, name=EVALUATOR_CONTRACT, signer=SIGNER)
+
+    executor = client.executor
+    # evaluate_omaha is private, it is benchmarked the way other contracts call it
+    executor.bypass_privates = True
+
+    results = {}
+    for workload in workloads:
+        calls = inputs[workload]
+        stamps = 0
+        start = time.perf_counter()
+        for name, kwargs in calls:
+            if name == 'evaluate_omaha':
+                name = '__evaluate_omaha'
+            output = executor.execute(
+                sender=SIGNER,
+                contract_name=EVALUATOR_CONTRACT,
+                function_name=name,
+                kwargs=dict(kwargs),
+                stamps=STAMPS,
+                metering=True
+            )
+            assert output['status_code'] == 0, output['result']
+            stamps += output['stamps_used']
+        elapsed = time.perf_counter() - start
+        results[workload] = {
+            'calls': len(calls),
+            'seconds': elapsed,
+            'hands_per_sec': len(calls) / elapsed,
+            'stamps_per_call': stamps / len(calls),
+        }
+
+    executor.bypass_privates = False
+    return results
+
+
+def print_results(results: dict, baseline: dict = None) -> None:
+    for mode in ('native', 'contract'):
+        if mode not in results['results']:
+            continue
+        print(f'\n{mode}:')
+        for workload, r in results['results'][mode].items():
+            line = f"  {workload:<16} {r['hands_per_sec']:>12.1f} hands/sec"
+            if 'stamps_per_call' in r:
+                line += f"  {r['stamps_per_call']:>10.1f} stamps/call"
+            old = baseline and baseline['results'].get(mode, {}).get(workload)
+            if old:
+                line += f"  x{r['hands_per_sec'] / old['hands_per_sec']:.2f} speed"
+                if 'stamps_per_call' in r and 'stamps_per_call' in old:
+                    line += f"  x{r['stamps_per_call'] / old['stamps_per_call']:.2f} stamps"
+            print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Hand evaluator benchmark')
+    parser.add_argument('--contract', default=CONTRACT_PATH, help='evaluator contract source to benchmark')
+    parser.add_argument('--native-calls', type=int, default=20_000)
+    parser.add_argument('--contract-calls', type=int, default=200)
+    parser.add_argument('--no-contract', action='store_true', help='skip the ContractingClient run')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare against')
+    args = parser.parse_args()
+
+    evaluator = load_evaluator(args.contract)
+    workloads = supported_workloads(evaluator)
+    skipped = [workload for workload in WORKLOADS if workload not in workloads]
+    if len(skipped) > 0:
+        print(f"skipping {', '.join(skipped)}, not in {args.contract}", file=sys.stderr)
+    results = {
+        'contract': args.contract,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'seed': args.seed,
+        'results': {
+            'native': bench_native(evaluator, make_inputs(evaluator.DECK, args.native_calls, args.seed), workloads),
+        },
+    }
+    if not args.no_contract:
+        with open(args.contract, 'r') as f:
+            code = f.read()
+        results['results']['contract'] = bench_contract(
+            code, make_inputs(evaluator.DECK, args.contract_calls, args.seed), workloads
+        )
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
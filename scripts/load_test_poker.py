@@ -0,0 +1,414 @@
+"""Multi-table load driver for the poker contracts.
+
+Seats --players players at tables of --table-size and plays --hands hands on
+every table through con_poker_card_games_v4, with metering on. The tables
+take turns one transaction at a time, the way transactions from many tables
+land in the same blocks, so every table has a hand in flight at once. Reports
+latency and stamp percentiles per export, the state written per transaction
+and the state kept per hand:
+
+    python scripts/load_test_poker.py --players 2000 --table-size 10 --hands 3
+    python scripts/load_test_poker.py --game-type 0 --sweep 2,5,10,25,50 --output sweep.json
+
+RSA keys are the slow part of setting up thousands of players. They come
+from an rsa/keypool.py store at --key-cache, filled in parallel the first time
+and reused by later runs. Dealt hands are unsealed with con_otp_v1 itself.
+"""
+import argparse
+import hashlib
+import json
+import random
+import sys
+import time
+from os.path import dirname, abspath, join
+
+import rsa  # the python-rsa package, for player keys only
+
+REPO_DIR = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, join(REPO_DIR, 'rsa'))
+
+from keypool import KeyPool
+
+OWNER = 'load-owner'
+OTP_CONTRACT = 'con_otp_v1'
+CARD_GAMES_CONTRACT = 'con_poker_card_games_v4'
+PROFILE_CONTRACT = 'con_gamma_phi_profile_v5'
+PROFILE_ACTION = 'profile'
+# (source, name, owner), in submission order
+CONTRACTS = [
+    ('core/con_phi_lst001.py', 'con_phi_lst001', None),
+    ('rsa/con_rsa_encryption.py', 'con_rsa_encryption', None),
+    ('otp/con_otp_v1.py', OTP_CONTRACT, None),
+    ('cards/con_hand_evaluator_v1.py', 'con_hand_evaluator_v1', None),
+    ('poker/con_pot_settlement_v1.py', 'con_pot_settlement_v1', None),
+    ('profile/con_gamma_phi_profile_v5.py', PROFILE_CONTRACT, None),
+    ('profile/con_gamma_phi_profile_impl_v1.py', 'con_gamma_phi_profile_impl_v1', PROFILE_CONTRACT),
+    ('poker/con_poker_card_games_v4.py', CARD_GAMES_CONTRACT, None),
+    ('poker/con_poker_game_controller_v2.py', 'con_poker_game_controller_v2', CARD_GAMES_CONTRACT),
+    ('poker/con_poker_hand_controller_v3.py', 'con_poker_hand_controller_v3', CARD_GAMES_CONTRACT),
+    ('poker/con_poker_tournament_controller_v1.py', 'con_poker_tournament_controller_v1', CARD_GAMES_CONTRACT),
+]
+HOLDEM_POKER = 3
+OMAHA_POKER = 4
+COMMUNITY_GAMES = (HOLDEM_POKER, OMAHA_POKER)
+FLOP, TURN, RIVER = 1, 2, 3
+KEY_BITS = 512
+STAMPS = 1_000_000
+PERCENTILES = (50, 90, 99)
+
+
+# Key pool
+
+def load_key_pool(n_keys: int, path: str = None, processes: int = None) -> list:
+    """n_keys private keys from the KeyPool store at path, topped up in
+    parallel. The same keys are used again by later runs."""
+
+    start = time.perf_counter()
+    with KeyPool(path, nbits=KEY_BITS, size=n_keys, low_watermark=n_keys, processes=processes) as pool:
+        missing = n_keys - len(pool)
+        pool.wait(n_keys)
+        keys = pool.peek(n_keys)
+    if missing > 0:
+        print(f'generated {missing} keys in {time.perf_counter() - start:.1f}s', file=sys.stderr)
+    return [rsa.PrivateKey(*priv) for _, priv in keys]
+
+
+# Measurements
+
+def percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class Stats:
+    def __init__(self):
+        self.calls = {}
+        self.hand_state_bytes = []
+        self.hands = 0
+
+    def record(self, function: str, seconds: float, output: dict):
+        calls = self.calls.setdefault(function, {'seconds': [], 'stamps': [], 'write_bytes': [], 'failures': 0})
+        calls['seconds'].append(seconds)
+        calls['stamps'].append(output['stamps_used'])
+        calls['write_bytes'].append(encoded_size(output['writes']))
+        if output['status_code'] != 0:
+            calls['failures'] += 1
+
+    def summary(self) -> dict:
+        exports = {}
+        for function, calls in sorted(self.calls.items()):
+            exports[function] = {
+                'calls': len(calls['seconds']),
+                'failures': calls['failures'],
+                'ms': {f'p{p}': 1000 * percentile(calls['seconds'], p) for p in PERCENTILES},
+                'stamps': {f'p{p}': percentile(calls['stamps'], p) for p in PERCENTILES + (100,)},
+                'write_bytes_mean': sum(calls['write_bytes']) / len(calls['write_bytes']),
+            }
+        return {
+            'hands': self.hands,
+            'hand_state_bytes_mean': sum(self.hand_state_bytes) / max(1, len(self.hand_state_bytes)),
+            'exports': exports,
+        }
+
+
+def encoded_size(writes: dict) -> int:
+    from contracting.db.encoder import encode
+    return sum([len(key) + len(encode(value)) for key, value in writes.items()])
+
+
+# Chain
+
+class Chain:
+    """Runs card games transactions with metering, one block per round of
+    tables."""
+
+    def __init__(self, stamps: int, use_mongo: bool):
+        from contracting.client import ContractingClient
+        from contracting.db.driver import ContractDriver, InMemDriver
+        from contracting.stdlib.bridge.time import Datetime
+
+        driver = ContractDriver() if use_mongo else ContractDriver(driver=InMemDriver())
+        self.client = ContractingClient(signer=OWNER, driver=driver)
+        self.client.flush()
+        self.driver = self.client.raw_driver
+        self.stamps = stamps
+        self.stats = Stats()
+        self.block = 0
+        self.n_tx = 0
+        self.now = Datetime(2024, 1, 1)
+
+        for path, name, owner in CONTRACTS:
+            with open(join(REPO_DIR, path), 'r') as f:
+                self.client.submit(f.read(), name=name, owner=owner, signer=OWNER)
+        self.client.get_contract(PROFILE_CONTRACT).register_action(
+            action=PROFILE_ACTION, contract='con_gamma_phi_profile_impl_v1'
+        )
+        self.otp = self.client.get_contract(OTP_CONTRACT)
+        self.fund_stamps(OWNER)
+
+    def fund_stamps(self, account: str):
+        # Stamps are paid from currency balances, seeded straight into the
+        # database rather than with a transfer per player
+        self.driver.driver.set(self.driver.make_key('currency', 'balances', [account]), 10 ** 12)
+
+    def next_block(self):
+        from contracting.stdlib.bridge.time import Timedelta
+        self.block += 1
+        self.now = self.now + Timedelta(seconds=1)
+
+    def read(self, variable: str, *keys, contract: str = CARD_GAMES_CONTRACT):
+        return self.client.get_var(contract, variable, list(keys))
+
+    def execute(self, signer: str, function: str, kwargs: dict, contract: str = CARD_GAMES_CONTRACT,
+                measure: bool = True) -> dict:
+        self.n_tx += 1
+        environment = {
+            'now': self.now,
+            'block_num': self.block,
+            'block_hash': hashlib.sha3_256(str(self.block).encode()).hexdigest(),
+            '__input_hash': hashlib.sha3_256(str(self.n_tx).encode()).hexdigest(),
+        }
+        start = time.perf_counter()
+        output = self.client.executor.execute(
+            sender=signer,
+            contract_name=contract,
+            function_name=function,
+            kwargs=kwargs,
+            environment=environment,
+            auto_commit=True,
+            stamps=self.stamps,
+            metering=True,
+        )
+        if measure:
+            self.stats.record(function, time.perf_counter() - start, output)
+        # Committed, start the next transaction with a clean write set
+        self.driver.clear_pending_state()
+        return output
+
+    def setup_player(self, player: str, sk: rsa.PrivateKey, chips: int):
+        self.fund_stamps(player)
+        self.execute(OWNER, 'transfer', {'amount': chips, 'to': player}, contract='con_phi_lst001', measure=False)
+        self.execute(player, 'approve', {'amount': chips, 'to': CARD_GAMES_CONTRACT},
+                     contract='con_phi_lst001', measure=False)
+        output = self.execute(player, 'interact', {
+            'action': PROFILE_ACTION,
+            'payload': {
+                'action': 'create_profile',
+                'username': player,
+                'public_rsa_key': f'{sk.n}|{sk.e}',
+            },
+        }, contract=PROFILE_CONTRACT, measure=False)
+        assert output['status_code'] == 0, output['result']
+
+    def setup_table(self, name: str, players: list, game_config: dict, chips: int) -> str:
+        creator = players[0]
+        output = self.execute(creator, 'start_game', {
+            'name': name,
+            'other_players': players[1:],
+            'game_config': dict(game_config),
+        }, measure=False)
+        assert output['status_code'] == 0, output['result']
+        game_id = output['result']
+        for player in players:
+            if player != creator:
+                self.execute(player, 'respond_to_invite', {'game_id': game_id, 'accept': True}, measure=False)
+            output = self.execute(player, 'add_chips_to_game', {'game_id': game_id, 'amount': chips}, measure=False)
+            assert output['status_code'] == 0, output['result']
+        return game_id
+
+    def decrypt_payload(self, encrypted: str, sk: rsa.PrivateKey) -> list:
+        # hand:salt, then pad:salt per community card. Unsealed by the otp
+        # contract outside of metering, it is not a transaction of the hand.
+        wrapped_key, sealed = encrypted.split(':')
+        key = int(rsa.decrypt(bytes.fromhex(wrapped_key), sk).decode('utf-8'))
+        return self.otp.unseal(sealed_str=sealed, key=key).split('|')
+
+    def hand_value(self, hand_id: str, key: str, player: str = None):
+        state = self.read('hands', hand_id, 'state')
+        if state is not None:
+            return state.get(key if player is None else f'{player}:{key}')
+        if player is None:
+            return self.read('hands', hand_id, key)
+        return self.read('hands', hand_id, player, key)
+
+    def hand_state_bytes(self, hand_id: str) -> int:
+        return encoded_size(self.driver.items(f'{CARD_GAMES_CONTRACT}.hands:{hand_id}:'))
+
+
+# Tables
+
+def play_table(chain: Chain, game_id: str, players: list, keys: dict, game_type: int, n_hands: int,
+               rng: random.Random):
+    """One table as a generator of (signer, export, kwargs), each yield gets
+    the transaction output back."""
+
+    for h in range(n_hands):
+        dealer = players[h % len(players)]
+        output = yield dealer, 'start_hand', {'game_id': game_id}
+        if output['status_code'] != 0:
+            return
+        hand_id = output['result']
+        for player in players:
+            yield player, 'ante_up', {'hand_id': hand_id}
+        output = yield dealer, 'deal_cards', {'hand_id': hand_id}
+        if output['status_code'] != 0:
+            return
+
+        seated = chain.hand_value(hand_id, 'active_players')
+        payloads = {
+            p: chain.decrypt_payload(chain.read('hands', hand_id, p, 'player_encrypted_hand'), keys[p])
+            for p in seated
+        }
+        revealed = {p: set() for p in seated}
+
+        def reveal_pads(player, indexes):
+            for index in indexes:
+                if index not in revealed[player]:
+                    pad, salt = payloads[player][index].split(':')
+                    revealed[player].add(index)
+                    yield player, 'reveal_otp', {'hand_id': hand_id, 'pad': int(pad), 'salt': int(salt), 'index': index}
+
+        for _ in range(50 * len(seated)):
+            if chain.hand_value(hand_id, 'completed'):
+                break
+            better = chain.hand_value(hand_id, 'next_better')
+            if better is None:
+                break
+            round = chain.hand_value(hand_id, 'round')
+            if game_type in COMMUNITY_GAMES and round in (FLOP, TURN, RIVER) and \
+                    chain.hand_value(hand_id, f'needs_reveal{round}'):
+                folded = chain.hand_value(hand_id, 'folded')
+                for player in seated:
+                    if player not in folded:
+                        yield from reveal_pads(player, [round])
+                yield dealer, 'reveal', {'hand_id': hand_id, 'index': round}
+
+            to_call = chain.hand_value(hand_id, 'current_bet') - (chain.hand_value(hand_id, 'bet', better) or 0)
+            chips = chain.read('games', game_id, better)
+            x = rng.random()
+            if x < 0.1 and to_call > 0:
+                if game_type in COMMUNITY_GAMES:
+                    yield from reveal_pads(better, [FLOP, TURN, RIVER])
+                bet = -1
+            elif x < 0.85 or chips <= to_call:
+                bet = min(to_call, chips)
+            else:
+                bet = min(to_call + rng.choice([1, 2, 5, 10]), chips)
+            output = yield better, 'bet_check_or_fold', {'hand_id': hand_id, 'bet': bet}
+            if output['status_code'] != 0:
+                if game_type in COMMUNITY_GAMES:
+                    yield from reveal_pads(better, [FLOP, TURN, RIVER])
+                yield better, 'bet_check_or_fold', {'hand_id': hand_id, 'bet': -1}
+
+        folded = chain.hand_value(hand_id, 'folded') or []
+        for player in seated:
+            if player not in folded:
+                yield player, 'verify_hand', {'hand_id': hand_id, 'player_hand_str': payloads[player][0]}
+        output = yield dealer, 'payout_hand', {'hand_id': hand_id}
+        if output['status_code'] != 0:
+            return
+        chain.stats.hands += 1
+        chain.stats.hand_state_bytes.append(chain.hand_state_bytes(hand_id))
+
+
+def run(n_players: int, table_size: int, n_hands: int, game_type: int, keys: list, chips: int = 10_000,
+        packed_state: bool = True, stamps: int = STAMPS, seed: int = 1, use_mongo: bool = False) -> dict:
+    chain = Chain(stamps=stamps, use_mongo=use_mongo)
+    rng = random.Random(seed)
+    players = [f'player{i:05d}' for i in range(n_players)]
+    key_of = dict(zip(players, keys))
+
+    start = time.perf_counter()
+    for player in players:
+        chain.setup_player(player, key_of[player], chips)
+    game_config = {'game_type': game_type, 'bet_type': 0, 'ante': 1, 'packed_state': packed_state}
+    if game_type == 2:
+        game_config.update(n_cards_total=5, n_hole_cards=3)
+    tables = []
+    for t in range(n_players // table_size):
+        seated = players[t * table_size:(t + 1) * table_size]
+        game_id = chain.setup_table(f'load{t}', seated, game_config, chips // 2)
+        tables.append(play_table(chain, game_id, seated, key_of, game_type, n_hands, rng))
+    setup_seconds = time.perf_counter() - start
+
+    # Round robin, one transaction per table per block
+    start = time.perf_counter()
+    pending = [(table, None) for table in tables]
+    while len(pending) > 0:
+        chain.next_block()
+        still_running = []
+        for table, output in pending:
+            try:
+                signer, function, kwargs = table.send(output)
+            except StopIteration:
+                continue
+            still_running.append((table, chain.execute(signer, function, kwargs)))
+        pending = still_running
+    seconds = time.perf_counter() - start
+
+    summary = chain.stats.summary()
+    summary.update({
+        'players': n_players,
+        'table_size': table_size,
+        'tables': len(tables),
+        'game_type': game_type,
+        'packed_state': packed_state,
+        'blocks': chain.block,
+        'setup_seconds': setup_seconds,
+        'seconds': seconds,
+        'tx_per_sec': sum([c['calls'] for c in summary['exports'].values()]) / seconds,
+    })
+    return summary
+
+
+def print_summary(summary: dict, stamps: int):
+    print(f"\n{summary['tables']} tables x {summary['table_size']} players, "
+          f"{summary['hands']} hands in {summary['seconds']:.1f}s "
+          f"({summary['tx_per_sec']:.0f} tx/s), {summary['hand_state_bytes_mean']:.0f} state bytes per hand")
+    for function, e in summary['exports'].items():
+        limit = '  OUT OF STAMPS' if e['stamps']['p100'] >= stamps else ''
+        print(f"  {function:<18} {e['calls']:>7} calls {e['failures']:>5} failed"
+              f"  ms p50 {e['ms']['p50']:7.2f} p90 {e['ms']['p90']:7.2f} p99 {e['ms']['p99']:7.2f}"
+              f"  stamps p50 {e['stamps']['p50']:>7} p99 {e['stamps']['p99']:>7} max {e['stamps']['p100']:>7}"
+              f"  {e['write_bytes_mean']:8.0f} B written{limit}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Multi-table load driver for the poker contracts')
+    parser.add_argument('--players', type=int, default=200)
+    parser.add_argument('--table-size', type=int, default=10)
+    parser.add_argument('--sweep', default=None, help='comma separated table sizes, overrides --table-size')
+    parser.add_argument('--hands', type=int, default=3)
+    parser.add_argument('--game-type', type=int, default=HOLDEM_POKER)
+    parser.add_argument('--legacy-state', action='store_true', help='a key per hand field instead of packed state')
+    parser.add_argument('--stamps', type=int, default=STAMPS, help='stamp limit per transaction')
+    parser.add_argument('--key-cache', default=join(REPO_DIR, '.load_test_keys'), help='KeyPool store prefix')
+    parser.add_argument('--processes', type=int, default=None, help='key generation processes')
+    parser.add_argument('--mongo', action='store_true', help='use the mongo driver instead of memory')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write results to this JSON file')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sweep.split(',')] if args.sweep else [args.table_size]
+    n_players = max(args.players, max(sizes))
+    keys = load_key_pool(n_players, args.key_cache, args.processes)
+
+    results = []
+    for size in sizes:
+        summary = run(
+            n_players=n_players - n_players % size,
+            table_size=size,
+            n_hands=args.hands,
+            game_type=args.game_type,
+            keys=keys,
+            packed_state=not args.legacy_state,
+            stamps=args.stamps,
+            seed=args.seed,
+            use_mongo=args.mongo,
+        )
+        print_summary(summary, args.stamps)
+        results.append(summary)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,48 @@
+import unittest
+import itertools
+import random
+import sys
+from os.path import dirname, abspath, join
+
+import numpy as np
+
+sys.path.insert(0, join(dirname(dirname(dirname(abspath(__file__)))), 'cards'))
+
+from bulk_evaluator import evaluate_array, card_array, ev
+
+
+class MyTestCase(unittest.TestCase):
+    def test_all_5_card_hands(self):
+        hands = np.array(list(itertools.combinations(range(52), 5)), dtype=np.int64)
+        ranks = evaluate_array(hands, chunk_size=500_000)
+        expected = [ev.evaluate_5_card_ints(hand) for hand in hands.tolist()]
+        self.assertEqual(ranks.dtype, np.int64)
+        self.assertEqual(ranks.tolist(), expected)
+
+    def test_7_card_hands(self):
+        rng = random.Random(3)
+        deck = list(range(52))
+        hands = [rng.sample(deck, 7) for _ in range(100_000)]
+        for _ in range(20_000):
+            suit = rng.randrange(4)
+            hand = rng.sample(deck[suit * 13:suit * 13 + 13], rng.randint(5, 7))
+            hands.append(hand + rng.sample([c for c in deck if c not in hand], 7 - len(hand)))
+        ranks = evaluate_array(hands)
+        self.assertEqual(ranks.tolist(), [ev.evaluate_7_card_ints(hand) for hand in hands])
+
+    def test_card_strings(self):
+        hands = [['Tc', 'Jc', 'Qc', 'Kc', 'Ac', '2d', '2h'], ['Ac', '2c', '3c', '4c', '5h', '9s', '9d']]
+        self.assertEqual(
+            evaluate_array(card_array(hands)).tolist(),
+            [ev.evaluate(hand) for hand in hands]
+        )
+
+    def test_invalid_shape(self):
+        with self.assertRaises(ValueError):
+            evaluate_array([[0, 1, 2, 3]])
+        with self.assertRaises(ValueError):
+            evaluate_array([[0, 1, 2, 3, 52]])
+
+
+if __name__ == '__main__':
+    unittest.main()
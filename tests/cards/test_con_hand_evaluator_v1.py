@@ -0,0 +1,292 @@
+#tests/test_contract.py
+import unittest
+import itertools
+import random
+from os.path import dirname, abspath, join
+
+from contracting.client import ContractingClient
+from contracting.stdlib import env
+
+client = ContractingClient()
+
+module_dir = join(dirname(dirname(dirname(abspath(__file__)))), 'cards')
+
+EVALUATOR_CONTRACT = 'con_hand_evaluator_v1'
+
+with open(join(module_dir, f'{EVALUATOR_CONTRACT}.py'), 'r') as f:
+    code = f.read()
+    client.submit(code, name=EVALUATOR_CONTRACT)
+
+
+def load_native(code: str) -> dict:
+    # Run the contract source as plain python so private helpers can be
+    # called millions of times without going through the client.
+    scope = env.gather()
+    scope['export'] = lambda fn: fn
+    scope['construct'] = lambda fn: fn
+    exec(code, scope)
+    return scope
+
+
+evaluator = load_native(code)
+
+
+# The original histogram based evaluator, kept as the reference for parity.
+def legacy_evaluate_5_card_ints(hand: list) -> int:
+    suits = [0] * 4
+    values = [0] * 13
+    for card in hand:
+        suits[card // 13] += 1
+        values[card % 13] += 1
+
+    rank_value = 0
+    for index, val in enumerate(values):
+        if val == 1:
+            rank_value += 2 ** (index + 1)
+        elif val > 1:
+            rank_value += 2 ** (index + 1) * 2 ** 13 * val
+
+    first_card_index = values.index(1) if 1 in values else -1
+    is_straight = False
+    if first_card_index >= 0:
+        c = values[first_card_index:first_card_index + 5]
+        if rank_value == int("10000000011110", 2) or \
+            (len(c) == 5 and all([d == 1 for d in c])):
+            is_straight = True
+
+    n_pairs = values.count(2)
+    is_trips = 3 in values
+    ranks = [
+        True,
+        n_pairs == 1,
+        n_pairs == 2,
+        is_trips,
+        is_straight,
+        5 in suits,
+        is_trips and n_pairs == 1,
+        4 in values,
+        5 in suits and is_straight,
+        5 in suits and is_straight and first_card_index == 8,
+    ]
+    rank_index = max([i for i in range(len(ranks)) if ranks[i]])
+    rank_value += rank_index * 10 ** 9 - \
+        ((rank_value == int("10000000011110", 2) and 2 ** 13 - 1) or 0)
+    return rank_value
+
+
+def legacy_best_rank(hand: list) -> int:
+    return max([
+        legacy_evaluate_5_card_ints(list(five))
+        for five in itertools.combinations(hand, 5)
+    ])
+
+
+def legacy_omaha_rank(hole_cards: list, board: list) -> int:
+    return max([
+        legacy_evaluate_5_card_ints(list(hole) + list(common))
+        for hole in itertools.combinations(hole_cards, 2)
+        for common in itertools.combinations(board, 3)
+    ])
+
+
+class MyTestCase(unittest.TestCase):
+    def test_evaluate_categories(self):
+        client.signer = 'me'
+        contract = client.get_contract(EVALUATOR_CONTRACT)
+
+        hand_royal_flush = ["Tc", "Jc", "Qc", "Kc", "Ac"]
+        hand_straight_flush = ["2c", "3c", "4c", "5c", "6c"]
+        hand_quads = ["4s", "4h", "4c", "4d", "2c"]
+        hand_full_house = ["2c", "2h", "4c", "4h", "4d"]
+        hand_flush = ["2c", "3c", "4c", "5c", "7c"]
+        hand_straight = ["2c", "3c", "4c", "5c", "6h"]
+        hand_low_straight = ["Ac", "2c", "3c", "4c", "5h"]
+        hand_trips = ["4s", "4h", "4c", "9d", "2c"]
+        hand_2_pair = ["2c", "2h", "4c", "4h", "5d"]
+        hand_1_pair = ["2c", "2h", "4c", "6h", "5d"]
+        hand_jack_high = ["2c", "3h", "7c", "8h", "Jd"]
+
+        ordered = [
+            hand_royal_flush,
+            hand_straight_flush,
+            hand_quads,
+            hand_full_house,
+            hand_flush,
+            hand_straight,
+            hand_low_straight,
+            hand_trips,
+            hand_2_pair,
+            hand_1_pair,
+            hand_jack_high,
+        ]
+        ranks = [contract.evaluate(hand=hand) for hand in ordered]
+
+        for i in range(len(ranks) - 1):
+            self.assertGreater(ranks[i], ranks[i + 1])
+
+        self.assertEqual(ranks[6] % 10 ** 9, 31)
+
+    def test_evaluate_accepts_card_indexes(self):
+        client.signer = 'me'
+        contract = client.get_contract(EVALUATOR_CONTRACT)
+
+        deck = contract.get_deck(shuffled=False)
+        for n in (1, 5, 7, 9):
+            hand = contract.get_deck()[:n]
+            self.assertEqual(
+                contract.evaluate(hand=hand),
+                contract.evaluate(hand=[deck.index(card) for card in hand])
+            )
+
+        self.assertEqual(contract.evaluate(hand=['2c']), 1)
+        self.assertEqual(contract.evaluate(hand=['As']), 13)
+
+    def test_evaluate_many(self):
+        client.signer = 'me'
+        contract = client.get_contract(EVALUATOR_CONTRACT)
+
+        deck = contract.get_deck()
+        board = deck[:5]
+        holdem = [deck[5 + 2 * i:7 + 2 * i] for i in range(10)]
+        omaha = [deck[5 + 4 * i:9 + 4 * i] for i in range(10)]
+        blind = [[card] for card in deck[:10]]
+
+        self.assertEqual(
+            contract.evaluate_many(hands=holdem, board=board),
+            [contract.evaluate(hand=hand + board) for hand in holdem]
+        )
+        self.assertEqual(
+            contract.evaluate_many(hands=omaha, board=board),
+            [contract.evaluate(hand=hand + board) for hand in omaha]
+        )
+        self.assertEqual(
+            contract.evaluate_many(hands=blind),
+            [contract.evaluate(hand=hand) for hand in blind]
+        )
+
+    def test_evaluate_detailed(self):
+        client.signer = 'me'
+        contract = client.get_contract(EVALUATOR_CONTRACT)
+
+        result = contract.evaluate_detailed(hand=['As', 'Ks', '2c', 'Qs', 'Js', '2d', 'Ts'])
+        self.assertEqual(result['name'], 'royal_flush')
+        self.assertEqual(result['category'], 9)
+        self.assertEqual(sorted(result['cards']), sorted(['As', 'Ks', 'Qs', 'Js', 'Ts']))
+
+        result = contract.evaluate_detailed(hand=['Ah', 'Ad', '2c', '2d', '5h', '5s', 'Kc'])
+        self.assertEqual(result['name'], 'two_pairs')
+        self.assertEqual(sorted(result['cards']), sorted(['Ah', 'Ad', '5h', '5s', 'Kc']))
+
+        evaluate_detailed = evaluator['evaluate_detailed']
+        evaluate = evaluator['evaluate']
+        deck = evaluator['DECK']
+        rng = random.Random(11)
+        hands = []
+        for _ in range(5_000):
+            hands.append(rng.sample(range(52), rng.choice([5, 7, 9])))
+            suit = rng.randrange(4)
+            hand = rng.sample(range(suit * 13, suit * 13 + 13), 5)
+            hands.append(hand + rng.sample([c for c in range(52) if c not in hand], 2))
+            values = rng.sample(range(13), 3)
+            hands.append(rng.sample([v + 13 * s for v in values for s in range(4)], 7))
+
+        for hand in hands:
+            result = evaluate_detailed(hand)
+            five = [deck.index(card) for card in result['cards']]
+            self.assertEqual(result['rank'], evaluate(hand), hand)
+            self.assertEqual(len(five), 5, hand)
+            self.assertEqual(legacy_evaluate_5_card_ints(five), result['rank'], hand)
+            if len(hand) == 9:
+                self.assertEqual(len(set(five) & set(hand[:4])), 2, hand)
+                self.assertEqual(len(set(five) & set(hand[4:])), 3, hand)
+            else:
+                self.assertTrue(set(five) <= set(hand), hand)
+
+    def test_deal(self):
+        client.signer = 'me'
+        contract = client.get_contract(EVALUATOR_CONTRACT)
+
+        deck = contract.get_deck(shuffled=False)
+        cards = contract.deal(n_cards=25)
+        self.assertEqual(len(cards), 25)
+        self.assertEqual(len(set(cards)), 25)
+        self.assertTrue(all([0 <= card < 52 for card in cards]))
+        self.assertEqual(sorted(contract.deal(n_cards=52)), list(range(52)))
+
+        cards = contract.deal(n_cards=7, as_strings=True)
+        self.assertTrue(all([card in deck for card in cards]))
+        self.assertEqual(len(set(cards)), 7)
+
+        # Every card shows up once per deck
+        cards = contract.deal(n_cards=104, n_decks=2)
+        self.assertEqual(sorted(cards), sorted(list(range(52)) * 2))
+
+        with self.assertRaises(AssertionError):
+            contract.deal(n_cards=53)
+        with self.assertRaises(AssertionError):
+            contract.deal(n_cards=1, n_decks=0)
+
+    def test_5_card_parity_with_legacy_evaluator(self):
+        evaluate_5_card_ints = evaluator['evaluate_5_card_ints']
+        for hand in itertools.combinations(range(52), 5):
+            hand = list(hand)
+            self.assertEqual(
+                evaluate_5_card_ints(hand),
+                legacy_evaluate_5_card_ints(hand),
+                hand
+            )
+
+    def test_7_card_parity_with_legacy_evaluator(self):
+        evaluate_7_card_ints = evaluator['evaluate_7_card_ints']
+        rng = random.Random(7)
+        deck = list(range(52))
+        for _ in range(100_000):
+            hand = rng.sample(deck, 7)
+            self.assertEqual(
+                evaluate_7_card_ints(hand),
+                legacy_best_rank(hand),
+                hand
+            )
+
+        # Flush and paired heavy hands where category choices interact
+        for _ in range(20_000):
+            suit = rng.randrange(4)
+            hand = rng.sample(deck[suit * 13:suit * 13 + 13], rng.randint(4, 7))
+            hand += rng.sample([c for c in deck if c not in hand], 7 - len(hand))
+            self.assertEqual(evaluate_7_card_ints(hand), legacy_best_rank(hand), hand)
+
+            values = rng.sample(range(13), 3)
+            hand = rng.sample([v + 13 * s for v in values for s in range(4)], 7)
+            self.assertEqual(evaluate_7_card_ints(hand), legacy_best_rank(hand), hand)
+
+    def test_omaha_parity_with_legacy_evaluator(self):
+        evaluate_omaha = evaluator['evaluate_omaha']
+        rng = random.Random(9)
+        deck = list(range(52))
+        hands = [rng.sample(deck, 9) for _ in range(20_000)]
+        for _ in range(10_000):
+            # Boards and holdings that enable flushes, boats and straights
+            suit = rng.randrange(4)
+            cards = rng.sample(deck[suit * 13:suit * 13 + 13], rng.randint(4, 9))
+            cards += rng.sample([c for c in deck if c not in cards], 9 - len(cards))
+            rng.shuffle(cards)
+            hands.append(cards)
+
+            values = rng.sample(range(13), rng.randint(3, 4))
+            hands.append(rng.sample([v + 13 * s for v in values for s in range(4)], 9))
+
+            cards = [v + 13 * rng.randrange(4) for v in rng.sample(range(13), 7)]
+            cards += rng.sample([c for c in deck if c not in cards], 2)
+            rng.shuffle(cards)
+            hands.append(cards)
+
+        for cards in hands:
+            self.assertEqual(
+                evaluate_omaha(cards[:4], cards[4:]),
+                legacy_omaha_rank(cards[:4], cards[4:]),
+                cards
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
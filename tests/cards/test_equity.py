@@ -0,0 +1,70 @@
+import unittest
+import sys
+from os.path import dirname, abspath, join
+
+sys.path.insert(0, join(dirname(dirname(dirname(abspath(__file__)))), 'cards'))
+
+from equity import calculate_equity
+
+
+class MyTestCase(unittest.TestCase):
+    def test_river_is_decided(self):
+        result = calculate_equity(
+            hands=[['As', 'Ad'], ['Ks', 'Kd']],
+            board=['2c', '7h', '9d', 'Th', 'Jc'],
+            processes=1
+        )
+        self.assertTrue(result['exhaustive'])
+        self.assertEqual(result['trials'], 1)
+        self.assertEqual(result['equities'][0]['win'], 1.0)
+        self.assertEqual(result['equities'][1]['equity'], 0.0)
+
+    def test_flop_is_enumerated(self):
+        result = calculate_equity(
+            hands=[['As', 'Ad'], ['Ks', 'Kd']],
+            board=['2c', '7h', '9d'],
+            processes=2
+        )
+        self.assertTrue(result['exhaustive'])
+        self.assertEqual(result['trials'], 990)
+        # Only the two remaining kings (or a runner-runner) save KK
+        wins = round(result['equities'][1]['win'] * 990)
+        self.assertEqual(wins, 83)
+        total = sum([e['equity'] for e in result['equities']])
+        self.assertAlmostEqual(total, 1.0)
+
+    def test_split_pot(self):
+        result = calculate_equity(
+            hands=[['As', 'Kd'], ['Ac', 'Kh']],
+            board=['2c', '7h', '9d', 'Th'],
+            dead=['Ah'],
+            processes=1
+        )
+        self.assertTrue(result['exhaustive'])
+        self.assertEqual(result['trials'], 43)
+        self.assertGreater(result['equities'][0]['tie'], 0.9)
+
+    def test_omaha_and_random_opponents_are_sampled(self):
+        result = calculate_equity(
+            hands=[['As', 'Ad', 'Kh', 'Qh']],
+            opponents=3,
+            samples=4_000,
+            processes=2,
+            seed=1
+        )
+        self.assertFalse(result['exhaustive'])
+        self.assertEqual(result['trials'], 4_000)
+        self.assertGreater(result['equities'][0]['equity'], 0.25)
+        self.assertLess(result['equities'][0]['equity'], 0.6)
+
+    def test_invalid_input(self):
+        with self.assertRaises(ValueError):
+            calculate_equity(hands=[['As', 'Ad']])
+        with self.assertRaises(ValueError):
+            calculate_equity(hands=[['As', 'Ad'], ['As', 'Kd']])
+        with self.assertRaises(ValueError):
+            calculate_equity(hands=[['As', 'Ad'], ['Ks', 'Kd', 'Qs']])
+
+
+if __name__ == '__main__':
+    unittest.main()
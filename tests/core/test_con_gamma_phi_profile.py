@@ -15,6 +15,10 @@ PROFILE_IMPL_CONTRACT = 'con_gamma_phi_profile_impl_v1'
 CHANNEL_IMPL_CONTRACT = 'con_gamma_phi_channel_impl_v1'
 RSA_CONTRACT = 'con_rsa_encryption'
 
+with open(os.path.join(dirname(module_dir), 'rsa', f'{RSA_CONTRACT}.py'), 'r') as f:
+    code = f.read()
+    client.submit(code, name=RSA_CONTRACT)
+
 with open(os.path.join(module_dir, f'{PROFILE_CONTRACT}.py'), 'r') as f:
     code = f.read()
     client.submit(code, name=PROFILE_CONTRACT, signer='me')
@@ -23,10 +27,6 @@ with open(os.path.join(module_dir, f'{PROFILE_IMPL_CONTRACT}.py'), 'r') as f:
     code = f.read()
     client.submit(code, name=PROFILE_IMPL_CONTRACT, owner=PROFILE_CONTRACT, signer='me')
 
-with open(os.path.join(dirname(module_dir), 'rsa', f'{RSA_CONTRACT}.py'), 'r') as f:
-    code = f.read()
-    client.submit(code, name=RSA_CONTRACT)
-
 with open(os.path.join(module_dir, f'{CHANNEL_IMPL_CONTRACT}.py'), 'r') as f:
     code = f.read()
     client.submit(code, name=CHANNEL_IMPL_CONTRACT, owner=PROFILE_CONTRACT, signer='me')
@@ -408,6 +408,51 @@ class MyTestCase(unittest.TestCase):
     def test_create_profile_with_invalid_rsa_key(self):
         pass
 
+    def test_public_key_record(self):
+        user = str(uuid.uuid4())[:10]
+        vk, sk = generate_keys()
+        client.signer = user
+        contract = client.get_contract(PROFILE_CONTRACT)
+        contract.interact(
+            action='profile',
+            payload=dict(
+                action='create_profile',
+                username=user,
+                public_rsa_key=f'{vk.n}|{vk.e}'
+            )
+        )
+        record = contract.quick_read('metadata', user, ['public_rsa_key_record'])
+        self.assertEqual(record, {'n': vk.n, 'e': vk.e, 'k': 128})
+        self.assertIsInstance(record['n'], int)
+        self.assertIsInstance(record['e'], int)
+        self.assertIsInstance(record['k'], int)
+
+        vk, sk = generate_keys()
+        contract.interact(
+            action='profile',
+            payload=dict(
+                action='update_profile',
+                key='public_rsa_key',
+                value=f'{vk.n}|{vk.e}'
+            )
+        )
+        record = contract.quick_read('metadata', user, ['public_rsa_key_record'])
+        self.assertEqual(record['n'], vk.n)
+
+        self.assertRaises(
+            Exception,
+            contract.interact,
+            action='profile',
+            payload=dict(
+                action='update_profile',
+                key='public_rsa_key_record',
+                value={'n': 3, 'e': 3, 'k': 1}
+            )
+        )
+
+        contract.interact(action='profile', payload=dict(action='delete_profile'))
+        self.assertIsNone(contract.quick_read('metadata', user, ['public_rsa_key_record']))
+
     def test_create_profile_with_invalid_username(self):
         self.assertRaises(
             Exception, 
@@ -44,5 +44,81 @@ class MyTestCase(unittest.TestCase):
 
         self.assertEqual(plain_text, decrypted)
 
+    def test_seal(self):
+        client.signer = 'me'
+        contract = client.get_contract(OTP_CONTRACT)
+
+        key = contract.generate_otp(n_bits=128)
+        # Longer than one keystream block
+        plain_text = "Kh,As,9c:1234|" + "|".join([f'{i}:{i * 7}' for i in range(30)])
+        sealed = contract.seal(message_str=plain_text, key=key)
+
+        self.assertEqual(len(sealed), 2 * len(plain_text))
+        self.assertNotIn("Kh,As", bytes.fromhex(sealed).decode('latin-1'))
+        self.assertEqual(contract.unseal(sealed_str=sealed, key=key), plain_text)
+        self.assertNotEqual(contract.seal(message_str=plain_text, key=key + 1), sealed)
+
+        self.assertEqual(contract.seal(message_str='', key=key), '')
+        self.assertEqual(contract.unseal(sealed_str='', key=key), '')
+        self.assertEqual(contract.seal_chunk(chunk_str='', key=key, offset=5), '')
+        self.assertEqual(contract.unseal_chunk(sealed_str='', key=key, offset=5), '')
+
+    def test_layers(self):
+        client.signer = 'me'
+        contract = client.get_contract(OTP_CONTRACT)
+
+        otps = [contract.generate_otp(n_bits=100) for i in range(10)]
+        plain_text = "Kh,As,9c"
+
+        # One pad after another
+        encrypted = contract.encrypt(message_str=plain_text, otp=otps[0], safe=False)
+        for otp in otps[1:]:
+            encrypted = contract.encrypt_hex(message_str=encrypted, otp=otp, safe=False)
+
+        self.assertEqual(contract.layer_encrypt(message_str=plain_text, otps=otps), encrypted)
+        # Pads can be taken off in any order
+        self.assertEqual(contract.layer_decrypt(encrypted_str=encrypted, otps=otps[::-1]), plain_text)
+
+        message = 123456789
+        encrypted_int = contract.layer_encrypt_int(message=message, otps=otps)
+        self.assertNotEqual(encrypted_int, message)
+        self.assertEqual(contract.layer_decrypt_int(encrypted=encrypted_int, otps=otps), message)
+
+    def test_seal_chunks(self):
+        client.signer = 'me'
+        contract = client.get_contract(OTP_CONTRACT)
+
+        key = contract.generate_otp(n_bits=128)
+        plain_text = "|".join([f'chat message {i}, ünïcode' for i in range(20)])
+        sealed = contract.seal(message_str=plain_text, key=key)
+
+        # Pieces that do not line up with keystream blocks
+        pieces = [plain_text[i:i + 37] for i in range(0, len(plain_text), 37)]
+        sealed_pieces = []
+        offset = 0
+        for piece in pieces:
+            sealed_pieces.append(contract.seal_chunk(chunk_str=piece, key=key, offset=offset))
+            offset += len(piece.encode())
+        self.assertEqual("".join(sealed_pieces), sealed)
+
+        offset = 0
+        unsealed = []
+        for sealed_piece in sealed_pieces:
+            unsealed.append(contract.unseal_chunk(sealed_str=sealed_piece, key=key, offset=offset))
+            offset += len(sealed_piece) // 2
+        self.assertEqual("".join(unsealed), plain_text)
+
+    def test_derive_otp(self):
+        client.signer = 'me'
+        contract = client.get_contract(OTP_CONTRACT)
+
+        seed = contract.generate_otp(n_bits=256)
+        otps = [contract.derive_otp(seed=seed, counter=i, n_bits=80) for i in range(20)]
+        self.assertEqual(len(set(otps)), 20)
+        self.assertTrue(all([otp < 2 ** 80 for otp in otps]))
+        self.assertEqual(contract.derive_otp(seed=seed, counter=3, n_bits=80), otps[3])
+        self.assertLess(contract.derive_otp(seed=seed, counter=0, n_bits=300), 2 ** 300)
+        self.assertNotEqual(contract.derive_otp(seed=seed + 1, counter=3, n_bits=80), otps[3])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -20,8 +20,13 @@ DENOMINATION = 100_000
 
 PROFILE_CONTRACT = 'con_gamma_phi_profile_v5'
 PROFILE_IMPL_CONTRACT = 'con_gamma_phi_profile_impl_v1'
+RSA_CONTRACT = 'con_rsa_encryption'
 
 
+with open(os.path.join(dirname(module_dir), 'rsa', f'{RSA_CONTRACT}.py'), 'r') as f:
+    code = f.read()
+    client.submit(code, name=RSA_CONTRACT)
+
 with open(os.path.join(dirname(module_dir), 'profile', f'{PROFILE_CONTRACT}.py'), 'r') as f:
     code = f.read()
     client.submit(code, name=PROFILE_CONTRACT, signer='me')
@@ -1,6 +1,7 @@
 #tests/test_contract.py
 import unittest
 import os
+import hashlib
 import rsa # For generating keys only
 from contracting.client import ContractingClient
 from os.path import dirname, abspath, join
@@ -12,14 +13,17 @@ client = ContractingClient()
 module_dir = join(dirname(dirname(dirname(abspath(__file__)))), 'poker')
 external_deps_dir = os.path.dirname(module_dir)
 
-POKER_CONTRACT = 'con_poker_card_games_v3'
+POKER_CONTRACT = 'con_poker_card_games_v4'
 GAME_CONTROLLER_CONTRACT = 'con_poker_game_controller_v2'
 HAND_CONTROLLER_CONTRACT = 'con_poker_hand_controller_v3'
+TOURNAMENT_CONTROLLER_CONTRACT = 'con_poker_tournament_controller_v1'
 PHI_CONTRACT = 'con_phi_lst001'
 RSA_CONTRACT = 'con_rsa_encryption'
-PROFILE_CONTRACT = 'con_gamma_phi_profile_v4'
+PROFILE_CONTRACT = 'con_gamma_phi_profile_v5'
+PROFILE_IMPL_CONTRACT = 'con_gamma_phi_profile_impl_v1'
 EVALUATOR_CONTRACT = 'con_hand_evaluator_v1'
 OTP_CONTRACT = 'con_otp_v1'
+SETTLEMENT_CONTRACT = 'con_pot_settlement_v1'
 ONE_CARD_POKER = 0
 BLIND_POKER = 1
 STUD_POKER = 2
@@ -44,14 +48,22 @@ with open(os.path.join(external_deps_dir, 'core', f'{PHI_CONTRACT}.py'), 'r') as
     code = f.read()
     client.submit(code, name=PHI_CONTRACT, signer=ME)
 
-with open(os.path.join(external_deps_dir, 'core', f'{PROFILE_CONTRACT}.py'), 'r') as f:
+with open(os.path.join(external_deps_dir, 'profile', f'{PROFILE_CONTRACT}.py'), 'r') as f:
     code = f.read()
-    client.submit(code, name=PROFILE_CONTRACT)
+    client.submit(code, name=PROFILE_CONTRACT, signer=ME)
+
+with open(os.path.join(external_deps_dir, 'profile', f'{PROFILE_IMPL_CONTRACT}.py'), 'r') as f:
+    code = f.read()
+    client.submit(code, name=PROFILE_IMPL_CONTRACT, owner=PROFILE_CONTRACT, signer=ME)
 
 with open(os.path.join(external_deps_dir, 'cards', f'{EVALUATOR_CONTRACT}.py'), 'r') as f:
     code = f.read()
     client.submit(code, name=EVALUATOR_CONTRACT)
 
+with open(os.path.join(module_dir, f'{SETTLEMENT_CONTRACT}.py'), 'r') as f:
+    code = f.read()
+    client.submit(code, name=SETTLEMENT_CONTRACT)
+
 with open(os.path.join(module_dir, f'{POKER_CONTRACT}.py'), 'r') as f:
     code = f.read()
     client.submit(code, name=POKER_CONTRACT)
@@ -64,6 +76,13 @@ with open(os.path.join(module_dir, f'{GAME_CONTROLLER_CONTRACT}.py'), 'r') as f:
     code = f.read()
     client.submit(code, name=GAME_CONTROLLER_CONTRACT, owner=POKER_CONTRACT)
 
+with open(os.path.join(module_dir, f'{TOURNAMENT_CONTROLLER_CONTRACT}.py'), 'r') as f:
+    code = f.read()
+    client.submit(code, name=TOURNAMENT_CONTROLLER_CONTRACT, owner=POKER_CONTRACT)
+
+client.signer = ME
+client.get_contract(PROFILE_CONTRACT).register_action(action='profile', contract=PROFILE_IMPL_CONTRACT)
+
 
 # Generate keys with rsa library
 def generate_keys():
@@ -93,9 +112,13 @@ def setup_players(players: list):
         vk, sk = generate_keys()
         KEY_STORE[p] = sk
         profile = get_contract_for_signer(p, PROFILE_CONTRACT)
-        profile.create_profile(
-            username=p,
-            public_rsa_key=str(vk.n)+"|"+str(vk.e)
+        profile.interact(
+            action='profile',
+            payload=dict(
+                action='create_profile',
+                username=p,
+                public_rsa_key=str(vk.n)+"|"+str(vk.e)
+            )
         )
 
 def setup_game(creator: str, other_players: list, **kwargs):
@@ -110,6 +133,7 @@ def setup_game(creator: str, other_players: list, **kwargs):
             n_cards_total=kwargs.get('n_card_totals'),
             bet_type=kwargs.get('bet_type', 0),
             ante=kwargs.get('ante', 1.0),
+            packed_state=kwargs.get('packed_state', False),
         )       
     )
 
@@ -131,6 +155,15 @@ def setup_game(creator: str, other_players: list, **kwargs):
 
     return game_id
 
+def read_hand(hand_id: str, key: str, player: str = None):
+    # Betting state lives in one 'state' record for packed hands
+    contract = get_contract_for_signer(ME, POKER_CONTRACT)
+    state = contract.quick_read('hands', hand_id, ['state'])
+    if state is not None:
+        return state.get(key if player is None else f'{player}:{key}')
+    return contract.quick_read('hands', hand_id, [key] if player is None else [player, key])
+
+
 def ante_up(players: list, hand_id: str):
     # Start a game
     for p in players:
@@ -139,17 +172,34 @@ def ante_up(players: list, hand_id: str):
             hand_id=hand_id
         )
 
+def unseal(sealed: str, key: int) -> str:
+    # Same sha3 keystream as con_otp_v1.seal
+    sealed_bytes = bytes.fromhex(sealed)
+    stream = b"".join([
+        hashlib.sha3_256(f'{key}:{i}'.encode()).digest()
+        for i in range(len(sealed_bytes) // 32 + 1)
+    ])
+    return bytes([a ^ b for a, b in zip(sealed_bytes, stream)]).decode('utf-8')
+
+
+def decrypt_payload(player: str, hand_id: str):
+    # hand:salt, followed by pad:salt per community card in hold'em/omaha,
+    # sealed under a session key that is RSA encrypted for the player
+    contract = get_contract_for_signer(player, POKER_CONTRACT)
+    encrypted = contract.quick_read('hands', hand_id, [player, 'player_encrypted_hand'])
+    wrapped_key, sealed = encrypted.split(':')
+    key = int(rsa.decrypt(bytes.fromhex(wrapped_key), KEY_STORE[player]).decode('utf-8'))
+    return unseal(sealed, key).split('|')
+
+
 def decrypt_hand(player: str, hand_id: str):
     # Decrypt hands
-    contract = get_contract_for_signer(player, POKER_CONTRACT)
-    hand = contract.quick_read('hands', hand_id, [player, 'player_encrypted_hand'])
-    return rsa.decrypt(bytes.fromhex(hand), KEY_STORE[player]).decode('utf-8')
+    return decrypt_payload(player, hand_id)[0]
 
 
 def reveal_community_cards_for_player(player: str, index: int, hand_id: str):
     contract = get_contract_for_signer(player, POKER_CONTRACT)
-    pad_with_salt = contract.quick_read('hands', hand_id, [player, f'player_encrypted_pad{index}'])
-    pad_with_salt = rsa.decrypt(bytes.fromhex(pad_with_salt), KEY_STORE[player]).decode('utf-8')
+    pad_with_salt = decrypt_payload(player, hand_id)[index]
 
     pad = int(pad_with_salt.split(':')[0])
     salt = int(pad_with_salt.split(':')[1])
@@ -162,8 +212,8 @@ def reveal_community_cards_for_player(player: str, index: int, hand_id: str):
 
 def reveal_community_cards(index: int, hand_id: str):
     contract = get_contract_for_signer(ME, POKER_CONTRACT)
-    players = contract.quick_read('hands', hand_id, ['active_players'])
-    folded = contract.quick_read('hands', hand_id, ['folded'])
+    players = read_hand(hand_id, 'active_players')
+    folded = read_hand(hand_id, 'folded')
     for player in players:
         if player in folded:
             continue
@@ -203,8 +253,8 @@ def kick_from_game(creator: str, player: str, game_id: str):
 
 def verify_hands(hand_id: str):
     contract = get_contract_for_signer(ME, POKER_CONTRACT)
-    players = contract.quick_read('hands', hand_id, ['active_players'])
-    folded = contract.quick_read('hands', hand_id, ['folded'])
+    players = read_hand(hand_id, 'active_players')
+    folded = read_hand(hand_id, 'folded')
     for player in players:
         if player not in folded:
             hand = decrypt_hand(player, hand_id)
@@ -226,21 +276,22 @@ class MyTestCase(unittest.TestCase):
 
     def assert_chips_in_pot(self, player: str, hand_id: str, expected_chips: float):
         contract = get_contract_for_signer(ME, POKER_CONTRACT)
-        chips = contract.quick_read('hands', hand_id, [player, 'bet'])
+        chips = read_hand(hand_id, 'bet', player)
         self.assertEqual(chips, expected_chips)
 
     def assert_total_chips_in_pot(self, hand_id: str, expected_chips: float):
         contract = get_contract_for_signer(ME, POKER_CONTRACT)
-        chips = contract.quick_read('hands', hand_id, ['pot'])
+        chips = read_hand(hand_id, 'pot')
         self.assertEqual(chips, expected_chips)
 
     # Actual tests
     def test_simple_community_games(self):
-        for game_type in [HOLDEM_POKER, OMAHA_POKER]:
+        for game_type, packed_state in [(HOLDEM_POKER, False), (OMAHA_POKER, False), (HOLDEM_POKER, True)]:
             game_id = setup_game(
                 creator=ME,
                 other_players=OTHER_PLAYERS,
                 game_type=game_type,
+                packed_state=packed_state,
             )
             contract = get_contract_for_signer(ME, POKER_CONTRACT)
             original_total = sum([contract.quick_read('games', game_id, [p]) for p in ALL_PLAYERS])
@@ -314,6 +365,9 @@ class MyTestCase(unittest.TestCase):
 
             final_total = sum([contract.quick_read('games', game_id, [p]) for p in ALL_PLAYERS])
             self.assertEqual(original_total, final_total)
+            if packed_state:
+                self.assertIsNone(contract.quick_read('hands', hand_id, ['pot']))
+                self.assertIsNone(contract.quick_read('hands', hand_id, [ME, 'bet']))
 
     def test_leave_hand(self):
         game_id = setup_game(
@@ -625,11 +679,9 @@ class MyTestCase(unittest.TestCase):
                 )
 
                 # Decrypt hands
-                my_hand = contract.quick_read('hands', hand_id, [ME, 'player_encrypted_hand'])
-                my_hand = rsa.decrypt(bytes.fromhex(my_hand), KEY_STORE[ME]).decode('utf-8')
+                my_hand = decrypt_hand(ME, hand_id)
 
-                your_hand = contract.quick_read('hands', hand_id, [OTHER_PLAYERS[0], 'player_encrypted_hand'])
-                your_hand = rsa.decrypt(bytes.fromhex(your_hand), KEY_STORE[OTHER_PLAYERS[0]]).decode('utf-8')
+                your_hand = decrypt_hand(OTHER_PLAYERS[0], hand_id)
 
                 # Verify hands
                 if game_type == ONE_CARD_POKER:
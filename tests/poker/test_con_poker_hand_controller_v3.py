@@ -0,0 +1,180 @@
+import unittest
+import sys
+from os.path import dirname, abspath, join
+
+from contracting.client import ContractingClient
+from contracting.stdlib import env
+from contracting.stdlib.bridge.time import Datetime
+
+client = ContractingClient()
+
+module_dir = join(dirname(dirname(dirname(abspath(__file__)))), 'poker')
+external_deps_dir = dirname(module_dir)
+
+sys.path.insert(0, module_dir)
+
+from hand_history import commitment_proofs
+
+RSA_CONTRACT = 'con_rsa_encryption'
+OTP_CONTRACT = 'con_otp_v1'
+EVALUATOR_CONTRACT = 'con_hand_evaluator_v1'
+SETTLEMENT_CONTRACT = 'con_pot_settlement_v1'
+HAND_CONTROLLER_CONTRACT = 'con_poker_hand_controller_v3'
+
+with open(join(external_deps_dir, 'rsa', f'{RSA_CONTRACT}.py'), 'r') as f:
+    client.submit(f.read(), name=RSA_CONTRACT)
+
+with open(join(external_deps_dir, 'otp', f'{OTP_CONTRACT}.py'), 'r') as f:
+    client.submit(f.read(), name=OTP_CONTRACT)
+
+with open(join(external_deps_dir, 'cards', f'{EVALUATOR_CONTRACT}.py'), 'r') as f:
+    client.submit(f.read(), name=EVALUATOR_CONTRACT)
+
+with open(join(module_dir, f'{SETTLEMENT_CONTRACT}.py'), 'r') as f:
+    client.submit(f.read(), name=SETTLEMENT_CONTRACT)
+
+with open(join(module_dir, f'{HAND_CONTROLLER_CONTRACT}.py'), 'r') as f:
+    code = f.read()
+
+
+def load_native(code: str) -> dict:
+    # Run the contract source as plain python, with dicts standing in for the
+    # hands hash, so its private helpers can be called directly
+    scope = env.gather()
+    scope['export'] = lambda fn: fn
+    scope['construct'] = lambda fn: fn
+    scope['now'] = Datetime(2024, 1, 1)
+    exec(code, scope)
+    return scope
+
+
+controller = load_native(code)
+
+
+class Store(dict):
+    def __getitem__(self, key):
+        return self.get(key)
+
+
+HOLDEM_POKER = 3
+PLAYERS = ['alice', 'bob', 'carol', 'dave']
+
+
+def seated_state() -> dict:
+    state = controller['new_hand_state']('h1', True, Store())
+    controller['set_hand_value'](state, 'active_players', list(PLAYERS))
+    controller['set_hand_value'](state, 'folded', [])
+    controller['set_hand_value'](state, 'all_in', [])
+    controller['seat_players'](state, PLAYERS)
+    return state
+
+
+class MyTestCase(unittest.TestCase):
+    def test_next_seat(self):
+        next_seat = controller['next_seat']
+        self.assertEqual(next_seat(0b1011, 0), 1)
+        self.assertEqual(next_seat(0b1011, 1), 3)
+        # Wraps round the table
+        self.assertEqual(next_seat(0b1011, 3), 0)
+        self.assertEqual(next_seat(0b0110, 2), 1)
+        # Only the given seat left
+        self.assertEqual(next_seat(0b0100, 2), 2)
+        self.assertEqual(next_seat(0, 1), -1)
+
+    def test_fold_all_in_player(self):
+        state = seated_state()
+        hand_value = controller['hand_value']
+        get_next_better = controller['get_next_better']
+
+        controller['go_all_in'](state, 'carol')
+        self.assertEqual(controller['betting_mask'](state), 0b1011)
+        self.assertEqual(get_next_better(state, 'bob'), 'dave')
+
+        controller['fold_player'](state, 'carol')
+        self.assertEqual(hand_value(state, 'folded'), ['carol'])
+        self.assertEqual(hand_value(state, 'all_in'), [])
+        self.assertEqual(hand_value(state, 'folded_mask'), 0b0100)
+        self.assertEqual(hand_value(state, 'all_in_mask'), 0)
+        self.assertEqual(controller['betting_mask'](state), 0b1011)
+        self.assertEqual(get_next_better(state, 'dave'), 'alice')
+
+        # Folding twice changes nothing
+        controller['fold_player'](state, 'carol')
+        self.assertEqual(hand_value(state, 'folded'), ['carol'])
+
+        controller['fold_player'](state, 'alice')
+        controller['fold_player'](state, 'bob')
+        self.assertIsNone(get_next_better(state, 'dave'))
+
+    def test_short_stack_ante(self):
+        def ante_table(tournament):
+            games, hands = Store(), Store()
+            games['g1', 'players'] = ['alice', 'bob', 'carol']
+            games['g1', 'game_type'] = HOLDEM_POKER
+            games['g1', 'packed_state'] = True
+            games['g1', 'ante'] = 10
+            games['g1', 'tournament'] = tournament
+            games['g1', 'alice'] = 100
+            games['g1', 'bob'] = 4
+            games['g1', 'carol'] = 100
+            hand_id = controller['start_hand'](game_id='g1', dealer='alice', games=games, hands=hands)
+            return hand_id, games, hands
+
+        hand_id, games, hands = ante_table('t1')
+        for player in ['bob', 'alice', 'carol']:
+            controller['ante_up'](hand_id=hand_id, player=player, games=games, hands=hands)
+        state = controller['load_hand_state'](hand_id, hands)
+        hand_value = controller['hand_value']
+        # Only the short stack posts less, and is all in for it
+        self.assertEqual(hand_value(state, 'bet', 'bob'), 4)
+        self.assertEqual(hand_value(state, 'bet', 'alice'), 10)
+        self.assertEqual(hand_value(state, 'current_bet'), 10)
+        self.assertEqual(hand_value(state, 'pot'), 24)
+        self.assertEqual(hand_value(state, 'all_in'), ['bob'])
+        self.assertEqual(games['g1', 'ante'], 10)
+        self.assertEqual(games['g1', 'bob'], 0)
+
+        # Outside tournaments a short stack has to top up first
+        hand_id, games, hands = ante_table(None)
+        with self.assertRaises(AssertionError):
+            controller['ante_up'](hand_id=hand_id, player='bob', games=games, hands=hands)
+
+    def test_verify_commitments(self):
+        sha3 = controller['hashlib'].sha3
+        values = {'active_players': ['alice', 'bob']}
+        revealed = {}
+        leaves = []
+        for player in values['active_players']:
+            for field in controller['commitment_fields'](4):
+                value = f'{player}-{field}:{len(leaves)}'
+                revealed[player, field] = value
+                key = 'house_encrypted_hand' if field == 'hand' else f'house_encrypted_{field}'
+                values[f'{player}:{key}'] = sha3(value)
+                leaves.append(controller['commitment_leaf'](player, field, sha3(value)))
+        hands = Store()
+        hands['h1', 'commitment_root'] = controller['merkle_root'](leaves)
+        values['commitment_root'] = hands['h1', 'commitment_root']
+
+        proofs = commitment_proofs(values)
+        reveals = []
+        for (player, field), proof in proofs.items():
+            reveals.append(dict(proof, player=player, field=field, value=revealed[player, field]))
+        verify = controller['verify_commitments']
+        self.assertEqual(verify(hand_id='h1', reveals=reveals, hands=hands), [True] * len(reveals))
+
+        reveal = reveals[5]
+        tampered = dict(reveal, value=reveal['value'] + '0')
+        wrong_index = dict(reveal, index=reveal['index'] ^ 1)
+        out_of_range = dict(reveal, index=reveal['index'] + 8)
+        other_player = dict(reveal, player='alice' if reveal['player'] == 'bob' else 'bob')
+        self.assertEqual(
+            verify(hand_id='h1', reveals=[tampered, wrong_index, out_of_range, other_player], hands=hands),
+            [False, False, False, False]
+        )
+
+        with self.assertRaises(AssertionError):
+            verify(hand_id='h2', reveals=reveals, hands=hands)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,279 @@
+#tests/test_contract.py
+import unittest
+import random
+from types import SimpleNamespace
+from unittest import mock
+from os.path import dirname, abspath, join
+
+from contracting.client import ContractingClient
+from contracting.stdlib import env
+from contracting.stdlib.bridge.time import Datetime
+
+client = ContractingClient()
+
+module_dir = join(dirname(dirname(dirname(abspath(__file__)))), 'poker')
+
+TOURNAMENT_CONTRACT = 'con_poker_tournament_controller_v1'
+GAME_CONTROLLER_CONTRACT = 'con_poker_game_controller_v2'
+
+with open(join(module_dir, f'{TOURNAMENT_CONTRACT}.py'), 'r') as f:
+    code = f.read()
+    client.submit(code, name=TOURNAMENT_CONTRACT)
+
+with open(join(module_dir, f'{GAME_CONTROLLER_CONTRACT}.py'), 'r') as f:
+    game_controller_code = f.read()
+
+
+def load_native(code: str) -> dict:
+    # Run the contract source as plain python, with dicts standing in for the
+    # games and tournaments hashes
+    scope = env.gather()
+    scope['export'] = lambda fn: fn
+    scope['construct'] = lambda fn: fn
+    scope['now'] = Datetime(2024, 1, 1)
+    exec(code, scope)
+    return scope
+
+
+controller = load_native(code)
+game_controller = load_native(game_controller_code)
+
+
+class Store(dict):
+    def __getitem__(self, key):
+        return self.get(key)
+
+
+class ReadCounter(Store):
+    reads = 0
+
+    def __getitem__(self, key):
+        self.reads += 1
+        return super().__getitem__(key)
+
+
+class Owner:
+    # Stands in for the card games contract the prizes are paid from
+    def __init__(self):
+        self.withdrawn = {}
+
+    def import_module(self, name):
+        return self
+
+    def force_withdraw(self, player, amount):
+        self.withdrawn[player] = self.withdrawn.get(player, 0) + amount
+
+
+GAME_CONFIG = {'game_type': 3, 'bet_type': 0}
+
+
+def tournament_config(**kwargs) -> dict:
+    config = {
+        'buy_in': 0,
+        'starting_chips': 100,
+        'table_size': 9,
+        'blind_schedule': [1, 2, 5, 10],
+        'level_minutes': 10,
+        'payouts': [50, 30, 20],
+    }
+    config.update(kwargs)
+    return config
+
+
+def start(n_players: int, **kwargs) -> tuple:
+    games, tournaments = Store(), Store()
+    tournament_id = controller['create_tournament'](
+        name='sunday', game_config=GAME_CONFIG,
+        tournament_config=tournament_config(**kwargs),
+        creator='host', tournaments=tournaments
+    )
+    for i in range(n_players):
+        controller['register'](tournament_id=tournament_id, player=f'p{i}', tournaments=tournaments)
+    controller['start_tournament'](tournament_id=tournament_id, caller='host', games=games, tournaments=tournaments)
+    return tournament_id, games, tournaments
+
+
+def seated_tables(tournament_id: str, tournaments: Store) -> dict:
+    # Open tables and how many sit at each, from the size buckets
+    seated = {}
+    for n_seated in range(1, tournaments[tournament_id, 'table_size'] + 1):
+        for table_id in tournaments[tournament_id, 'tables', n_seated] or []:
+            seated[table_id] = n_seated
+    return seated
+
+
+class MyTestCase(unittest.TestCase):
+    def test_create_validates_config(self):
+        tournaments = Store()
+        create = controller['create_tournament']
+        with self.assertRaises(AssertionError):
+            create(name='t', game_config=GAME_CONFIG, tournament_config=tournament_config(payouts=[50, 30]),
+                   creator='host', tournaments=tournaments)
+        with self.assertRaises(AssertionError):
+            create(name='t', game_config=GAME_CONFIG, tournament_config=tournament_config(table_size=11),
+                   creator='host', tournaments=tournaments)
+        with self.assertRaises(AssertionError):
+            create(name='t', game_config=GAME_CONFIG, tournament_config=tournament_config(blind_schedule=[]),
+                   creator='host', tournaments=tournaments)
+
+    def test_seating(self):
+        tournament_id, games, tournaments = start(500)
+        seated = seated_tables(tournament_id, tournaments)
+        self.assertEqual(len(seated), 56)
+        self.assertEqual(tournaments[tournament_id, 'n_tables'], 56)
+        self.assertEqual(tournaments[tournament_id, 'min_seated'], 8)
+        self.assertEqual(tournaments[tournament_id, 'max_seated'], 9)
+        self.assertLessEqual(max(seated.values()) - min(seated.values()), 1)
+        seen = set()
+        for table_id, n_seated in seated.items():
+            players = games[table_id, 'players']
+            self.assertEqual(len(players), n_seated)
+            self.assertEqual(tournaments[tournament_id, table_id, 'seated'], n_seated)
+            self.assertEqual(games[table_id, 'tournament'], tournament_id)
+            for player in players:
+                self.assertEqual(tournaments[tournament_id, player, 'table'], table_id)
+                self.assertEqual(games[table_id, player], 100)
+            seen.update(players)
+        self.assertEqual(len(seen), 500)
+
+        with self.assertRaises(AssertionError):
+            controller['register'](tournament_id=tournament_id, player='late', tournaments=tournaments)
+
+        # A hand that changes nothing reads as much with 56 tables as with 2
+        def settle_reads(n_players):
+            tournament_id, games, tournaments = start(n_players)
+            tournaments = ReadCounter(tournaments)
+            table_id = create_table_id(tournament_id, 0)
+            controller['settle_table'](game_id=table_id, games=games, tournaments=tournaments)
+            return tournaments.reads
+        create_table_id = controller['create_table_id']
+        self.assertEqual(settle_reads(500), settle_reads(18))
+
+    def test_blind_schedule(self):
+        tournament_id, games, tournaments = start(4, table_size=4)
+        table_id = list(seated_tables(tournament_id, tournaments).keys())[0]
+        prepare_hand = controller['prepare_hand']
+
+        prepare_hand(game_id=table_id, games=games, tournaments=tournaments)
+        self.assertEqual(games[table_id, 'ante'], 1)
+
+        tournaments[tournament_id, 'started_at'] = Datetime(2023, 12, 31, 23, 35)
+        prepare_hand(game_id=table_id, games=games, tournaments=tournaments)
+        self.assertEqual(games[table_id, 'ante'], 5)
+
+        # Past the last level the last ante stays
+        tournaments[tournament_id, 'started_at'] = Datetime(2023, 12, 31)
+        prepare_hand(game_id=table_id, games=games, tournaments=tournaments)
+        self.assertEqual(games[table_id, 'ante'], 10)
+
+        # A short stack does not lower the ante for the rest of the table
+        short_stack = games[table_id, 'players'][0]
+        games[table_id, short_stack] = 3
+        prepare_hand(game_id=table_id, games=games, tournaments=tournaments)
+        self.assertEqual(games[table_id, 'ante'], 10)
+        self.assertEqual(games[table_id, 'starting_stacks'][short_stack], 3)
+
+    def test_join_tournament_table(self):
+        tournament_id, games, tournaments = start(4, table_size=4)
+        table_id = list(seated_tables(tournament_id, tournaments).keys())[0]
+        players_invites, players_games = Store(), Store()
+
+        # Not even the creator can seat an outsider, who would have no chips
+        with self.assertRaises(AssertionError):
+            game_controller['add_player_to_game'](
+                game_id=table_id, player_to_add='outsider', player='host',
+                games=games, players_invites=players_invites
+            )
+        players_invites['outsider'] = [table_id]
+        with self.assertRaises(AssertionError):
+            game_controller['respond_to_invite'](
+                game_id=table_id, accept=True, player='outsider',
+                games=games, players_invites=players_invites, players_games=players_games
+            )
+        self.assertNotIn('outsider', games[table_id, 'players'])
+        self.assertIsNone(games[table_id, 'outsider'])
+
+    def test_play_to_a_winner(self):
+        n_players = 60
+        tournament_id, games, tournaments = start(n_players)
+        settle_table = controller['settle_table']
+        rng = random.Random(5)
+        total_chips = 100 * n_players
+
+        for _ in range(100_000):
+            if tournaments[tournament_id, 'status'] == 'finished':
+                break
+            seated = seated_tables(tournament_id, tournaments)
+            table_id = rng.choice([t for t in seated if seated[t] > 1])
+            controller['prepare_hand'](game_id=table_id, games=games, tournaments=tournaments)
+            players = games[table_id, 'players']
+            # Stand in for a hand, one player loses some or all of their chips
+            loser, winner = rng.sample(players, 2)
+            amount = games[table_id, loser] if rng.random() < 0.3 else rng.randint(0, games[table_id, loser])
+            games[table_id, loser] -= amount
+            games[table_id, winner] += amount
+            settle_table(game_id=table_id, games=games, tournaments=tournaments)
+
+            seated = seated_tables(tournament_id, tournaments)
+            if len(seated) > 0:
+                self.assertEqual(tournaments[tournament_id, 'n_tables'], len(seated))
+                self.assertEqual(tournaments[tournament_id, 'min_seated'], min(seated.values()))
+                self.assertEqual(tournaments[tournament_id, 'max_seated'], max(seated.values()))
+            on_tables = 0
+            for t, n_seated in seated.items():
+                self.assertEqual(len(games[t, 'players']), n_seated)
+                self.assertLessEqual(n_seated, 9)
+                for player in games[t, 'players']:
+                    self.assertEqual(tournaments[tournament_id, player, 'table'], t)
+                    on_tables += games[t, player]
+            if len(seated) > 0:
+                self.assertEqual(on_tables, total_chips)
+                self.assertEqual(sum(seated.values()), tournaments[tournament_id, 'n_players'])
+
+        self.assertEqual(tournaments[tournament_id, 'status'], 'finished')
+        places = sorted([tournaments[tournament_id, f'p{i}', 'place'] for i in range(n_players)])
+        self.assertEqual(places, list(range(1, n_players + 1)))
+        winner = tournaments[tournament_id, 'winner']
+        self.assertEqual(tournaments[tournament_id, winner, 'place'], 1)
+
+    def test_simultaneous_busts(self):
+        def bust_two(stacks):
+            # p0 to p3 at one table, the last two bust in the same hand
+            tournament_id, games, tournaments = start(4, table_size=4)
+            tournaments[tournament_id, 'prize_pool'] = 1000
+            table_id = create_table_id(tournament_id, 0)
+            players = list(games[table_id, 'players'])
+            for player, chips in zip(players, stacks):
+                games[table_id, player] = chips
+            controller['prepare_hand'](game_id=table_id, games=games, tournaments=tournaments)
+            # Everything the two lost goes to the first player
+            games[table_id, players[0]] += games[table_id, players[2]] + games[table_id, players[3]]
+            games[table_id, players[2]] = 0
+            games[table_id, players[3]] = 0
+            owner = Owner()
+            with mock.patch.dict(controller, {'I': owner, 'ctx': SimpleNamespace(owner='card_games')}):
+                controller['settle_table'](game_id=table_id, games=games, tournaments=tournaments)
+            places = {p: tournaments[tournament_id, p, 'place'] for p in players[2:]}
+            prizes = {p: owner.withdrawn.get(p, 0) for p in players[2:]}
+            return players, places, prizes, tournaments[tournament_id, 'n_players']
+
+        create_table_id = controller['create_table_id']
+
+        # The bigger stack takes the paid third place, whatever the seats
+        players, places, prizes, n_players = bust_two([100, 100, 40, 60])
+        self.assertEqual(n_players, 2)
+        self.assertEqual(places, {players[2]: 4, players[3]: 3})
+        self.assertEqual(prizes, {players[2]: 0, players[3]: 200})
+
+        players, places, prizes, n_players = bust_two([100, 100, 60, 40])
+        self.assertEqual(places, {players[2]: 3, players[3]: 4})
+        self.assertEqual(prizes, {players[2]: 200, players[3]: 0})
+
+        # Level stacks share third place and split its prize
+        players, places, prizes, n_players = bust_two([100, 100, 50, 50])
+        self.assertEqual(places, {players[2]: 3, players[3]: 3})
+        self.assertEqual(prizes, {players[2]: 100, players[3]: 100})
+
+
+if __name__ == '__main__':
+    unittest.main()
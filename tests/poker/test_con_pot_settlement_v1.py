@@ -0,0 +1,129 @@
+#tests/test_contract.py
+import unittest
+import random
+from os.path import dirname, abspath, join
+
+from contracting.client import ContractingClient
+from contracting.stdlib import env
+
+client = ContractingClient()
+
+module_dir = join(dirname(dirname(dirname(abspath(__file__)))), 'poker')
+
+SETTLEMENT_CONTRACT = 'con_pot_settlement_v1'
+
+with open(join(module_dir, f'{SETTLEMENT_CONTRACT}.py'), 'r') as f:
+    code = f.read()
+    client.submit(code, name=SETTLEMENT_CONTRACT)
+
+
+def load_native(code: str) -> dict:
+    # Run the contract source as plain python for the randomized checks
+    scope = env.gather()
+    scope['export'] = lambda fn: fn
+    scope['construct'] = lambda fn: fn
+    exec(code, scope)
+    return scope
+
+
+settlement = load_native(code)
+
+
+def reference_settle(contributions: dict, ranks: dict, order: list) -> dict:
+    # Layer by every contribution level, one pass per layer, layers with the
+    # same eligible players make up one pot
+    payouts = {}
+    layers = []
+    previous = 0
+    for level in sorted(set(contributions.values())):
+        amount = sum([min(c, level) - min(c, previous) for c in contributions.values()])
+        eligible = [p for p in ranks if contributions[p] >= level]
+        if len(eligible) > 0 and (len(layers) == 0 or layers[-1][1] != eligible):
+            layers.append([amount, eligible])
+        elif len(layers) > 0:
+            layers[-1][0] += amount
+        previous = level
+    for amount, eligible in layers:
+        best = max([ranks[p] for p in eligible])
+        winners = sorted([p for p in eligible if ranks[p] == best], key=order.index)
+        share = amount // len(winners)
+        for winner in winners:
+            payouts[winner] = payouts.get(winner, 0) + share
+        payouts[winners[0]] += amount - share * len(winners)
+    return payouts
+
+
+class MyTestCase(unittest.TestCase):
+    def test_single_pot(self):
+        contract = client.get_contract(SETTLEMENT_CONTRACT)
+        payouts = contract.settle(
+            contributions={'a': 5, 'b': 5, 'c': 2},
+            ranks={'a': 10, 'b': 20},
+            order=['a', 'b', 'c']
+        )
+        self.assertEqual(payouts, {'b': 12})
+
+    def test_split_pot(self):
+        contract = client.get_contract(SETTLEMENT_CONTRACT)
+        payouts = contract.settle(
+            contributions={'a': 4, 'b': 4, 'c': 4},
+            ranks={'a': 20, 'b': 10, 'c': 20},
+            order=['c', 'a', 'b']
+        )
+        self.assertEqual(set(payouts.keys()), {'a', 'c'})
+        self.assertEqual(payouts['a'] + payouts['c'], 12)
+
+    def test_side_pots(self):
+        contract = client.get_contract(SETTLEMENT_CONTRACT)
+        # a is all in for 10 with the best hand, b and c play for the rest,
+        # d folded after putting in 20
+        payouts = contract.settle(
+            contributions={'a': 10, 'b': 50, 'c': 50, 'd': 20},
+            ranks={'a': 30, 'b': 20, 'c': 10},
+            order=['a', 'b', 'c', 'd']
+        )
+        self.assertEqual(payouts, {'a': 40, 'b': 90})
+
+        # The all in player loses, everything goes to the best of the rest
+        payouts = contract.settle(
+            contributions={'a': 10, 'b': 50, 'c': 50},
+            ranks={'a': 10, 'b': 20, 'c': 30},
+            order=['a', 'b', 'c']
+        )
+        self.assertEqual(payouts, {'c': 110})
+
+    def test_odd_chips_go_to_first_seat(self):
+        split_pot = settlement['split_pot']
+        payouts = {}
+        split_pot(10, ['b', 'a', 'c'], payouts)
+        self.assertEqual(payouts, {'b': 4, 'a': 3, 'c': 3})
+
+        payouts = {'a': 1}
+        split_pot(11, ['a', 'c', 'b'], payouts)
+        self.assertEqual(payouts, {'a': 6, 'c': 3, 'b': 3})
+
+        # Fractions of a chip stay with the first winner too
+        payouts = {}
+        split_pot(10.5, ['c', 'a'], payouts)
+        self.assertEqual(payouts, {'c': 5.5, 'a': 5})
+
+    def test_parity_with_reference(self):
+        settle = settlement['settle']
+        rng = random.Random(3)
+        for _ in range(20_000):
+            players = [f'p{i}' for i in range(rng.randint(2, 10))]
+            contributions = {p: rng.choice([1, 2, 5, 10, 10, 20, 50]) for p in players}
+            ranks = {p: rng.randint(1, 4) for p in players if rng.random() < 0.7}
+            if len(ranks) == 0:
+                ranks = {players[0]: 1}
+            order = rng.sample(players, len(players))
+
+            payouts = settle(contributions, ranks, order)
+            expected = reference_settle(contributions, ranks, order)
+            self.assertEqual(set(payouts.keys()), set(expected.keys()), (contributions, ranks))
+            self.assertEqual(payouts, expected, (contributions, ranks, order))
+            self.assertEqual(sum(payouts.values()), sum(contributions.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
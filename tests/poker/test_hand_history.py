@@ -0,0 +1,149 @@
+import unittest
+import hashlib
+import io
+import json
+import sys
+from os.path import dirname, abspath, join
+
+sys.path.insert(0, join(dirname(dirname(dirname(abspath(__file__)))), 'poker'))
+
+from hand_history import iter_hands, write_jsonl, write_text, hand_values, commitment_proofs
+
+CONTRACT = 'con_poker_card_games_v4'
+
+
+class StateDump(dict):
+    # Stands in for a ContractDriver over a state dump
+    def items(self, prefix=''):
+        return {k: v for k, v in super().items() if k.startswith(prefix)}
+
+
+def build_state() -> StateDump:
+    state = StateDump()
+
+    def game(field, value):
+        state[f'{CONTRACT}.games:g1:{field}'] = value
+
+    def hand(hand_id, *args):
+        state[f'{CONTRACT}.hands:{hand_id}:' + ':'.join(args[:-1])] = args[-1]
+
+    game('name', 'sunday')
+    game('game_type', 3)
+    game('bet_type', 0)
+    game('alice', 120)
+    game('current_hand', 'h3')
+
+    # Legacy layout, a key per field
+    hand('h1', 'game_id', 'g1')
+    hand('h1', 'dealer', 'alice')
+    hand('h1', 'payed_out', True)
+    hand('h1', 'previous_hand_id', None)
+    hand('h1', 'active_players', ['bob', 'alice'])
+    hand('h1', 'folded', ['bob'])
+    hand('h1', 'all_in', [])
+    hand('h1', 'pot', 4)
+    hand('h1', 'bob', 'bet', 2)
+    hand('h1', 'alice', 'bet', 2)
+    hand('h1', 'winners', ['alice'])
+    hand('h1', 'payouts', {'alice': 4})
+
+    # Packed layout, one state record
+    hand('h2', 'game_id', 'g1')
+    hand('h2', 'dealer', 'bob')
+    hand('h2', 'payed_out', True)
+    hand('h2', 'previous_hand_id', 'h1')
+    hand('h2', 'community', ['2c,7h,9d', 'Th', 'Jc'])
+    hand('h2', 'alice', 'hand', ['As', 'Ad', '2c', '7h', '9d', 'Th', 'Jc'])
+    hand('h2', 'bob', 'hand', ['Ks', 'Kd', '2c', '7h', '9d', 'Th', 'Jc'])
+    hand('h2', 'winners', ['alice'])
+    hand('h2', 'payouts', {'alice': 20})
+    hand('h2', 'state', {
+        'active_players': ['alice', 'bob'],
+        'folded': [],
+        'all_in': ['bob'],
+        'pot': 20,
+        'round': 4,
+        'alice:bet': 10,
+        'bob:bet': 10,
+        'alice:rank': 1_000_000_000 + 8192,
+        'bob:rank': 1_000_000_000 + 4096,
+    })
+
+    # Still being played
+    hand('h3', 'game_id', 'g1')
+    hand('h3', 'payed_out', False)
+    hand('h3', 'previous_hand_id', 'h2')
+    return state
+
+
+class MyTestCase(unittest.TestCase):
+    def test_iter_hands(self):
+        records = list(iter_hands(build_state(), 'g1', contract=CONTRACT))
+        self.assertEqual([r['hand_id'] for r in records], ['h2', 'h1'])
+
+        packed, legacy = records
+        self.assertEqual(packed['board'], ['2c', '7h', '9d', 'Th', 'Jc'])
+        self.assertEqual(packed['players']['bob']['bet'], 10)
+        self.assertTrue(packed['players']['bob']['all_in'])
+        self.assertEqual(packed['players']['alice']['rank'], 1_000_008_192)
+        self.assertEqual(packed['payouts'], {'alice': 20})
+        self.assertEqual(packed['game_name'], 'sunday')
+
+        self.assertTrue(legacy['players']['bob']['folded'])
+        self.assertEqual(legacy['players']['alice']['bet'], 2)
+        self.assertEqual(legacy['board'], [])
+
+    def test_paging(self):
+        state = build_state()
+        first = list(iter_hands(state, 'g1', contract=CONTRACT, limit=1))
+        self.assertEqual([r['hand_id'] for r in first], ['h2'])
+        rest = list(iter_hands(state, 'g1', contract=CONTRACT, start_hand_id=first[-1]['previous_hand_id']))
+        self.assertEqual([r['hand_id'] for r in rest], ['h1'])
+
+    def test_writers(self):
+        records = list(iter_hands(build_state(), 'g1', contract=CONTRACT))
+
+        f = io.StringIO()
+        self.assertEqual(write_jsonl(records, f), 2)
+        lines = f.getvalue().splitlines()
+        self.assertEqual([json.loads(line)['hand_id'] for line in lines], ['h2', 'h1'])
+
+        f = io.StringIO()
+        self.assertEqual(write_text(records, f), 2)
+        text = f.getvalue()
+        self.assertIn("Hand #h2: Hold'em No Limit", text)
+        self.assertIn('showed [As Ad 2c 7h 9d Th Jc] with pair and won (20)', text)
+        self.assertIn('Seat 1: bob folded', text)
+
+    def test_commitment_proofs(self):
+        def sha3(data: bytes) -> str:
+            return hashlib.sha3_256(data).hexdigest()
+
+        state = build_state()
+        hand_commitment = sha3(b'As:77')
+        pad_commitment = sha3(b'12345:88')
+        state[f'{CONTRACT}.hands:h1:alice:house_encrypted_hand'] = hand_commitment
+        state[f'{CONTRACT}.hands:h1:bob:house_encrypted_hand'] = sha3(b'Kd:99')
+        state[f'{CONTRACT}.hands:h1:bob:house_encrypted_pad1'] = pad_commitment
+        leaves = [
+            sha3(f'bob:hand:{sha3(b"Kd:99")}'.encode()),
+            sha3(f'bob:pad1:{pad_commitment}'.encode()),
+            sha3(f'alice:hand:{hand_commitment}'.encode()),
+            '0' * 64,
+        ]
+        left = sha3(bytes.fromhex(leaves[0] + leaves[1]))
+        right = sha3(bytes.fromhex(leaves[2] + leaves[3]))
+        state[f'{CONTRACT}.hands:h1:commitment_root'] = sha3(bytes.fromhex(left + right))
+
+        proofs = commitment_proofs(hand_values(state, CONTRACT, 'h1'))
+        self.assertEqual(len(proofs), 3)
+        self.assertEqual(proofs['alice', 'hand'], {'player': 'alice', 'field': 'hand', 'index': 2, 'proof': [leaves[3], left]})
+        self.assertEqual(proofs['bob', 'pad1']['proof'], [leaves[0], right])
+
+        state[f'{CONTRACT}.hands:h1:commitment_root'] = left
+        with self.assertRaises(ValueError):
+            commitment_proofs(hand_values(state, CONTRACT, 'h1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
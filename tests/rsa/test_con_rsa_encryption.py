@@ -92,5 +92,44 @@ class MyTestCase(unittest.TestCase):
         self.assertNotEqual(encrypted, message)
         self.assertEqual(decrypted, message)
 
+    def test_encrypt_many(self):
+        client.signer = 'me'
+        contract = client.get_contract('con_rsa_encryption')
+
+        # Generate keys with rsa library
+        import rsa
+        (pubkey, privkey) = rsa.newkeys(1024)
+
+        messages = ["hello world", "", "x" * 117, "As,Kd:12345"]
+
+        # Encrypt all of them through smart contract in one call
+        encrypted = contract.encrypt_many(
+            messages=messages,
+            n=pubkey.n,
+            e=pubkey.e
+        )
+
+        # Decrypt with rsa library
+        decrypted = [rsa.decrypt(bytes.fromhex(block), privkey).decode('utf-8') for block in encrypted]
+
+        self.assertEqual(decrypted, messages)
+        self.assertEqual(len(set(encrypted)), len(messages))
+
+        # With the byte length from a public key record
+        record = contract.parse_public_key(key=f'{pubkey.n}|{pubkey.e}')
+        self.assertEqual(record['k'], 128)
+        encrypted = contract.encrypt_many(messages=messages, n=record['n'], e=record['e'], k=record['k'])
+        decrypted = [rsa.decrypt(bytes.fromhex(block), privkey).decode('utf-8') for block in encrypted]
+        self.assertEqual(decrypted, messages)
+
+        # Too long for a 1024 bit key
+        self.assertRaises(
+            Exception,
+            contract.encrypt_many,
+            messages=["x" * 118],
+            n=pubkey.n,
+            e=pubkey.e
+        )
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,39 @@
+import unittest
+import sys
+from os.path import dirname, abspath, join
+
+sys.path.insert(0, join(dirname(dirname(dirname(abspath(__file__)))), 'rsa'))
+
+import keygen
+
+
+def trial_division(n: int) -> bool:
+    return n > 1 and all([n % d for d in range(2, int(n ** 0.5) + 1)])
+
+
+class MyTestCase(unittest.TestCase):
+    def test_is_prime(self):
+        for n in range(20_000):
+            self.assertEqual(keygen.is_prime(n), trial_division(n), n)
+        # Carmichael numbers get past Fermat but not the small primes table
+        for n in (561, 41041, 825265):
+            self.assertFalse(keygen.is_prime(n))
+        self.assertTrue(keygen.is_prime(2 ** 127 - 1))
+        self.assertFalse(keygen.is_prime((2 ** 61 - 1) * (2 ** 89 - 1)))
+
+    def test_newkeys_parallel(self):
+        for parallel in (1, 3):
+            pub, priv = keygen.newkeys(512, parallel=parallel)
+            n, e, d, p, q = priv
+            self.assertEqual(pub, (n, e))
+            self.assertEqual(p * q, n)
+            self.assertEqual(n.bit_length(), 512)
+            self.assertGreater(p, q)
+            self.assertEqual(pow(pow(42, e, n), d, n), 42)
+
+        with self.assertRaises(ValueError):
+            keygen.newkeys(512, parallel=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
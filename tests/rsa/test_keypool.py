@@ -0,0 +1,70 @@
+import unittest
+import os
+import sys
+import tempfile
+from os.path import dirname, abspath, join
+
+sys.path.insert(0, join(dirname(dirname(dirname(abspath(__file__)))), 'rsa'))
+
+from keypool import KeyPool
+
+
+def check_keypair(test: unittest.TestCase, pub: tuple, priv: tuple, nbits: int):
+    n, e = pub
+    test.assertEqual(priv[:2], pub)
+    test.assertEqual(n.bit_length(), nbits)
+    test.assertEqual(priv[3] * priv[4], n)
+    message = 123456789
+    test.assertEqual(pow(pow(message, e, n), priv[2], n), message)
+
+
+class MyTestCase(unittest.TestCase):
+    def test_take_and_refill(self):
+        with KeyPool(nbits=128, size=8, low_watermark=4, processes=2) as pool:
+            self.assertTrue(pool.wait(timeout=60))
+            self.assertEqual(len(pool), 8)
+            # Peeking hands nothing out
+            peeked = pool.peek(3)
+            self.assertEqual(len(peeked), 3)
+            self.assertEqual(len(pool), 8)
+            self.assertEqual(pool.take(), peeked[0])
+            for _ in range(4):
+                pub, priv = pool.take()
+                check_keypair(self, pub, priv, 128)
+            # Dropped below the watermark, so it fills back up
+            self.assertTrue(pool.wait(timeout=60))
+            self.assertEqual(len(pool), 8)
+
+    def test_store(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = join(tmp, 'keys')
+            with KeyPool(path, nbits=128, size=6, processes=2) as pool:
+                pool.wait(timeout=60)
+                taken = [pool.take()[1] for _ in range(2)]
+                store = pool.path
+            self.assertEqual(os.stat(store).st_mode & 0o777, 0o600)
+            self.assertEqual(os.stat(store + '.taken').st_mode & 0o777, 0o600)
+
+            # A pool of another key size on the same path keeps its own store
+            with KeyPool(path, nbits=256, size=2, low_watermark=2, processes=2) as pool:
+                self.assertEqual(len(pool), 0)
+                pool.wait(timeout=60)
+                for _ in range(2):
+                    pub, priv = pool.take()
+                    check_keypair(self, pub, priv, 256)
+                self.assertNotEqual(pool.path, store)
+
+            with KeyPool(path, nbits=128, size=6, low_watermark=0, processes=2) as pool:
+                self.assertEqual(len(pool), 4)
+                again = [pool.take()[1] for _ in range(4)]
+                self.assertFalse(set(taken) & set(again))
+                for priv in again:
+                    check_keypair(self, priv[:2], priv, 128)
+                # Handed out keypairs are dropped from the store once it
+                # rewrites itself
+                with open(store) as f:
+                    self.assertLess(len(f.read().splitlines()), 6)
+            self.assertEqual(os.stat(store).st_mode & 0o777, 0o600)
+
+if __name__ == '__main__':
+    unittest.main()